@@ -0,0 +1,98 @@
+"""
+memory of the front end on a generated 100k line program, by tracemalloc:
+
+- peak while parsing the whole source read into a string against parsing
+  it streamed from the file, the tokens pulled as the parser goes
+- the syntax tree kept afterwards, in slotted nodes against the same tree
+  in nodes with a __dict__ like the dataclasses before
+
+    python -m benchmarks.ast_memory [LINES]
+"""
+import dataclasses
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from frontend.chast import Statement
+from frontend.parser import Parser
+
+BLOCK = """\
+定義 函式{i}（甲、乙）：
+    令 丙 為 甲 加 乙 乘 {i}
+    若 丙 大於 10：
+        輸出（「大於十」、丙）
+    丙
+令 變數{i} 為 函式{i}（1、2）
+"""
+
+
+def generate(lines: int) -> str:
+    blocks = lines // BLOCK.count("\n")
+    return "".join(BLOCK.format(i=i) for i in range(blocks))
+
+
+def _measure(fn) -> tuple[object, int, int, float]:
+    """ what fn gives, the bytes it still holds, its peak bytes and its time """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, seconds
+
+
+def parse_whole(path: str):
+    with open(path, encoding="utf-8") as fs:
+        source = fs.read()
+    return Parser().produce_ast(source)
+
+
+def parse_streamed(path: str):
+    with open(path, "rb") as fs:
+        return Parser().produce_ast(fs)
+
+
+_plain_classes: dict[type, type] = {}
+
+
+def with_dict_nodes(node):
+    """ the same tree, its nodes plain objects with a __dict__ """
+    if isinstance(node, list):
+        return [with_dict_nodes(item) for item in node]
+    if not isinstance(node, Statement):
+        return node
+    cls = type(node)
+    plain = _plain_classes.get(cls)
+    if plain is None:
+        plain = _plain_classes[cls] = type(cls.__name__, (), {})
+    copy = plain()
+    for field in dataclasses.fields(node):
+        setattr(copy, field.name, with_dict_nodes(getattr(node, field.name)))
+    return copy
+
+
+def main(lines: int):
+    with tempfile.NamedTemporaryFile("w", suffix=".ch", encoding="utf-8", delete=False) as fs:
+        fs.write(generate(lines))
+        path = fs.name
+    try:
+        print(f"{lines} lines, {os.path.getsize(path) / 2**20:.1f} MiB of source")
+        for name, parse in (("whole source", parse_whole), ("streamed", parse_streamed)):
+            program, kept, peak, seconds = _measure(lambda: parse(path))
+            print(f"parse {name:>12}: peak {peak / 2**20:6.1f} MiB in {seconds:.1f} s")
+    finally:
+        os.unlink(path)
+
+    # once parsed, only the tree is left
+    _, plain, _, _ = _measure(lambda: with_dict_nodes(program))
+    print(f"tree in slotted nodes: {kept / 2**20:6.1f} MiB")
+    print(f"tree in __dict__ nodes: {plain / 2**20:5.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
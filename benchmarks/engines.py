@@ -0,0 +1,93 @@
+"""
+time every engine on loop heavy programs, each the best of a few runs
+after parsing and resolving, against the tree walker
+
+    python -m benchmarks.engines [ENGINE ...]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from main import ENGINES
+from runtime.environment import create_global_env
+
+PROGRAMS = {
+    # the README guessing game, its input made up from the round
+    "guessing game": """\
+定義 遊戲（目標值、最大嘗試次數、猜測們）：
+    令 執行中 為 是
+    令 猜測次數 為 0
+    令 i 為 0
+    每當 執行中：
+        令 使用者輸入 為 猜測們 乘 i 餘 997
+        i 為 i 加 1
+        若 使用者輸入 等於 目標值：
+            執行中 為 否
+        或若 使用者輸入 小於 目標值：
+            猜測次數 為 猜測次數 加 1
+        不然：
+            猜測次數 為 猜測次數 加 1
+        若 猜測次數 大於等於 最大嘗試次數：
+            執行中 為 否
+    猜測次數
+令 答案 為 123
+令 回合 為 0
+令 總 為 0
+每當 回合 小於 200：
+    總 為 總 加 遊戲（答案、200、回合 加 7）
+    回合 為 回合 加 1
+總
+""",
+    "while loop": """\
+令 i 為 0
+令 和 為 0
+每當 i 小於 100000：
+    和 為 和 加 i 乘 2 餘 7
+    i 為 i 加 1
+和
+""",
+    "recursion": """\
+定義 費氏（n）：
+    若 n 小於 2：
+        n
+    不然：
+        費氏（n 減 1）加 費氏（n 減 2）
+費氏（20）
+""",
+}
+
+RUNS = 3
+
+
+def run(engine, source: str) -> tuple[float, object]:
+    best = float("inf")
+    for _ in range(RUNS):
+        env = create_global_env()
+        program = Parser().produce_ast(source)
+        Resolver().resolve(program, env.visible_names())
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = engine(program, env)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(engines: list[str]):
+    sys.setrecursionlimit(10000)
+    for name, source in PROGRAMS.items():
+        print(name)
+        baseline, expected = run(ENGINES["tree"], source)
+        print(f"    {'tree':>8}: {baseline:.3f} s")
+        for engine in engines:
+            if engine == "tree":
+                continue
+            seconds, result = run(ENGINES[engine], source)
+            same = "" if result.value == expected.value else f", gave {result!r}"
+            print(f"    {engine:>8}: {seconds:.3f} s, {baseline / seconds:5.1f}x{same}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or list(ENGINES))
@@ -0,0 +1,5 @@
+# lets the tests import frontend and runtime however pytest is started
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: takes many seconds, leave out with -m 'not slow'")
@@ -0,0 +1,165 @@
+import gc
+import hashlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+from contextlib import contextmanager
+from contextlib import suppress
+from functools import cache
+from pathlib import Path
+from typing import BinaryIO
+
+from . import chast
+from .chast import Program
+from .parser import Parser
+
+CACHE_DIRNAME = "__chcache__"
+CACHE_SUFFIX = ".ast"
+MAGIC = b"CHAST\x00"
+
+
+@cache
+def _cache_tag() -> bytes:
+    # an AST is only valid for the front end and the python that made it,
+    # so any change to either makes every old entry a miss
+    h = hashlib.sha256(sys.implementation.cache_tag.encode())
+    frontend = Path(__file__).parent
+    for name in ("chast.py", "lexer.py", "parser.py"):
+        h.update((frontend / name).read_bytes())
+    return h.digest()
+
+
+@contextmanager
+def _gc_paused():
+    # unpickling a big tree makes only new objects and no garbage,
+    # yet it keeps triggering full collections over all of them
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class _ASTUnpickler(pickle.Unpickler):
+    """
+    unpickles syntax trees and nothing else: anyone who can write to the
+    cache directory could otherwise make pickle call any function
+    """
+
+    def find_class(self, module: str, name: str) -> type:
+        if module == chast.__name__:
+            cls = getattr(chast, name, None)
+            if isinstance(cls, type) and issubclass(cls, chast.Statement):
+                return cls
+        raise pickle.UnpicklingError(f"{module}.{name} is not a syntax tree node")
+
+
+def hash_source(fs: BinaryIO, chunk_size: int = 1 << 20) -> str:
+    """ sha256 of a source file, read in chunks """
+    h = hashlib.sha256()
+    while chunk := fs.read(chunk_size):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+class ASTCache:
+    """
+    compiled ASTs on disk, like __pycache__ but keyed by the source content.
+
+    An entry is written to a temporary file and renamed into place, so
+    concurrent writers never leave a half written entry behind. Once the
+    directory grows over `max_size` bytes, the least recently used
+    entries are removed.
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_size: int = 64 << 20):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    @classmethod
+    def for_source(cls, path: str | os.PathLike, **kwargs) -> "ASTCache":
+        """ the cache directory next to a source file """
+        return cls(Path(path).parent / CACHE_DIRNAME, **kwargs)
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / (key + CACHE_SUFFIX)
+
+    def load(self, key: str) -> Program | None:
+        entry = self._entry(key)
+        try:
+            with open(entry, "rb") as fs:
+                data = fs.read()
+        except OSError:
+            return None
+
+        header = MAGIC + _cache_tag() + bytes.fromhex(key)
+        if not data.startswith(header):
+            # made by another front end, or not a cache entry at all
+            with suppress(OSError):
+                entry.unlink()
+            return None
+        try:
+            with _gc_paused():
+                program = _ASTUnpickler(io.BytesIO(data[len(header):])).load()
+        except Exception:
+            with suppress(OSError):
+                entry.unlink()
+            return None
+        if not isinstance(program, Program):
+            return None
+
+        with suppress(OSError):
+            os.utime(entry)  # mark as recently used
+        return program
+
+    def store(self, key: str, program: Program):
+        header = MAGIC + _cache_tag() + bytes.fromhex(key)
+        data = header + pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return  # a read-only place just goes without a cache
+        try:
+            with os.fdopen(fd, "wb") as fs:
+                fs.write(data)
+            os.replace(tmp, self._entry(key))
+        except OSError:
+            with suppress(OSError):
+                os.unlink(tmp)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for entry in self.directory.glob("*" + CACHE_SUFFIX):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # removed by someone else meanwhile
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            with suppress(OSError):
+                entry.unlink()
+            total -= size
+
+
+def produce_ast_cached(parser: Parser, fs: BinaryIO, ast_cache: ASTCache) -> Program:
+    """ parse a binary source file, or load its AST from `ast_cache` """
+    key = hash_source(fs)
+    program = ast_cache.load(key)
+    if program is None:
+        fs.seek(0)
+        program = parser.produce_ast(fs)
+        ast_cache.store(key, program)
+    return program
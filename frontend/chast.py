@@ -2,13 +2,20 @@ from dataclasses import dataclass
 from dataclasses import field
 
 
+def _annotation(default=None):
+    # filled in by the parser or a later pass, kept out of repr and equality
+    # so that trees compare and print the same with or without them
+    return field(default=default, kw_only=True, repr=False, compare=False)
+
+
 # ====================================
-@dataclass
+@dataclass(slots=True)
 class Statement:
-    ...
+    # the source line a statement starts on, 0 when unknown
+    line: int = _annotation(0)
 
 
-@dataclass
+@dataclass(slots=True)
 class Expression(Statement):
     ...
 
@@ -21,38 +28,55 @@ Statements
   can not chain with other statements
 """
 
-@dataclass
+@dataclass(slots=True)
 class Program(Statement):
     body: list[Statement] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class VariableDeclaration(Statement):
     identifier: str
     value: Expression | None
     const: bool
+    # frame slot given by the resolver, None for globals
+    slot: int | None = _annotation()
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionDeclaration(Statement):
     name: str
     params: list[str]
     body: list[Statement]
+    # frame slot of the name, and the number of slots its calls need
+    slot: int | None = _annotation()
+    frame_size: int | None = _annotation()
+    # how many results of its calls to remember, None to always call it;
+    # set by the parser for `純粹` functions, and by frontend.purity
+    memoize: int | None = _annotation()
 
 
-@dataclass
+@dataclass(slots=True)
 class IfStatement(Statement):
     test: Expression
     consequent: list[Statement]
     alternate: list[Statement]
 
 
-@dataclass
+@dataclass(slots=True)
 class WhileStatement(Statement):
     test: Expression
     body: list[Statement]
 
 
+@dataclass(slots=True)
+class ForStatement(Statement):
+    identifier: str
+    iterable: Expression
+    body: list[Statement]
+    # frame slot of the loop variable, None for globals
+    slot: int | None = _annotation()
+
+
 """
 Expressions
     can be evaluated to a value,
@@ -60,19 +84,27 @@ Expressions
 """
 
 
-@dataclass
+@dataclass(slots=True)
 class AssignmentExpr(Expression):
     assigne: Expression
     value: Expression
 
 
-@dataclass
+@dataclass(slots=True)
 class CallExpr(Expression):
     caller: Expression
     args: list[Expression]
+    # the tree walker's inline cache, see runtime.eval.expressions.CallCache
+    cache: object = _annotation()
 
 
-@dataclass
+@dataclass(slots=True)
+class AwaitExpr(Expression):
+    # 等待 f（）, the value of what f started once it is done
+    argument: Expression
+
+
+@dataclass(slots=True)
 class MemberExpr(Expression):
     obj: Expression
     prop: Expression
@@ -82,41 +114,60 @@ class MemberExpr(Expression):
 """ Literals """
 
 
-@dataclass
+@dataclass(slots=True)
 class BinaryExpr(Expression):
     left: Expression
     right: Expression
     operator: str
 
 
-@dataclass
+@dataclass(slots=True)
 class LogicalExpr(Expression):
     left: Expression
     right: Expression
     operator: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Identifier(Expression):
     symbol: str
+    # how many function scopes up the name is declared, and its slot there;
+    # a slot of None is a global, looked up by name
+    depth: int | None = _annotation()
+    slot: int | None = _annotation()
 
 
-@dataclass
+@dataclass(slots=True)
 class Property(Expression):
     key: str
     value: Expression | None
+    # where a shorthand property finds its variable, as in Identifier
+    depth: int | None = _annotation()
+    slot: int | None = _annotation()
 
 
-@dataclass
+@dataclass(slots=True)
 class ObjectLiteral(Expression):
     properties: list[Property]
 
 
-@dataclass
+@dataclass(slots=True)
+class VectorLiteral(Expression):
+    # 《1、2、3》
+    elements: list[Expression]
+
+
+@dataclass(slots=True)
 class NumberLiteral(Expression):
     value: int | float
 
 
-@dataclass
+@dataclass(slots=True)
 class StringLiteral(Expression):
     value: str
+
+
+@dataclass(slots=True)
+class BooleanLiteral(Expression):
+    # never parsed, 是 and 否 are names; made by folding constants
+    value: bool
@@ -1,8 +1,16 @@
+import codecs
 import re
-from contextlib import suppress
+import sys
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass
 from enum import Enum
 from enum import auto
+from mmap import mmap
+from typing import BinaryIO
+from typing import Iterable
+from typing import Iterator
+from typing import TextIO
 
 
 class TokenType(Enum):
@@ -22,6 +30,10 @@ class TokenType(Enum):
     Elif = auto()
     Else = auto()
     While = auto()
+    For = auto()
+    In = auto()
+    Pure = auto()
+    Await = auto()
 
     # Grouping * Operators
     BinaryOp = auto()
@@ -45,23 +57,14 @@ class TokenType(Enum):
         return self.name
 
 
-@dataclass
+@dataclass(frozen=True)
 class Token:
     type: TokenType
     value: str
-    ## TODO
-    # start: tuple[int, int]
-    # end: tuple[int, int]
+    # see TokenBuffer for the source positions
     raw: str
 
 
-def _is_skippable(char: str) -> bool:
-    return char in "\r"
-
-
-def _is_quote(char: str) -> bool:
-    return char in "'\"“”「」"
-
 def _get_close_quote(char: str) -> str:
     if char == '"':
         return '"'
@@ -75,13 +78,53 @@ def _get_close_quote(char: str) -> str:
         raise ValueError(f"Invalid quote: {char}")
 
 
+FULLWIDTH_CHARS = "？！（）《》【】＋－＊／％＝＜＞"
+HALFWIDTH_CHARS = "?!()[]{}+-*/%=<>"
+_HALVE_TABLE = str.maketrans(FULLWIDTH_CHARS, HALFWIDTH_CHARS)
+
+
 def halve_fullwidth_chars(txt: str):
-    src = "？！（）《》【】＋－＊／％＝＜＞"
-    dst = "?!()[]{}+-*/%=<>"
-    for s, d in zip(src, dst):
-        txt = txt.replace(s, d)
-    return txt
+    return txt.translate(_HALVE_TABLE)
+
+
+# single characters, the fullwidth or Chinese form next to the ascii one
+PUNCTUATION_TOKENS = {
+    "(": (TokenType.OpenParen, "("),
+    "（": (TokenType.OpenParen, "("),
+    ")": (TokenType.CloseParen, ")"),
+    "）": (TokenType.CloseParen, ")"),
+    "[": (TokenType.OpenBracket, "["),
+    "《": (TokenType.OpenBracket, "["),
+    "]": (TokenType.CloseBracket, "]"),
+    "》": (TokenType.CloseBracket, "]"),
+    "{": (TokenType.OpenBrace, "{"),
+    "【": (TokenType.OpenBrace, "{"),
+    "}": (TokenType.CloseBrace, "}"),
+    "】": (TokenType.CloseBrace, "}"),
+    "+": (TokenType.BinaryOp, "+"),
+    "＋": (TokenType.BinaryOp, "+"),
+    "-": (TokenType.BinaryOp, "-"),
+    "－": (TokenType.BinaryOp, "-"),
+    "*": (TokenType.BinaryOp, "*"),
+    "＊": (TokenType.BinaryOp, "*"),
+    "/": (TokenType.BinaryOp, "/"),
+    "／": (TokenType.BinaryOp, "/"),
+    "%": (TokenType.BinaryOp, "%"),
+    "％": (TokenType.BinaryOp, "%"),
+    "=": (TokenType.Equals, "="),
+    "＝": (TokenType.Equals, "="),
+    ".": (TokenType.Dot, "."),
+    "，": (TokenType.Dot, "."),
+    ",": (TokenType.Comma, ","),
+    "、": (TokenType.Comma, ","),
+    ":": (TokenType.Colon, ":"),
+    "：": (TokenType.Colon, ":"),
+    ";": (TokenType.Semicolon, ";"),
+    "；": (TokenType.Semicolon, ";"),
+}
 
+INDENT_CHARS = " \t　"
+QUOTE_CHARS = "'\"“”「」"
 
 NORMALIZED_OPS = {
     "且": "and",
@@ -110,15 +153,25 @@ OTHER_BINARY_OPS = {
     "^": TokenType.BinaryOp,
 }
 
-def _has_operator_cnt(text: str) -> int:
-    text = halve_fullwidth_chars(text)
-    for op in OTHER_BINARY_OPS.keys():
-        if text == op:
-            return len(op)
-    for op in NORMALIZED_OPS.keys():
-        if text == op:
-            return len(op)
-    return 0
+# binding power of the infix operators, the higher binds the tighter
+OPERATOR_PRECEDENCE = {
+    "or": 1,
+    "and": 2,
+    "==": 3,
+    "!=": 3,
+    ">": 3,
+    ">=": 3,
+    "<": 3,
+    "<=": 3,
+    "+": 4,
+    "-": 4,
+    "<<": 4,
+    ">>": 4,
+    "^": 4,
+    "*": 5,
+    "/": 5,
+    "%": 5,
+}
 
 
 KEYWORDS_TOKENS = {
@@ -136,161 +189,394 @@ KEYWORDS_TOKENS = {
     "不然": TokenType.Else,
     "while": TokenType.While,
     "每當": TokenType.While,
+    "for": TokenType.For,
+    "為每個": TokenType.For,
+    "in": TokenType.In,
+    "存在於": TokenType.In,
+    "pure": TokenType.Pure,
+    "純粹": TokenType.Pure,
+    "await": TokenType.Await,
+    "等待": TokenType.Await,
 }
 
 
-def _get_soft_token(text: str) -> tuple[TokenType | None, str]:
-    # since chinnese may also be part of identifier,
-    # so tokenize it lazily
-    match text:
-        case "加":
-            return TokenType.BinaryOp, "+"
-        case "減":
-            return TokenType.BinaryOp, "-"
-        case "乘" | "乘以":
-            return TokenType.BinaryOp, "*"
-        case "除" | "除以":
-            return TokenType.BinaryOp, "/"
-        case "餘" | "取餘":
-            return TokenType.BinaryOp, "%"
-        case "為":
-            return TokenType.Equals, "="
+# since chinnese may also be part of identifier,
+# so tokenize it lazily, only a whole word is an operator
+SOFT_TOKENS = {
+    "加": (TokenType.BinaryOp, "+"),
+    "減": (TokenType.BinaryOp, "-"),
+    "乘": (TokenType.BinaryOp, "*"),
+    "乘以": (TokenType.BinaryOp, "*"),
+    "除": (TokenType.BinaryOp, "/"),
+    "除以": (TokenType.BinaryOp, "/"),
+    "餘": (TokenType.BinaryOp, "%"),
+    "取餘": (TokenType.BinaryOp, "%"),
+    "為": (TokenType.Equals, "="),
+}
+
+
+def _build_word_tokens() -> dict[str, tuple[TokenType, str]]:
+    # resolve every known word once, the earlier tables win
+    words = {}
+    for word, t in KEYWORDS_TOKENS.items():
+        words[word] = (t, word)
+    for op, t in OTHER_BINARY_OPS.items():
+        if op.isalpha():
+            words[op] = (t, op)
+    for word, op in NORMALIZED_OPS.items():
+        words[word] = (OTHER_BINARY_OPS[op], op)
+    words.update(SOFT_TOKENS)
+    return words
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    a regex shaped like a trie of the words, e.g. 大於(?:等於)?|不(?:然|等於),
+    which finds the longest word without ever going back a character
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # a word ends here
+
+    def _node_pattern(node: dict) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + _node_pattern(child) for char, child in node.items() if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            # greedy, so the longer word wins
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return _node_pattern(trie)
+
+
+def _build_lexer_pattern() -> re.Pattern:
+    def _char_class(chars: str) -> str:
+        return "[" + "".join(re.escape(c) for c in chars) + "]"
+
+    # symbolic operators may be written in fullwidth form too, e.g. ＜＝
+    fullwidth = dict(zip(HALFWIDTH_CHARS, FULLWIDTH_CHARS))
+    symbol_ops = sorted((op for op in OTHER_BINARY_OPS if not op.isalpha()), key=len, reverse=True)
+    symbol_ops = [
+        "".join(_char_class(c + fullwidth.get(c, "")) for c in op)
+        for op in symbol_ops
+    ]
+
+    # spaces inside a line mean nothing, let the token before swallow them
+    # so they never cost a match of their own; only a run of spaces at the
+    # start of a line is matched alone and becomes an indent
+    inline_spaces = _char_class(INDENT_CHARS) + "*"
+    rules = [
+        # an identifier starts with a letter, then letters or numbers
+        ("word", r"[^\W\d_][^\W_]*", inline_spaces),
+        ("space", r"(?P<indent>" + _char_class(INDENT_CHARS) + r")(?P=indent)*", ""),
+        ("op", "|".join(symbol_ops), inline_spaces),
+        ("punct", _char_class(PUNCTUATION_TOKENS.keys()), inline_spaces),
+        ("newline", r"\r?\n", ""),
+        ("number", r"\d+(?:\.\d*)?", inline_spaces),
+        ("string", r'"[^"]*"|' + r"'[^']*'|“[^”]*”|「[^」]*」", inline_spaces),
+        ("quote", _char_class(QUOTE_CHARS), ""),
+        ("skip", r"\r", ""),
+        ("unknown", r".", ""),
+    ]
+    return re.compile(
+        "|".join(f"(?P<{name}>{rule}){trailing}" for name, rule, trailing in rules),
+        re.DOTALL,
+    )
+
+
+# Chinese is written without spaces, but a Chinese keyword of one character
+# is also part of many words, e.g. 除數, 因為 or 加入. So a run of text is
+# one word, unless it starts with 令 or holds a keyword of two or more
+# characters: only then is it split at the Chinese keywords in it, so
+# 令答案為亂數 is 令 答案 為 亂數. ascii keywords always need to be whole words.
+SPACELESS_STARTS = "令"
+
+
+def _build_spaceless_patterns() -> tuple[re.Pattern, re.Pattern]:
+    cjk_words = [word for word in WORD_TOKENS if not word.isascii()]
+    keyword = _trie_pattern(cjk_words)
+    keyword_starts = "".join(sorted({word[0] for word in cjk_words}))
+    # an identifier ends in front of a keyword, and only a character
+    # that may start a keyword needs a closer look
+    identifier = rf"[^\W\d_](?:[^\W_{keyword_starts}]|(?!{keyword})[^\W_])*"
+    words = re.compile(rf"(?P<keyword>{keyword})|(?P<identifier>{identifier})|(?P<number>\d+)")
+    long_keyword = re.compile(_trie_pattern(word for word in cjk_words if len(word) > 1))
+    return long_keyword, words
+
+
+WORD_TOKENS = _build_word_tokens()
+LEXER_PATTERN = _build_lexer_pattern()
+_LONG_KEYWORD, _SPACELESS_WORDS = _build_spaceless_patterns()
+# how far past a lexeme the pattern may have to look to end it
+_LOOKAHEAD = max(len(word) for word in WORD_TOKENS)
+_OPEN_QUOTES = "\"'“「"
+# distinct lexemes whose tokens a stream keeps for reuse
+_SEEN_LIMIT = 1 << 14
+
+
+class _Spaceless(tuple):
+    """ the tokens of a run of text written without spaces, each with where it ends in the run """
+    # never the type of a token, so it passes for one until _lex takes it apart
+    type = None
+
+
+def _word_token(word: str) -> Token:
+    # names end up as variable keys, interned they compare by identity
+    word = sys.intern(word)
+    t, normalized = WORD_TOKENS.get(word, (TokenType.Identifier, word))
+    return Token(t, normalized, word)
+
+
+def _split_spaceless(text: str) -> _Spaceless:
+    tokens = []
+    for m in _SPACELESS_WORDS.finditer(text):
+        word = m.group()
+        token = Token(TokenType.Number, word, word) if m.lastgroup == "number" else _word_token(word)
+        tokens.append((token, m.end()))
+    return _Spaceless(tokens)
+
+
+def _make_token(kind: str, text: str) -> Token | _Spaceless:
+    if kind != "space":
+        text = text.rstrip(INDENT_CHARS)
+    match kind:
+        case "word":
+            if text not in WORD_TOKENS and (text.startswith(SPACELESS_STARTS) or _LONG_KEYWORD.search(text)):
+                return _split_spaceless(text)
+            return _word_token(text)
+        case "space":
+            return Token(TokenType.Indent, " " * len(text), text)
+        case "punct":
+            t, normalized = PUNCTUATION_TOKENS[text]
+            return Token(t, normalized, text)
+        case "newline":
+            return Token(TokenType.NewLine, "\n", "\n")
+        case "number":
+            return Token(TokenType.Number, text, text)
+        case "string":
+            return Token(TokenType.String, text[1:-1], text[1:-1])
+        case "op":
+            op = halve_fullwidth_chars(text)
+            return Token(OTHER_BINARY_OPS[op], op, text)
+        case "quote":
+            _get_close_quote(text)
+            raise SyntaxError("SyntaxError: unterminated string")
         case _:
-            return None, ""
+            raise NotImplementedError(f"Unknown token: {text}")
+
+
+def _lex(chunks: Iterable[tuple[str, bool]], buffer: "TokenBuffer | None" = None) -> Iterator[Token]:
+    # one precompiled pattern classifies every lexeme, the tables above
+    # decide what token it becomes. A token only depends on its lexeme,
+    # so each distinct lexeme is turned into a Token once and then reused,
+    # up to _SEEN_LIMIT of them so that a long stream stays in bounded memory.
+    seen: dict[str, Token | _Spaceless] = {}
+
+    last_type = TokenType.NewLine
+    pending = ""
+    # the chunks of a string whose closing quote is not read yet
+    open_string: list[str] = []
+    close_quote = ""
+    offset = 0  # where `buf` starts in the whole source
+    for chunk, is_last in chunks:
+        if open_string:
+            # what was read of the string has been searched already
+            if close_quote not in chunk and not is_last:
+                open_string.append(chunk)
+                continue
+            open_string.append(chunk)
+            buf = "".join(open_string)
+            open_string = []
+        else:
+            buf = pending + chunk if pending else chunk
+        if len(seen) > _SEEN_LIMIT:
+            seen.clear()
+        buf_len = len(buf)
+        # a lexeme near the end may go on in the next chunk, e.g. a word,
+        # an indent run, 大於 which may be 大於等於, or a string whose
+        # closing quote is not read yet. Leave it for the next round.
+        tail = buf_len if is_last else buf_len - _LOOKAHEAD
+        pending = ""
+        for m in LEXER_PATTERN.finditer(buf):
+            if m.lastgroup == "quote" and not is_last and m.group() in _OPEN_QUOTES:
+                pending = buf[m.start():]
+                open_string.append(pending)
+                close_quote = _get_close_quote(m.group())
+                break
+            if m.end() > tail:
+                pending = buf[m.start():]
+                break
+            text = m.group()
+            token = seen.get(text)
+            if token is None:
+                kind = m.lastgroup
+                if kind == "space":
+                    if last_type is TokenType.Indent:
+                        raise SyntaxError("IndentationError: mixing tabs and spaces in indentation")
+                    if last_type is not TokenType.NewLine:
+                        continue
+                elif kind == "skip":
+                    continue
+                token = _make_token(kind, text)
+                seen[text] = token
+            elif token.type is TokenType.Indent:
+                if last_type is TokenType.Indent:
+                    raise SyntaxError("IndentationError: mixing tabs and spaces in indentation")
+                if last_type is not TokenType.NewLine:
+                    continue
+            if token.type is None:
+                start = m.start()
+                for word, end in token:
+                    if buffer is not None:
+                        buffer.append(word, offset + start + end)
+                    yield word
+                last_type = word.type
+                continue
+            if buffer is not None:
+                # the group leaves out the spaces swallowed after the lexeme
+                buffer.append(token, offset + m.end(m.lastgroup))
+            yield token
+            last_type = token.type
+        offset += buf_len - len(pending)
+
+    eof = Token(TokenType.EOF, "<EOF>", "")
+    if buffer is not None:
+        buffer.append(eof, offset)
+    yield eof
+
+
+def _read_chunks(stream: TextIO | BinaryIO | mmap, chunk_size: int, encoding: str) -> Iterator[tuple[str, bool]]:
+    decoder = None
+    while True:
+        data = stream.read(chunk_size)
+        if isinstance(data, bytes):
+            # binary files and mmap hand out bytes, a multibyte character
+            # may be cut in half at the chunk boundary
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            text = decoder.decode(data, final=not data)
+        else:
+            text = data
+        if not data:
+            yield text, True
+            return
+        yield text, False
+
+
+def tokenize_iter(stream: TextIO | BinaryIO | mmap, chunk_size: int = 1 << 16, encoding: str = "utf-8") -> Iterator[Token]:
+    """
+    lazily tokenize a text stream, a binary file or a mmap,
+    reading `chunk_size` characters (or bytes) at a time
+    """
+    return _lex(_read_chunks(stream, chunk_size, encoding))
 
 
 def tokenize(src_code: str) -> list[Token]:
-    src = src_code
+    return list(_lex([(src_code, True)]))
+
+
+def tokenize_packed(src_code: str) -> "TokenBuffer":
+    buffer = TokenBuffer(src_code)
+    for _ in _lex([(src_code, True)], buffer):
+        pass
+    return buffer
+
+
+class TokenBuffer:
+    """
+    tokens of one source packed into parallel arrays,
+    only the distinct tokens are kept as objects.
+    Indexing gives a TokenView, which reads like a Token
+    and also knows where it is in the source.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.types = array("B")   # TokenType value of each token
+        self.ids = array("H")     # index into `table`, widened when it runs out
+        self.starts = array("I")  # offset of each raw text in `source`
+        self.table: list[Token] = []
+        self._interned: dict[int, tuple[int, int, int]] = {}
+        self._line_starts: array | None = None
+
+    def append(self, token: Token, end: int):
+        """ add a token whose lexeme ends at `end` """
+        interned = self._interned.get(id(token))
+        if interned is None:
+            token_id = len(self.table)
+            if token_id == 1 << 16 and self.ids.typecode == "H":
+                self.ids = array("I", self.ids)
+            # the raw text is what the lexeme ends with, only a string has
+            # its closing quote after it. So the end offset is never stored.
+            back = len(token.raw) + (token.type is TokenType.String)
+            interned = self._interned[id(token)] = (token_id, token.type.value, back)
+            self.table.append(token)
+        token_id, type_value, back = interned
+        self.types.append(type_value)
+        self.ids.append(token_id)
+        self.starts.append(end - back)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> "TokenView":
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError("token index out of range")
+        return TokenView(self, index)
+
+    def __iter__(self) -> Iterator["TokenView"]:
+        for index in range(len(self.ids)):
+            yield TokenView(self, index)
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """ (line, column) of an offset, line starts from 1 and column from 0 """
+        if self._line_starts is None:
+            # built on first use, a profiler or an error message may never ask
+            self._line_starts = array("I", [0])
+            self._line_starts.extend(m.end() for m in re.finditer("\n", self.source))
+        line = bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1]
+
+
+class TokenView:
+    __slots__ = ("buffer", "index", "type", "value", "raw")
+
+    def __init__(self, buffer: TokenBuffer, index: int):
+        self.buffer = buffer
+        self.index = index
+        # copied out once, the parser reads them over and over
+        token = buffer.table[buffer.ids[index]]
+        self.type = token.type
+        self.value = token.value
+        self.raw = token.raw
+
+    @property
+    def token(self) -> Token:
+        return self.buffer.table[self.buffer.ids[self.index]]
+
+    @property
+    def start(self) -> tuple[int, int]:
+        return self.buffer.position(self.buffer.starts[self.index])
+
+    @property
+    def end(self) -> tuple[int, int]:
+        return self.buffer.position(self.buffer.starts[self.index] + len(self.raw))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TokenView):
+            other = other.token
+        return self.token == other
 
-    tokens = []
-    while src != "":
-        # take care of fullwidth characters too
-        match src[0]:
-            case "(" | "（":
-                tokens.append(Token(TokenType.OpenParen, "(", src[0]))
-                src = src[1:]
-            case ")" | "）":
-                tokens.append(Token(TokenType.CloseParen, ")", src[0]))
-                src = src[1:]
-            case "[" | "《":
-                tokens.append(Token(TokenType.OpenBracket, "[", src[0]))
-                src = src[1:]
-            case "]" | "》":
-                tokens.append(Token(TokenType.CloseBracket, "]", src[0]))
-                src = src[1:]
-            case "{" | "【":
-                tokens.append(Token(TokenType.OpenBrace, "{", src[0]))
-                src = src[1:]
-            case "}" | "】":
-                tokens.append(Token(TokenType.CloseBrace, "}", src[0]))
-                src = src[1:]
-            case "+" | "＋":
-                tokens.append(Token(TokenType.BinaryOp, "+", src[0]))
-                src = src[1:]
-            case "-" | "－":
-                tokens.append(Token(TokenType.BinaryOp, "-", src[0]))
-                src = src[1:]
-            case "*" | "＊":
-                tokens.append(Token(TokenType.BinaryOp, "*", src[0]))
-                src = src[1:]
-            case "/" | "／":
-                tokens.append(Token(TokenType.BinaryOp, "/", src[0]))
-                src = src[1:]
-            case "%" | "％":
-                tokens.append(Token(TokenType.BinaryOp, "%", src[0]))
-                src = src[1:]
-            case "=" | "＝":
-                tokens.append(Token(TokenType.Equals, "=", src[0]))
-                src = src[1:]
-            case "." | "，":
-                tokens.append(Token(TokenType.Dot, ".", src[0]))
-                src = src[1:]
-            case "," | "、":
-                tokens.append(Token(TokenType.Comma, ",", src[0]))
-                src = src[1:]
-            case ":" | "：":
-                tokens.append(Token(TokenType.Colon, ":", src[0]))
-                src = src[1:]
-            case ";" | "；":
-                tokens.append(Token(TokenType.Semicolon, ";", src[0]))
-                src = src[1:]
-            case " " | "\t" | "　":
-                if tokens[-1].type == TokenType.Indent:
-                    raise SyntaxError("IndentationError: mixing tabs and spaces in indentation")
-                if tokens[-1].type == TokenType.NewLine:
-                    indent = ""
-                    pos = 0
-                    while src[pos] == src[0]:
-                        indent += " "
-                        pos += 1
-                    tokens.append(Token(TokenType.Indent, indent, src[:pos]))
-                    src = src[pos:]
-                else:
-                    src = src[1:]
-            case "\r":
-                with suppress(IndexError):
-                    if src[1] == "\n":
-                        tokens.append(Token(TokenType.NewLine, "\n", "\n"))
-                        src = src[2:]
-                    else:
-                        src = src[1:]
-            case "\n":
-                tokens.append(Token(TokenType.NewLine, "\n", "\n"))
-                src = src[1:]
-            case _:
-                if src[0].isnumeric():
-                    char_cnt = 0
-                    while char_cnt < len(src) and src[char_cnt].isnumeric():
-                        char_cnt += 1
-                    num, src = src[:char_cnt], src[char_cnt:]
-                    if src.startswith("."):
-                        char_cnt = 1
-                        while char_cnt < len(src) and src[char_cnt].isnumeric():
-                            char_cnt += 1
-                        num += src[:char_cnt]
-                        src = src[char_cnt:]
-                    tokens.append(Token(TokenType.Number, num, num))
-                elif src[0].isalpha():
-                    char_cnt = 0
-                    src_len = len(src)
-                    while char_cnt < src_len:
-                        if char_cnt > 0:
-                            if not (src[char_cnt].isnumeric() or src[char_cnt].isalpha()):
-                                break
-                        elif not src[char_cnt].isalpha():
-                            break
-                        char_cnt += 1
-                    alpha, src = src[:char_cnt], src[char_cnt:]
-
-                    t, normailzed = _get_soft_token(alpha)
-                    if t is not None:
-                        tokens.append(Token(t, normailzed, alpha))
-                    elif _has_operator_cnt(alpha):
-                        op = NORMALIZED_OPS.get(alpha, alpha)
-                        tokens.append(Token(OTHER_BINARY_OPS[op], op, alpha))
-                    else:
-                        t = KEYWORDS_TOKENS.get(alpha, TokenType.Identifier)
-                        tokens.append(Token(t, alpha, alpha))
-                elif _is_skippable(src[0]):
-                    src = src[1:]
-                elif _is_quote(src[0]):
-                    quote = src[0]
-                    close_quote = _get_close_quote(quote)
-                    char_cnt = 1
-                    src_len = len(src)
-                    while char_cnt < src_len:
-                        if src[char_cnt] == close_quote:
-                            break
-                        char_cnt += 1
-                    if char_cnt == src_len:
-                        raise SyntaxError("SyntaxError: unterminated string")
-                    string, src = src[1:char_cnt], src[char_cnt+1:]
-                    tokens.append(Token(TokenType.String, string, string))
-                else:
-                    raise NotImplementedError(f"Unknown token: {src[0]}")
-    tokens.append(Token(TokenType.EOF, "<EOF>", ""))
-
-    return tokens
+    def __repr__(self) -> str:
+        return f"Token(type={self.type!r}, value={self.value!r}, raw={self.raw!r}, start={self.start}, end={self.end})"
 
 if __name__ == "__main__":
     from pprint import pprint
@@ -0,0 +1,438 @@
+"""
+passes that rewrite a Program between parsing and running it.
+
+A pass changes the tree in place and counts what it changed; PassManager
+runs a list of them in order and keeps their statistics.
+"""
+import copy
+import operator
+import time
+from typing import Iterable
+from typing import Iterator
+
+from .chast import AssignmentExpr
+from .chast import AwaitExpr
+from .chast import BinaryExpr
+from .chast import BooleanLiteral
+from .chast import CallExpr
+from .chast import Expression
+from .chast import ForStatement
+from .chast import FunctionDeclaration
+from .chast import Identifier
+from .chast import IfStatement
+from .chast import LogicalExpr
+from .chast import MemberExpr
+from .chast import NumberLiteral
+from .chast import ObjectLiteral
+from .chast import Program
+from .chast import Statement
+from .chast import StringLiteral
+from .chast import VariableDeclaration
+from .chast import VectorLiteral
+from .chast import WhileStatement
+
+# the boolean names of the global environment, folded unless a program
+# declares a variable of the same name somewhere
+BUILTIN_CONSTANTS = {"是": True, "否": False, "True": True, "False": False}
+
+_LITERALS = (NumberLiteral, StringLiteral, BooleanLiteral)
+
+# as in runtime.eval.expressions, on numbers only; whatever raises there is
+# left for the program to raise when it gets there
+_BINARY_OPERATIONS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+    "<<": operator.lshift,
+    ">>": operator.rshift,
+    "^": operator.xor,
+}
+
+_LOGICAL_OPERATIONS = {
+    "and": lambda lhs, rhs: bool(lhs and rhs),
+    "or": lambda lhs, rhs: bool(lhs or rhs),
+    "!=": operator.ne,
+    "==": operator.eq,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def walk(node: Statement) -> Iterator[Statement]:
+    """ every node under `node`, itself included, in no particular order """
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        yield node
+        match node:
+            case Program():
+                nodes.extend(node.body)
+            case VariableDeclaration():
+                if node.value is not None:
+                    nodes.append(node.value)
+            case FunctionDeclaration():
+                nodes.extend(node.body)
+            case IfStatement():
+                nodes.append(node.test)
+                nodes.extend(node.consequent)
+                nodes.extend(node.alternate)
+            case WhileStatement():
+                nodes.append(node.test)
+                nodes.extend(node.body)
+            case ForStatement():
+                nodes.append(node.iterable)
+                nodes.extend(node.body)
+            case AssignmentExpr():
+                nodes.append(node.assigne)
+                nodes.append(node.value)
+            case BinaryExpr() | LogicalExpr():
+                nodes.append(node.left)
+                nodes.append(node.right)
+            case CallExpr():
+                nodes.extend(node.args)
+                nodes.append(node.caller)
+            case ObjectLiteral():
+                nodes.extend(prop.value for prop in node.properties if prop.value is not None)
+            case VectorLiteral():
+                nodes.extend(node.elements)
+            case AwaitExpr():
+                nodes.append(node.argument)
+            case MemberExpr():
+                nodes.append(node.obj)
+                nodes.append(node.prop)
+
+
+def declared_names(node: Statement) -> set[str]:
+    """ the names declared anywhere under `node`, parameters included """
+    names = set()
+    for child in walk(node):
+        match child:
+            case VariableDeclaration() | ForStatement():
+                names.add(child.identifier)
+            case FunctionDeclaration():
+                names.add(child.name)
+                names.update(child.params)
+    return names
+
+
+def assigned_names(node: Statement) -> set[str]:
+    """ the names that some assignment under `node` changes """
+    return {
+        child.assigne.symbol
+        for child in walk(node)
+        if type(child) is AssignmentExpr and type(child.assigne) is Identifier
+    }
+
+
+def _has_call(node: Statement) -> bool:
+    return any(type(child) is CallExpr for child in walk(node))
+
+
+class Pass:
+    """
+    a rewrite of the tree. The default methods only visit every block and
+    expression; a pass overrides the ones it cares about, and adds up in
+    `changes` how often it rewrote something.
+    """
+    name = "pass"
+
+    def __init__(self):
+        self.changes = 0
+        self.elapsed = 0.0
+
+    def run(self, program: Program):
+        program.body = self.block(program.body)
+
+    def block(self, body: list[Statement]) -> list[Statement]:
+        statements = []
+        for i, statement in enumerate(body):
+            statements.extend(self.statement(statement, i == len(body) - 1))
+        return statements
+
+    def statement(self, node: Statement, last: bool) -> list[Statement]:
+        # the statements that replace `node`; `last` tells whether its
+        # value is the value of the block
+        match node:
+            case VariableDeclaration():
+                if node.value is not None:
+                    node.value = self.expression(node.value)
+            case FunctionDeclaration():
+                node.body = self.block(node.body)
+            case IfStatement():
+                node.test = self.expression(node.test)
+                node.consequent = self.block(node.consequent)
+                node.alternate = self.block(node.alternate)
+            case WhileStatement():
+                node.test = self.expression(node.test)
+                node.body = self.block(node.body)
+            case ForStatement():
+                node.iterable = self.expression(node.iterable)
+                node.body = self.block(node.body)
+            case _:
+                expression = self.expression(node)
+                if expression is not node:
+                    expression.line = node.line
+                return [expression]
+        return [node]
+
+    def expression(self, node: Expression) -> Expression:
+        match node:
+            case AssignmentExpr():
+                node.value = self.expression(node.value)
+            case BinaryExpr() | LogicalExpr():
+                node.left = self.expression(node.left)
+                node.right = self.expression(node.right)
+            case CallExpr():
+                node.args = [self.expression(arg) for arg in node.args]
+                node.caller = self.expression(node.caller)
+            case ObjectLiteral():
+                for prop in node.properties:
+                    if prop.value is not None:
+                        prop.value = self.expression(prop.value)
+            case VectorLiteral():
+                node.elements = [self.expression(element) for element in node.elements]
+            case AwaitExpr():
+                node.argument = self.expression(node.argument)
+            case MemberExpr():
+                node.obj = self.expression(node.obj)
+                if node.computed:
+                    node.prop = self.expression(node.prop)
+        return node
+
+
+class ConstantFolding(Pass):
+    """ operators on literals become the literal they evaluate to """
+    name = "constant folding"
+
+    def run(self, program: Program):
+        declared = declared_names(program)
+        self.constants = {name: value for name, value in BUILTIN_CONSTANTS.items() if name not in declared}
+        super().run(program)
+
+    def expression(self, node: Expression) -> Expression:
+        node = super().expression(node)
+        match node:
+            case Identifier() if node.symbol in self.constants:
+                self.changes += 1
+                return BooleanLiteral(value=self.constants[node.symbol])
+            case BinaryExpr(left=NumberLiteral() | BooleanLiteral(), right=NumberLiteral() | BooleanLiteral()):
+                operation = _BINARY_OPERATIONS.get(node.operator)
+                literal = NumberLiteral
+            case LogicalExpr(left=NumberLiteral() | BooleanLiteral(), right=NumberLiteral() | BooleanLiteral()):
+                operation = _LOGICAL_OPERATIONS.get(node.operator)
+                literal = BooleanLiteral
+            case _:
+                return node
+
+        if operation is None:
+            return node
+        try:
+            value = operation(node.left.value, node.right.value)
+        except (ArithmeticError, TypeError, ValueError):
+            return node
+        self.changes += 1
+        return literal(value=value)
+
+
+class BranchPruning(Pass):
+    """ an if statement on a literal is replaced by the branch it takes """
+    name = "branch pruning"
+
+    def statement(self, node: Statement, last: bool) -> list[Statement]:
+        statements = super().statement(node, last)
+        if type(node) is not IfStatement or not isinstance(node.test, _LITERALS):
+            return statements
+
+        # literals are truthy just as their values are in python
+        branch = node.consequent if node.test.value else node.alternate
+        if not branch and last:
+            return statements  # an empty branch still gives the block a Null
+        self.changes += 1
+        return branch
+
+
+class DeadCode(Pass):
+    """
+    drops statements that can not do anything: literals whose value is not
+    used, loops on a false literal, and whatever follows a loop on a true
+    literal, which can never end
+    """
+    name = "dead code"
+
+    def block(self, body: list[Statement]) -> list[Statement]:
+        body = super().block(body)
+        statements = []
+        for i, statement in enumerate(body):
+            last = i == len(body) - 1
+            endless = False
+            if type(statement) is WhileStatement and isinstance(statement.test, _LITERALS):
+                if not statement.test.value and not last:
+                    self.changes += 1
+                    continue
+                endless = bool(statement.test.value)
+            elif isinstance(statement, _LITERALS) and not last:
+                self.changes += 1
+                continue
+
+            statements.append(statement)
+            if endless:
+                self.changes += len(body) - i - 1
+                break
+        return statements
+
+
+class LoopInvariantHoisting(Pass):
+    """
+    computes the operators in a while loop whose operands the loop never
+    changes once, into a temporary declared before the loop.
+
+    Only what runs on every round is hoisted: the test, and the top level
+    statements of the body. Those of the body are evaluated behind another
+    check of the test, so a loop that never runs does not evaluate them,
+    which needs a test without calls or assignments.
+
+    A hoisted operator runs ahead of what comes before it in the round, and
+    almost any operator can raise, e.g. on a string or on 除 by 0. So an
+    operator is only hoisted when nothing that runs before it in the round
+    can print or raise: hoisting stops at the first call, await, or
+    operator that stays in the loop.
+    """
+    name = "loop invariant hoisting"
+    prefix = "_inv"  # can not be lexed, so never the name of a variable
+
+    def run(self, program: Program):
+        self.declared = declared_names(program)
+        # the variables a call may change behind the loop's back
+        self.assigned_in_functions = set()
+        for node in walk(program):
+            if type(node) is FunctionDeclaration:
+                for statement in node.body:
+                    self.assigned_in_functions |= assigned_names(statement)
+        super().run(program)
+
+    def _temp(self) -> str:
+        n = 1
+        while f"{self.prefix}{n}" in self.declared:
+            n += 1
+        name = f"{self.prefix}{n}"
+        self.declared.add(name)
+        return name
+
+    def statement(self, node: Statement, last: bool) -> list[Statement]:
+        statements = super().statement(node, last)  # inner loops first
+        if type(node) is not WhileStatement:
+            return statements
+
+        loop = Program(body=[node])
+        changed = declared_names(loop) | assigned_names(loop)
+        if _has_call(loop):
+            changed |= self.assigned_in_functions
+
+        before = []
+        self.clean = True
+        node.test = self._hoist(node.test, changed, before, node.line)
+        guarded = []
+        if not _has_call(node.test) and not assigned_names(node.test):
+            # the test went through already when the body starts
+            self.clean = True
+            for statement in node.body:
+                if not self.clean:
+                    break
+                self._hoist_statement(statement, changed, guarded)
+        if not guarded:
+            return before + [node]
+
+        guard = IfStatement(test=copy.deepcopy(node.test), consequent=guarded + [node], alternate=[])
+        guard.line = node.line
+        return before + [guard]
+
+    def _hoist_statement(self, node: Statement, changed: set[str], out: list[Statement]):
+        match node:
+            case VariableDeclaration():
+                if node.value is not None:
+                    node.value = self._hoist(node.value, changed, out, node.line)
+            case AssignmentExpr():
+                node.value = self._hoist(node.value, changed, out, node.line)
+            case CallExpr():
+                node.args = [self._hoist(arg, changed, out, node.line) for arg in node.args]
+                self.clean = False
+            case FunctionDeclaration() | NumberLiteral() | StringLiteral() | BooleanLiteral() | Identifier():
+                pass
+            case _:
+                self.clean = False
+
+    def _invariant(self, node: Expression, changed: set[str]) -> bool:
+        match node:
+            case NumberLiteral() | StringLiteral() | BooleanLiteral():
+                return True
+            case Identifier():
+                return node.symbol not in changed
+            case BinaryExpr() | LogicalExpr():
+                return self._invariant(node.left, changed) and self._invariant(node.right, changed)
+            case _:
+                return False
+
+    def _hoist(self, node: Expression, changed: set[str], out: list[Statement], line: int) -> Expression:
+        # the largest invariant operators in `node` are declared into `out`,
+        # while `clean` says nothing before them in the round prints or raises
+        match node:
+            case BinaryExpr() | LogicalExpr() if self.clean and self._invariant(node, changed):
+                name = self._temp()
+                declaration = VariableDeclaration(identifier=name, value=node, const=True)
+                declaration.line = line
+                out.append(declaration)
+                self.changes += 1
+                return Identifier(symbol=name)
+            case BinaryExpr() | LogicalExpr():
+                node.left = self._hoist(node.left, changed, out, line)
+                node.right = self._hoist(node.right, changed, out, line)
+                self.clean = False
+            case AssignmentExpr():
+                node.value = self._hoist(node.value, changed, out, line)
+            case CallExpr():
+                node.args = [self._hoist(arg, changed, out, line) for arg in node.args]
+                self.clean = False
+            case ObjectLiteral():
+                for prop in node.properties:
+                    if prop.value is not None:
+                        prop.value = self._hoist(prop.value, changed, out, line)
+            case VectorLiteral():
+                node.elements = [self._hoist(element, changed, out, line) for element in node.elements]
+                self.clean = False
+            case AwaitExpr():
+                node.argument = self._hoist(node.argument, changed, out, line)
+                self.clean = False
+            case NumberLiteral() | StringLiteral() | BooleanLiteral() | Identifier():
+                pass
+            case _:
+                self.clean = False
+        return node
+
+
+DEFAULT_PASSES: tuple[type[Pass], ...] = (ConstantFolding, BranchPruning, DeadCode, LoopInvariantHoisting)
+
+
+class PassManager:
+    """ runs passes over a Program in order, and keeps their statistics """
+
+    def __init__(self, passes: Iterable[type[Pass]] = DEFAULT_PASSES):
+        self.passes = [make_pass() for make_pass in passes]
+
+    def run(self, program: Program) -> Program:
+        for optimization in self.passes:
+            start = time.perf_counter()
+            optimization.run(program)
+            optimization.elapsed += time.perf_counter() - start
+        return program
+
+    def stats(self) -> list[tuple[str, int, float]]:
+        """ (name, changes, seconds) of every pass """
+        return [(optimization.name, optimization.changes, optimization.elapsed) for optimization in self.passes]
+
+
+def optimize(program: Program, passes: Iterable[type[Pass]] = DEFAULT_PASSES) -> Program:
+    return PassManager(passes).run(program)
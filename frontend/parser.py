@@ -1,7 +1,14 @@
+from mmap import mmap
+from typing import BinaryIO
+from typing import Iterator
+from typing import TextIO
+
 from .chast import AssignmentExpr
+from .chast import AwaitExpr
 from .chast import BinaryExpr
 from .chast import CallExpr
 from .chast import Expression
+from .chast import ForStatement
 from .chast import FunctionDeclaration
 from .chast import Identifier
 from .chast import IfStatement
@@ -14,26 +21,54 @@ from .chast import Property
 from .chast import Statement
 from .chast import StringLiteral
 from .chast import VariableDeclaration
+from .chast import VectorLiteral
 from .chast import WhileStatement
-from .lexer import OTHER_BINARY_OPS
+from .lexer import OPERATOR_PRECEDENCE
 from .lexer import Token
 from .lexer import TokenType
-from .lexer import tokenize
+from .lexer import tokenize_iter
+from .lexer import tokenize_packed
 
 
 class ParserError(Exception):
     ...
 
 
+# a literal node holds no state, so the common small numbers are shared
+_SMALL_NUMBERS = {i: NumberLiteral(value=i) for i in range(257)}
+
+# logical and comparison operators build a LogicalExpr, the rest a BinaryExpr
+_LOGICAL_PRECEDENCE = OPERATOR_PRECEDENCE["=="]
+
+# how many results a `純粹` function remembers
+DEFAULT_MEMO_SIZE = 1024
+
+
 class Parser:
-    tokens: list[Token] = []
-    indents: list[str] = []
+    # all the parsing state lives on the instance and is reset by every
+    # produce_ast call, so a parse never sees what a failed one left behind.
+    # Parsers share nothing, use one per thread to parse concurrently.
+    tokens: Iterator[Token]
+    current: Token
+    indents: list[str]
+    line: int
+
+    def __init__(self):
+        self.indents = []
+        self.line = 1
 
     def at_the_end(self) -> bool:
-        return self.tokens[0].type == TokenType.EOF
+        return self.current.type is TokenType.EOF
 
-    def produce_ast(self, source_code: str) -> Program:
-        self.tokens = tokenize(source_code)
+    def produce_ast(self, source_code: str | TextIO | BinaryIO | mmap) -> Program:
+        if isinstance(source_code, str):
+            # packed tokens know their positions for error messages
+            self.tokens = iter(tokenize_packed(source_code))
+        else:
+            self.tokens = tokenize_iter(source_code)
+        self.current = next(self.tokens)
+        self.indents = []
+        self.line = 1
 
         statements = []
         self._ignore_whitespaces()
@@ -45,10 +80,16 @@ class Parser:
         return Program(body=statements)
 
     def at(self) -> Token:
-        return self.tokens[0]
+        return self.current
 
     def eat(self) -> Token:
-        return self.tokens.pop(0)
+        # a cursor over the token stream, only the current token is held;
+        # EOF is the last token and stays current once reached
+        token = self.current
+        if token.type is TokenType.NewLine:
+            self.line += 1
+        self.current = next(self.tokens, token)
+        return token
 
     def expect(self, token_type: TokenType, err: str):
         prev = self.at()
@@ -63,10 +104,12 @@ class Parser:
     orders of prescedence
     - assignment expression
     - object
-    - logical expression: and, or
-    - comparison expression
-    - additive expression
-    - multiplicative expression
+    - binary expression, climbing by OPERATOR_PRECEDENCE
+        - logical expression: or
+        - logical expression: and
+        - comparison expression
+        - additive expression
+        - multiplicative expression
     - unary expression
     - function call
     - member expression
@@ -74,20 +117,31 @@ class Parser:
     """
 
     def _parse_statement(self) -> Statement:
+        line = self.line
         # skip to parse expression
         match self.at().type:
             case TokenType.Const:
-                return self._parse_variable_declaration(True)
+                statement = self._parse_variable_declaration(True)
             case TokenType.Let:
-                return self._parse_variable_declaration(False)
+                statement = self._parse_variable_declaration(False)
             case TokenType.Fn:
-                return self._parse_function_declaration()
+                statement = self._parse_function_declaration()
+            case TokenType.Pure:
+                statement = self._parse_pure_function_declaration()
             case TokenType.If:
-                return self._parse_if_statement(TokenType.If)
+                statement = self._parse_if_statement(TokenType.If)
             case TokenType.While:
-                return self._parse_while_statement()
+                statement = self._parse_while_statement()
+            case TokenType.For:
+                statement = self._parse_for_statement()
             case _:
-                return self._parse_expression()
+                statement = self._parse_expression()
+                if isinstance(statement, NumberLiteral):
+                    # a shared small number must not take this line
+                    statement = NumberLiteral(value=statement.value)
+
+        statement.line = line
+        return statement
 
     def _parse_variable_declaration(self, is_const: bool) -> Statement:
         # let IDENT;
@@ -217,6 +271,16 @@ class Parser:
 
         return FunctionDeclaration(name=name, params=params, body=body)
 
+    def _parse_pure_function_declaration(self) -> Statement:
+        self.eat()  # eat "pure"
+        self.expect(
+            TokenType.Fn,
+            "Expect `def` following `pure` keyword."
+        )
+        declaration = self._parse_function_declaration()
+        declaration.memoize = DEFAULT_MEMO_SIZE
+        return declaration
+
     def _parse_if_statement(self, expected_token_type) -> Statement:
         self.expect(
             expected_token_type,
@@ -263,6 +327,28 @@ class Parser:
 
         return WhileStatement(test=cond, body=body)
 
+    def _parse_for_statement(self) -> Statement:
+        self.eat()  # eat "for"
+        self.expect(
+            TokenType.Identifier,
+            "Expect an identifier following `for` keyword."
+        )
+        identifier = self.eat().value
+        self.expect(
+            TokenType.In,
+            "Expect `in` after the loop variable."
+        )
+        self.eat()  # eat "in"
+        iterable = self._parse_object_expression()
+        self.expect(
+            TokenType.Colon,
+            "Expect `:` after for iterable."
+        )
+        self.eat()  # eat ":"
+        body = self._get_block_statements()
+
+        return ForStatement(identifier=identifier, iterable=iterable, body=body)
+
     def _parse_expression(self) -> Expression:
         return self._parser_assignment_expression()
 
@@ -281,7 +367,7 @@ class Parser:
 
     def _parse_object_expression(self) -> Expression:
         if self.at().type is not TokenType.OpenBrace:
-            return self._parser_logical_expression()
+            return self._parse_binary_expression()
 
         self.eat()  # eat "{"
         self._ignore_whitespaces()
@@ -331,50 +417,33 @@ class Parser:
         self.eat()
         return ObjectLiteral(properties=properties)
 
-    def _parser_logical_expression(self) -> Expression:
-        left = self._parse_additive_expression()
-
-        while self.at().value in OTHER_BINARY_OPS:
-            operator = self.eat()
-            right = self._parse_additive_expression()
-            left = LogicalExpr(
-                left=left,
-                right=right,
-                operator=operator.value,
-            )
-
-        return left
-
-    # (10 + 5) - 1
-    def _parse_additive_expression(self) -> Expression:
-        left = self._parse_multiplicative_expression()
-
-        while self.at().value in {"+", "-", "<<", ">>", "^", "&", "|"}:
-            operator = self.eat()
-            right = self._parse_multiplicative_expression()
-            left = BinaryExpr(
-                left=left,
-                right=right,
-                operator=operator.value,
-            )
-
-        return left
-
-    def _parse_multiplicative_expression(self) -> Expression:
+    def _parse_binary_expression(self, min_precedence: int = 0) -> Expression:
+        # precedence climbing: one loop for every binary operator,
+        # a chain of the same level is built here without recursion
         left = self._parse_call_member_expression()
 
-        while self.at().value in {"*", "/", "%"}:
-            operator = self.eat()
-            right = self._parse_call_member_expression()
-            left = BinaryExpr(
-                left=left,
-                right=right,
-                operator=operator.value,
-            )
+        while True:
+            operator = self.current
+            if operator.type is not TokenType.BinaryOp and operator.type is not TokenType.LogicalOp:
+                break
+            precedence = OPERATOR_PRECEDENCE.get(operator.value, 0)
+            if precedence <= min_precedence:
+                break
+            self.eat()
+            right = self._parse_binary_expression(precedence)
+            if precedence <= _LOGICAL_PRECEDENCE:
+                left = LogicalExpr(left=left, right=right, operator=operator.value)
+            else:
+                left = BinaryExpr(left=left, right=right, operator=operator.value)
 
         return left
 
     def _parse_call_member_expression(self) -> Expression:
+        if self.at().type is TokenType.Await:
+            # 等待 binds tighter than any operator: 等待 f（） 加 1
+            self.eat()
+            return AwaitExpr(argument=self._parse_call_member_expression())
+
         # foo.x()
         member = self._parse_member_expression()
 
@@ -457,8 +526,10 @@ class Parser:
             case TokenType.Number:
                 if "." in self.at().value:
                     return NumberLiteral(value=float(self.eat().value))
-                else:
-                    return NumberLiteral(value=int(self.eat().value))
+                value = int(self.eat().value)
+                if value in _SMALL_NUMBERS:
+                    return _SMALL_NUMBERS[value]
+                return NumberLiteral(value=value)
             case TokenType.String:
                 return StringLiteral(value=self.eat().value)
             case TokenType.OpenParen:
@@ -470,9 +541,33 @@ class Parser:
                 )
                 self.eat()
                 return value
+            case TokenType.OpenBracket:
+                return self._parse_vector_literal()
             case _:
                 raise NotImplementedError(f"Unhandle token: {self.at()}")
 
+    def _parse_vector_literal(self) -> Expression:
+        self.eat()  # eat "《"
+        self._ignore_whitespaces()
+        elements = []
+        while not self.at_the_end() and self.at().type is not TokenType.CloseBracket:
+            elements.append(self._parse_expression())
+            self._ignore_whitespaces()
+            if self.at().type is not TokenType.CloseBracket:
+                self.expect(
+                    TokenType.Comma,
+                    "Expect a comma between vector elements."
+                )
+                self.eat()
+                self._ignore_whitespaces()
+
+        self.expect(
+            TokenType.CloseBracket,
+            "Expect a closing bracket after vector elements."
+        )
+        self.eat()
+        return VectorLiteral(elements=elements)
+
 
 if __name__ == "__main__":
     parser = Parser()
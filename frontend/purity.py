@@ -0,0 +1,181 @@
+"""
+which functions of a program are pure: called with the same arguments they
+give the same value and do nothing else, so the tree walker may remember
+their results instead of calling them again.
+"""
+from .chast import AssignmentExpr
+from .chast import AwaitExpr
+from .chast import BinaryExpr
+from .chast import CallExpr
+from .chast import ForStatement
+from .chast import FunctionDeclaration
+from .chast import Identifier
+from .chast import IfStatement
+from .chast import LogicalExpr
+from .chast import MemberExpr
+from .chast import ObjectLiteral
+from .chast import Program
+from .chast import Property
+from .chast import Statement
+from .chast import VariableDeclaration
+from .chast import VectorLiteral
+from .chast import WhileStatement
+from .optimizer import assigned_names
+
+# builtins that read or write the world, or whose value changes
+IMPURE_BUILTINS = frozenset({"輸入", "輸出", "print", "time", "逐行", "並行映射", "parallel_map"})
+
+
+def _scope_declarations(body: list[Statement]) -> list[Statement]:
+    # the declarations of one scope, those in if and while blocks included
+    declarations = []
+    for statement in body:
+        match statement:
+            case VariableDeclaration() | FunctionDeclaration():
+                declarations.append(statement)
+            case IfStatement():
+                declarations += _scope_declarations(statement.consequent)
+                declarations += _scope_declarations(statement.alternate)
+            case WhileStatement():
+                declarations += _scope_declarations(statement.body)
+            case ForStatement():
+                declarations.append(statement)
+                declarations += _scope_declarations(statement.body)
+    return declarations
+
+
+def _name(declaration: Statement) -> str:
+    # the variable a declaration or a for loop makes
+    return declaration.name if type(declaration) is FunctionDeclaration else declaration.identifier
+
+
+class PurityAnalysis:
+    """
+    finds the pure functions declared at the top level of a program.
+
+    A function is pure when, in its body and the functions declared in it,
+    - every assignment is to a variable of the function it is in,
+    - every call is to one of the pure functions, or to a builtin other
+      than IMPURE_BUILTINS,
+    - every other name it reads is its own, or a global that never
+      changes: a builtin const, or declared once at the top level by
+      `定義`, `常數`, or `令` and never assigned.
+
+    Functions declared `純粹` are taken to be pure without looking.
+    """
+
+    def __init__(self, program: Program, builtins: dict[str, bool] | None = None):
+        declarations = _scope_declarations(program.body)
+        counts = {}
+        for declaration in declarations:
+            counts[_name(declaration)] = counts.get(_name(declaration), 0) + 1
+
+        assigned = assigned_names(program)
+        # the builtins that can be called, and all names that keep their value
+        self.builtins = {
+            name for name, const in (builtins or {}).items()
+            if const and name not in counts and name not in IMPURE_BUILTINS
+        }
+        self.stable = set(self.builtins)
+        self.functions: dict[str, FunctionDeclaration] = {}
+        for declaration in program.body:
+            if type(declaration) is not VariableDeclaration and type(declaration) is not FunctionDeclaration:
+                continue
+            name = _name(declaration)
+            if counts[name] != 1 or name in assigned:
+                continue
+            self.stable.add(name)
+            if type(declaration) is FunctionDeclaration:
+                self.functions[name] = declaration
+
+    def pure_functions(self) -> set[str]:
+        """ the names of the pure top level functions """
+        calls = {}
+        for name, declaration in self.functions.items():
+            callees = set()
+            if declaration.memoize is not None:
+                calls[name] = callees
+            elif self._pure(declaration, [], callees):
+                calls[name] = callees
+
+        # a function is only as pure as what it calls, recursion included
+        pure = set(calls)
+        changed = True
+        while changed:
+            changed = False
+            for name in list(pure):
+                if not calls[name] <= pure | self.builtins:
+                    pure.discard(name)
+                    changed = True
+        return pure
+
+    def _pure(self, function: FunctionDeclaration, outer: list[set[str]], callees: set[str]) -> bool:
+        local = set(function.params)
+        local.update(_name(declaration) for declaration in _scope_declarations(function.body))
+        scopes = [local] + outer
+
+        def visible(name: str) -> bool:
+            return any(name in scope for scope in scopes) or name in self.stable
+
+        nodes = list(function.body)
+        while nodes:
+            node = nodes.pop()
+            match node:
+                case FunctionDeclaration():
+                    if not self._pure(node, scopes, callees):
+                        return False
+                case AssignmentExpr():
+                    if type(node.assigne) is not Identifier or node.assigne.symbol not in local:
+                        return False
+                case CallExpr():
+                    caller = node.caller
+                    if type(caller) is not Identifier or any(caller.symbol in scope for scope in scopes):
+                        return False  # calls whatever a variable holds
+                    callees.add(caller.symbol)
+                case Identifier():
+                    if not visible(node.symbol):
+                        return False
+                case Property(value=None):
+                    if not visible(node.key):
+                        return False
+            nodes.extend(_children(node))
+        return True
+
+
+def _children(node: Statement) -> list[Statement]:
+    # what a function body may contain under `node`, calls without their caller
+    match node:
+        case VariableDeclaration():
+            return [] if node.value is None else [node.value]
+        case IfStatement():
+            return [node.test, *node.consequent, *node.alternate]
+        case WhileStatement():
+            return [node.test, *node.body]
+        case ForStatement():
+            return [node.iterable, *node.body]
+        case AssignmentExpr():
+            return [node.value]
+        case CallExpr():
+            return node.args
+        case BinaryExpr() | LogicalExpr():
+            return [node.left, node.right]
+        case ObjectLiteral():
+            return node.properties
+        case VectorLiteral():
+            return node.elements
+        case AwaitExpr():
+            return [node.argument]
+        case Property():
+            return [] if node.value is None else [node.value]
+        case MemberExpr():
+            return [node.obj, node.prop] if node.computed else [node.obj]
+    return []
+
+
+def memoize(program: Program, size: int, builtins: dict[str, bool] | None = None) -> set[str]:
+    """ have the pure top level functions of `program` remember `size` results; their names """
+    pure = PurityAnalysis(program, builtins).pure_functions()
+    for statement in program.body:
+        if type(statement) is FunctionDeclaration and statement.name in pure:
+            statement.memoize = size
+    return pure
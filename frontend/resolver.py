@@ -0,0 +1,183 @@
+from typing import Self
+
+from .chast import AssignmentExpr
+from .chast import AwaitExpr
+from .chast import BinaryExpr
+from .chast import CallExpr
+from .chast import ForStatement
+from .chast import FunctionDeclaration
+from .chast import Identifier
+from .chast import IfStatement
+from .chast import LogicalExpr
+from .chast import MemberExpr
+from .chast import ObjectLiteral
+from .chast import Program
+from .chast import Property
+from .chast import Statement
+from .chast import VariableDeclaration
+from .chast import VectorLiteral
+from .chast import WhileStatement
+
+
+class ResolverError(Exception):
+    ...
+
+
+class _Scope:
+    """
+    the variables of a function body, each in a slot of its call frame,
+    or of the program, whose globals keep being looked up by name
+    """
+
+    def __init__(self, parent: Self | None):
+        self.parent = parent
+        self.slots: dict[str, int] = {}
+        self.consts: set[str] = set()
+        self.size = 0
+
+    def declare(self, name: str, const: bool = False):
+        if name not in self.slots:
+            self.slots[name] = self.size
+            self.size += 1
+        if const:
+            self.consts.add(name)
+
+
+class Resolver:
+    """
+    gives every variable the place it is stored in before the program runs:
+    how many function scopes up it is declared, and its slot in that call
+    frame. Undefined names and assignments to consts are reported here,
+    without waiting for the code to be reached.
+
+    Like the blocks they belong to, if, while and for bodies share the
+    scope of the function around them, and so does a for loop variable.
+    A name declared anywhere in a function is local to all of it.
+    """
+    scope: _Scope
+    line: int
+
+    def resolve(self, program: Program, globals: dict[str, bool] | None = None) -> Program:
+        """ annotate `program` in place; `globals` maps builtins to whether they are const """
+        self.scope = _Scope(None)
+        self.line = 0
+        for name, const in (globals or {}).items():
+            self.scope.declare(name, const)
+        self._collect(program.body)
+        self._block(program.body)
+        return program
+
+    def _error(self, message: str):
+        if self.line:
+            message = f"line {self.line}: {message}"
+        raise ResolverError(message)
+
+    def _collect(self, body: list[Statement]):
+        # the declarations of a scope, including those in nested blocks
+        for statement in body:
+            match statement:
+                case VariableDeclaration():
+                    self.scope.declare(statement.identifier, statement.const)
+                case FunctionDeclaration():
+                    self.scope.declare(statement.name, True)
+                case IfStatement():
+                    self._collect(statement.consequent)
+                    self._collect(statement.alternate)
+                case WhileStatement():
+                    self._collect(statement.body)
+                case ForStatement():
+                    self.scope.declare(statement.identifier)
+                    self._collect(statement.body)
+
+    def _find(self, name: str) -> tuple[int, int | None, _Scope]:
+        depth = 0
+        scope = self.scope
+        while name not in scope.slots:
+            if scope.parent is None:
+                self._error(f"Undefined {name!r}")
+            scope = scope.parent
+            depth += 1
+
+        if scope.parent is None:
+            return depth, None, scope
+        return depth, scope.slots[name], scope
+
+    def _local_slot(self, name: str) -> int | None:
+        if self.scope.parent is None:
+            return None
+        return self.scope.slots[name]
+
+    def _block(self, body: list[Statement]):
+        for statement in body:
+            line = self.line
+            self.line = statement.line or line
+            self._statement(statement)
+            self.line = line
+
+    def _statement(self, node: Statement):
+        match node:
+            case VariableDeclaration():
+                if node.value is not None:
+                    self._statement(node.value)
+                node.slot = self._local_slot(node.identifier)
+            case FunctionDeclaration():
+                node.slot = self._local_slot(node.name)
+
+                outer = self.scope
+                self.scope = _Scope(outer)
+                try:
+                    # arguments fill the first slots in order
+                    for param in node.params:
+                        self.scope.slots[param] = self.scope.size
+                        self.scope.size += 1
+                    self._collect(node.body)
+                    self._block(node.body)
+                    node.frame_size = self.scope.size
+                finally:
+                    self.scope = outer
+            case IfStatement():
+                self._statement(node.test)
+                self._block(node.consequent)
+                self._block(node.alternate)
+            case WhileStatement():
+                self._statement(node.test)
+                self._block(node.body)
+            case ForStatement():
+                self._statement(node.iterable)
+                node.slot = self._local_slot(node.identifier)
+                self._block(node.body)
+            case Identifier():
+                node.depth, node.slot, _ = self._find(node.symbol)
+            case AssignmentExpr():
+                self._statement(node.value)
+                if type(node.assigne) is Identifier:
+                    name = node.assigne.symbol
+                    node.assigne.depth, node.assigne.slot, scope = self._find(name)
+                    if name in scope.consts:
+                        self._error(f"reassign const {name!r}")
+                else:
+                    self._statement(node.assigne)
+            case BinaryExpr() | LogicalExpr():
+                self._statement(node.left)
+                self._statement(node.right)
+            case CallExpr():
+                for arg in node.args:
+                    self._statement(arg)
+                self._statement(node.caller)
+            case ObjectLiteral():
+                for prop in node.properties:
+                    self._statement(prop)
+            case VectorLiteral():
+                for element in node.elements:
+                    self._statement(element)
+            case AwaitExpr():
+                self._statement(node.argument)
+            case Property():
+                if node.value is None:
+                    node.depth, node.slot, _ = self._find(node.key)
+                else:
+                    self._statement(node.value)
+            case MemberExpr():
+                self._statement(node.obj)
+                if node.computed:
+                    self._statement(node.prop)
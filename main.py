@@ -1,5 +1,6 @@
+import functools
+import io
 import re
-import sys
 from argparse import ArgumentParser
 from collections import defaultdict
 
@@ -8,34 +9,107 @@ try:
     from rich import print
 except ImportError:
     pass
-from frontend.lexer import tokenize
+from frontend.cache import CACHE_DIRNAME
+from frontend.cache import ASTCache
+from frontend.cache import produce_ast_cached
+from frontend.lexer import tokenize_iter
+from frontend.optimizer import PassManager
+from frontend.parser import DEFAULT_MEMO_SIZE
 from frontend.parser import Parser
+from frontend.purity import memoize
+from frontend.resolver import Resolver
+from runtime import adaptive
+from runtime import closures
 from runtime import interpreter
+from runtime import stackwalker
+from runtime import transpiler
+from runtime.environment import FunctionValue
 from runtime.environment import create_global_env
+from runtime.vm import machine
+
+ENGINES = {
+    "tree": interpreter.evaluate,
+    "stack": stackwalker.execute,
+    "closure": closures.execute,
+    "adaptive": adaptive.execute,
+    "vm": machine.execute,
+    "python": transpiler.execute,
+}
 
 if __name__ == "__main__":
     argparser = ArgumentParser()
     argparser.add_argument("file", nargs="?", default="test.ch")
     argparser.add_argument("--cmd", "-c", help="program passed in as string (terminates option list)")
+    argparser.add_argument("--quiet", "-q", action="store_true", help="do not print the tokens, the syntax tree and the result")
+    argparser.add_argument("--no-cache", action="store_true", help=f"do not read or write compiled syntax trees in {CACHE_DIRNAME}")
+    argparser.add_argument("--engine", "-e", choices=ENGINES, default="tree", help="how to run the syntax tree")
+    argparser.add_argument("--optimize", "-O", action="store_true", help="fold constants, prune dead code and hoist loop invariants first")
+    argparser.add_argument("--dump-optimized", action="store_true", help="print the optimized syntax tree and what every pass changed (implies -O)")
+    argparser.add_argument("--memoize", action="store_true", help="remember the results of every pure function, with --engine tree")
+    argparser.add_argument("--memo-size", type=int, default=DEFAULT_MEMO_SIZE, metavar="SIZE", help=f"how many results --memoize remembers per function (default {DEFAULT_MEMO_SIZE})")
+    argparser.add_argument("--memo-stats", action="store_true", help="print how often the remembered results of each function were used")
+    argparser.add_argument("--allow-run", action="store_true", help="let the script run commands with 執行 (run)")
+    argparser.add_argument("--specialization-stats", action="store_true", help="print what every operator, call and global became, with --engine adaptive")
     args = argparser.parse_args()
 
     parser = Parser()
-    env = create_global_env()
+    env = create_global_env(args.allow_run)
 
+    ast_cache = None
     if args.cmd:
-        src = args.cmd
+        source = io.StringIO(args.cmd)
     else:
-        file = sys.argv[1] if len(sys.argv) > 1 else "test.ch"
-        with open(file) as fs:
-            src = fs.read()
+        file = args.file
+        source = open(file, "rb")
+        if not args.no_cache:
+            ast_cache = ASTCache.for_source(file)
+
+    with source:
+        if not args.quiet:
+            print(list(tokenize_iter(source)))
+            print("-----------")
+            source.seek(0)
 
-    print(tokenize(src))
-    print("-----------")
+        if ast_cache is not None:
+            program = produce_ast_cached(parser, source, ast_cache)
+        else:
+            # the parser pulls tokens from the file as it goes
+            program = parser.produce_ast(source)
+    if args.optimize or args.dump_optimized:
+        optimizer = PassManager()
+        program = optimizer.run(program)
+        if args.dump_optimized:
+            print(program)
+            for name, changes, seconds in optimizer.stats():
+                print(f"{name}: {changes} changes in {seconds * 1000:.2f} ms")
+            print("-----------")
 
-    program = parser.produce_ast(src)
-    print(program)
+    if args.memoize:
+        memoize(program, args.memo_size, env.visible_names())
 
-    print("-----------")
-    result = interpreter.evaluate(program, env)
-    print(result)
+    # undefined names and const reassignments fail here, before anything runs
+    Resolver().resolve(program, env.visible_names())
+    if not args.quiet:
+        print(program)
+        print("-----------")
 
+    engine = ENGINES[args.engine]
+    if args.engine == "python" and not args.cmd:
+        # tracebacks then show the lines of the script
+        engine = functools.partial(engine, filename=file)
+    sites = []
+    if args.engine == "adaptive" and args.specialization_stats:
+        engine = functools.partial(engine, sites=sites)
+    try:
+        result = engine(program, env)
+    finally:
+        for site in sites:
+            line, what, kind, hits, misses, deopts = site.stats()
+            print(f"line {line}: {what}: {kind}, {hits} hits, {misses} misses, {deopts} deopts")
+        if args.memo_stats:
+            for name, value in env.variables.items():
+                if type(value) is FunctionValue and value.memo is not None:
+                    memo = value.memo
+                    print(f"{name}: {memo.hits} hits, {memo.misses} misses, {memo.evictions} evictions, {len(memo.results)} remembered")
+    if not args.quiet:
+        print(result)
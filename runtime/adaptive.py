@@ -0,0 +1,703 @@
+"""
+execution engine that walks a tree of instructions made from the syntax
+tree once, in which operators, calls and global names rewrite themselves
+for what they meet, in the spirit of the specializing interpreter of
+CPython 3.11.
+
+Such an instruction starts out generic and counts down its runs. When the
+count reaches zero it swaps its `run` for a form specialized to what it
+saw on that run, which only checks that its guess still holds: both
+operands numbers, the same function again, a builtin nobody redeclares.
+A run where the check fails is a miss and takes the generic way; after
+MISS_LIMIT misses the instruction turns generic again and waits twice as
+long before it tries anew. Every instruction keeps how often its guesses
+hit and missed, see `execute`.
+"""
+from typing import Callable
+
+from frontend.chast import AssignmentExpr
+from frontend.chast import AwaitExpr
+from frontend.chast import BinaryExpr
+from frontend.chast import BooleanLiteral
+from frontend.chast import CallExpr
+from frontend.chast import ForStatement
+from frontend.chast import FunctionDeclaration
+from frontend.chast import Identifier
+from frontend.chast import IfStatement
+from frontend.chast import LogicalExpr
+from frontend.chast import NumberLiteral
+from frontend.chast import ObjectLiteral
+from frontend.chast import Program
+from frontend.chast import Statement
+from frontend.chast import StringLiteral
+from frontend.chast import VariableDeclaration
+from frontend.chast import VectorLiteral
+from frontend.chast import WhileStatement
+from frontend.optimizer import declared_names
+from runtime.aio import await_value
+from runtime.environment import FALSE
+from runtime.environment import NULL
+from runtime.environment import TRUE
+from runtime.environment import BooleanValue
+from runtime.environment import DictionaryValue
+from runtime.environment import Environment
+from runtime.environment import FunctionValue
+from runtime.environment import NativeFnValue
+from runtime.environment import NumberValue
+from runtime.environment import RuntimeValue
+from runtime.environment import StringValue
+from runtime.environment import iterate
+from runtime.environment import number
+from runtime.eval.expressions import BINARY_OPERATIONS
+from runtime.eval.expressions import LOGICAL_OPERATIONS
+from runtime.eval.expressions import _eval_binary_expr
+from runtime.eval.expressions import _eval_mixed_binary_expr
+from runtime.eval.expressions import _eval_mixed_logical_expr
+from runtime.eval.statements import is_truthy
+from runtime.vector import make_vector
+
+# runs of an instruction before it first specializes
+WARMUP = 8
+# misses of a specialized instruction before it turns generic again
+MISS_LIMIT = 16
+
+_NUMERIC_TYPES = frozenset({BooleanValue, NumberValue})
+_VALUE_TYPES = frozenset({BooleanValue, NumberValue, StringValue})
+
+
+class Instruction:
+    """ what a node of the syntax tree does, as `run(env)` """
+    __slots__ = ("run",)
+
+    run: Callable[[Environment], RuntimeValue]
+
+
+class Adaptive(Instruction):
+    """
+    an instruction that specializes itself. `kind` names its current form,
+    "generic" until it specializes; `hits` and `misses` count the runs of
+    the specialized forms whose guess held or did not, `deopts` how often
+    it had to give a form up.
+    """
+    __slots__ = ("node", "line", "kind", "countdown", "backoff", "budget", "hits", "misses", "deopts")
+
+    def __init__(self, node: Statement):
+        self.node = node
+        self.line = node.line
+        self.kind = "generic"
+        self.countdown = self.backoff = WARMUP
+        self.budget = MISS_LIMIT
+        self.hits = self.misses = self.deopts = 0
+        self.run = self.adaptive
+
+    def adaptive(self, env: Environment) -> RuntimeValue:
+        raise NotImplementedError
+
+    def specialize(self, kind: str, run: Callable[[Environment], RuntimeValue]):
+        self.kind = kind
+        self.budget = MISS_LIMIT
+        self.run = run
+
+    def give_up(self):
+        # nothing to specialize for what was seen, try again later
+        self.backoff *= 2
+        self.countdown = self.backoff
+
+    def miss(self):
+        self.misses += 1
+        self.budget -= 1
+        if not self.budget:
+            self.deopts += 1
+            self.kind = "generic"
+            self.run = self.adaptive
+            self.give_up()
+
+    def stats(self) -> tuple[int, str, str, int, int, int]:
+        """ (line, what, kind, hits, misses, deopts) """
+        return (self.line, self.describe(), self.kind, self.hits, self.misses, self.deopts)
+
+    def describe(self) -> str:
+        return type(self.node).__name__
+
+
+class Constant(Instruction):
+    __slots__ = ("value",)
+
+    def __init__(self, value: RuntimeValue):
+        self.value = value
+        self.run = self.constant
+
+    def constant(self, env: Environment) -> RuntimeValue:
+        return self.value
+
+
+class Block(Instruction):
+    __slots__ = ("body",)
+
+    def __init__(self, body: list[Instruction]):
+        self.body = body
+        self.run = self.block
+
+    def block(self, env: Environment) -> RuntimeValue:
+        result = NULL
+        for statement in self.body:
+            result = statement.run(env)
+        return result
+
+
+class Local(Instruction):
+    """ a variable in a slot of the current call frame """
+    __slots__ = ("symbol", "slot")
+
+    def __init__(self, node: Identifier):
+        self.symbol = node.symbol
+        self.slot = node.slot
+        self.run = self.local
+
+    def local(self, env: Environment) -> RuntimeValue:
+        value = env.slots[self.slot]
+        if value is None:
+            raise RuntimeError(f"Undefined {self.symbol!r}")
+        return value
+
+
+class Outer(Instruction):
+    """ a variable in a slot of an enclosing call frame """
+    __slots__ = ("symbol", "depth", "slot")
+
+    def __init__(self, node: Identifier):
+        self.symbol = node.symbol
+        self.depth = node.depth
+        self.slot = node.slot
+        self.run = self.outer
+
+    def outer(self, env: Environment) -> RuntimeValue:
+        return env.lookup_slot(self.symbol, self.depth, self.slot)
+
+
+class Named(Instruction):
+    """ a variable of a program that was not resolved, looked up by name """
+    __slots__ = ("symbol",)
+
+    def __init__(self, node: Identifier):
+        self.symbol = node.symbol
+        self.run = self.named
+
+    def named(self, env: Environment) -> RuntimeValue:
+        return env.lookup_variable(self.symbol)
+
+
+class Global(Adaptive):
+    """
+    a global name. A builtin the program never declares again is a
+    constant; any other global is read from the dictionary it was found in.
+    """
+    __slots__ = ("symbol", "depth", "declared", "value", "variables")
+
+    def __init__(self, node: Identifier, declared: set[str]):
+        super().__init__(node)
+        self.symbol = node.symbol
+        self.depth = node.depth
+        self.declared = declared
+
+    def describe(self) -> str:
+        return f"global {self.symbol}"
+
+    def adaptive(self, env: Environment) -> RuntimeValue:
+        base = env.ancestor(self.depth)
+        scope = base.resolve_var_scope(self.symbol)
+        value = scope.variables[self.symbol]
+        self.countdown -= 1
+        if not self.countdown:
+            if scope.parent is None and self.symbol in scope._consts and self.symbol not in self.declared:
+                self.value = value
+                self.specialize("builtin", self.builtin)
+            elif scope is base:
+                self.variables = scope.variables
+                self.specialize("global", self.load_global)
+            else:
+                self.give_up()
+        return value
+
+    def builtin(self, env: Environment) -> RuntimeValue:
+        self.hits += 1
+        return self.value
+
+    def load_global(self, env: Environment) -> RuntimeValue:
+        value = self.variables.get(self.symbol)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.miss()
+        return env.ancestor(self.depth).lookup_variable(self.symbol)
+
+
+class BinaryOp(Adaptive):
+    __slots__ = ("left", "right", "operator", "operation")
+
+    def __init__(self, node: BinaryExpr, left: Instruction, right: Instruction):
+        super().__init__(node)
+        self.left = left
+        self.right = right
+        self.operator = node.operator
+        self.operation = BINARY_OPERATIONS.get(node.operator)
+
+    def describe(self) -> str:
+        return f"binary {self.operator}"
+
+    def generic(self, lhs: RuntimeValue, rhs: RuntimeValue) -> RuntimeValue:
+        if type(lhs) not in _VALUE_TYPES or type(rhs) not in _VALUE_TYPES:
+            return _eval_mixed_binary_expr(lhs, rhs, self.operator)
+        return _eval_binary_expr(lhs.value, rhs.value, self.operator)
+
+    def adaptive(self, env: Environment) -> RuntimeValue:
+        lhs = self.left.run(env)
+        rhs = self.right.run(env)
+        self.countdown -= 1
+        if not self.countdown:
+            if type(lhs) is NumberValue and type(rhs) is NumberValue and self.operation is not None:
+                if self.operator == "+":
+                    self.specialize("add numbers", self.add_numbers)
+                elif self.operator == "-":
+                    self.specialize("subtract numbers", self.subtract_numbers)
+                else:
+                    self.specialize("numbers", self.numbers)
+            else:
+                self.give_up()
+        return self.generic(lhs, rhs)
+
+    def add_numbers(self, env: Environment) -> RuntimeValue:
+        lhs = self.left.run(env)
+        rhs = self.right.run(env)
+        if type(lhs) is NumberValue and type(rhs) is NumberValue:
+            self.hits += 1
+            return number(lhs.value + rhs.value)
+        self.miss()
+        return self.generic(lhs, rhs)
+
+    def subtract_numbers(self, env: Environment) -> RuntimeValue:
+        lhs = self.left.run(env)
+        rhs = self.right.run(env)
+        if type(lhs) is NumberValue and type(rhs) is NumberValue:
+            self.hits += 1
+            return number(lhs.value - rhs.value)
+        self.miss()
+        return self.generic(lhs, rhs)
+
+    def numbers(self, env: Environment) -> RuntimeValue:
+        lhs = self.left.run(env)
+        rhs = self.right.run(env)
+        if type(lhs) is NumberValue and type(rhs) is NumberValue:
+            self.hits += 1
+            return self.operation(lhs.value, rhs.value)
+        self.miss()
+        return self.generic(lhs, rhs)
+
+
+class LogicalOp(Adaptive):
+    __slots__ = ("left", "right", "operator", "operation")
+
+    def __init__(self, node: LogicalExpr, left: Instruction, right: Instruction):
+        super().__init__(node)
+        self.left = left
+        self.right = right
+        self.operator = node.operator
+        self.operation = LOGICAL_OPERATIONS.get(node.operator)
+
+    def describe(self) -> str:
+        return f"logical {self.operator}"
+
+    def generic(self, lhs: RuntimeValue, rhs: RuntimeValue) -> RuntimeValue:
+        if type(lhs) in _NUMERIC_TYPES and type(rhs) in _NUMERIC_TYPES:
+            if self.operation is None:
+                raise NotImplementedError(f"eval_logical_expr {self.operator=}")
+            return self.operation(lhs.value, rhs.value)
+        return _eval_mixed_logical_expr(lhs, rhs, self.operator)
+
+    def adaptive(self, env: Environment) -> RuntimeValue:
+        lhs = self.left.run(env)
+        rhs = self.right.run(env)
+        self.countdown -= 1
+        if not self.countdown:
+            if type(lhs) is NumberValue and type(rhs) is NumberValue and self.operation is not None:
+                if self.operator == "<":
+                    self.specialize("less numbers", self.less_numbers)
+                else:
+                    self.specialize("numbers", self.numbers)
+            elif type(lhs) is BooleanValue and type(rhs) is BooleanValue and self.operation is not None:
+                self.specialize("booleans", self.booleans)
+            else:
+                self.give_up()
+        return self.generic(lhs, rhs)
+
+    def less_numbers(self, env: Environment) -> RuntimeValue:
+        lhs = self.left.run(env)
+        rhs = self.right.run(env)
+        if type(lhs) is NumberValue and type(rhs) is NumberValue:
+            self.hits += 1
+            return TRUE if lhs.value < rhs.value else FALSE
+        self.miss()
+        return self.generic(lhs, rhs)
+
+    def numbers(self, env: Environment) -> RuntimeValue:
+        lhs = self.left.run(env)
+        rhs = self.right.run(env)
+        if type(lhs) is NumberValue and type(rhs) is NumberValue:
+            self.hits += 1
+            return self.operation(lhs.value, rhs.value)
+        self.miss()
+        return self.generic(lhs, rhs)
+
+    def booleans(self, env: Environment) -> RuntimeValue:
+        lhs = self.left.run(env)
+        rhs = self.right.run(env)
+        if type(lhs) is BooleanValue and type(rhs) is BooleanValue:
+            self.hits += 1
+            return self.operation(lhs.value, rhs.value)
+        self.miss()
+        return self.generic(lhs, rhs)
+
+
+class Call(Adaptive):
+    """
+    a call. It specializes to the function it called last: for a chlang
+    function its declaration, so the closures one declaration makes all
+    hit, for a builtin the builtin itself.
+    """
+    __slots__ = ("compiler", "args", "caller", "cached", "body", "frame_size", "count")
+
+    def __init__(self, node: CallExpr, compiler: "Compiler"):
+        super().__init__(node)
+        self.compiler = compiler
+        self.args = [compiler.compile(arg) for arg in node.args]
+        self.caller = compiler.compile(node.caller)
+
+    def describe(self) -> str:
+        if type(self.node.caller) is Identifier:
+            return f"call {self.node.caller.symbol}"
+        return "call"
+
+    def enter(self, fn: FunctionValue, values: list[RuntimeValue]) -> Environment:
+        if fn.frame_size is None:
+            scope = Environment(fn.declaration_env)
+            for varname, arg in zip(fn.parameters, values):
+                scope.declare_variable(varname, arg, False)
+            return scope
+        # parameters take the first slots, the rest wait for declarations
+        slots = [None] * fn.frame_size
+        count = min(len(values), len(fn.parameters))
+        slots[:count] = values[:count]
+        return Environment(fn.declaration_env, slots=slots)
+
+    def generic(self, fn: RuntimeValue, values: list[RuntimeValue]) -> RuntimeValue:
+        if type(fn) is NativeFnValue:
+            return fn.call(*values)
+        elif type(fn) is FunctionValue:
+            if fn.compiled is None:
+                fn.compiled = self.compiler.compile_block(fn.body)
+            return fn.compiled.run(self.enter(fn, values))
+        else:
+            raise NotImplementedError(f"can not call {fn=}")
+
+    def adaptive(self, env: Environment) -> RuntimeValue:
+        values = [arg.run(env) for arg in self.args]
+        fn = self.caller.run(env)
+        self.countdown -= 1
+        if not self.countdown:
+            if type(fn) is FunctionValue:
+                if fn.compiled is None:
+                    fn.compiled = self.compiler.compile_block(fn.body)
+                self.cached = fn.body
+                self.body = fn.compiled
+                self.frame_size = fn.frame_size
+                self.count = min(len(self.args), len(fn.parameters))
+                self.specialize("function", self.function if fn.frame_size is not None else self.unresolved_function)
+            elif type(fn) is NativeFnValue:
+                self.cached = fn
+                self.specialize("builtin", self.builtin)
+            else:
+                self.give_up()
+        return self.generic(fn, values)
+
+    def function(self, env: Environment) -> RuntimeValue:
+        values = [arg.run(env) for arg in self.args]
+        fn = self.caller.run(env)
+        if type(fn) is FunctionValue and fn.body is self.cached:
+            self.hits += 1
+            slots = [None] * self.frame_size
+            slots[:self.count] = values[:self.count]
+            return self.body.run(Environment(fn.declaration_env, slots=slots))
+        self.miss()
+        return self.generic(fn, values)
+
+    def unresolved_function(self, env: Environment) -> RuntimeValue:
+        values = [arg.run(env) for arg in self.args]
+        fn = self.caller.run(env)
+        if type(fn) is FunctionValue and fn.body is self.cached:
+            self.hits += 1
+            return self.body.run(self.enter(fn, values))
+        self.miss()
+        return self.generic(fn, values)
+
+    def builtin(self, env: Environment) -> RuntimeValue:
+        values = [arg.run(env) for arg in self.args]
+        fn = self.caller.run(env)
+        if fn is self.cached:
+            self.hits += 1
+            return fn.call(*values)
+        self.miss()
+        return self.generic(fn, values)
+
+
+class Assign(Instruction):
+    __slots__ = ("node", "value")
+
+    def __init__(self, node: AssignmentExpr, value: Instruction):
+        self.node = node
+        self.value = value
+        self.run = self.assign
+
+    def assign(self, env: Environment) -> RuntimeValue:
+        target = self.node.assigne
+        if type(target) is not Identifier:
+            raise NotImplementedError(f"trying to assign to {type(target)=}")
+        value = self.value.run(env)
+        if target.depth is None:
+            return env.assign_variable(target.symbol, value)
+        return env.assign_slot(target.symbol, target.depth, target.slot, value)
+
+
+class Declare(Instruction):
+    __slots__ = ("node", "value")
+
+    def __init__(self, node: VariableDeclaration, value: Instruction | None):
+        self.node = node
+        self.value = value
+        self.run = self.declare
+
+    def declare(self, env: Environment) -> RuntimeValue:
+        value = NULL if self.value is None else self.value.run(env)
+        node = self.node
+        if node.slot is not None:
+            env.slots[node.slot] = value
+            return value
+        return env.declare_variable(node.identifier, value, node.const)
+
+
+class DeclareFunction(Instruction):
+    __slots__ = ("node", "body")
+
+    def __init__(self, node: FunctionDeclaration, body: Instruction):
+        self.node = node
+        self.body = body
+        self.run = self.declare
+
+    def declare(self, env: Environment) -> RuntimeValue:
+        node = self.node
+        fn = FunctionValue(
+            name = node.name,
+            parameters = node.params,
+            declaration_env = env,
+            body = node.body,
+            compiled = self.body,
+            frame_size = node.frame_size,
+        )
+        if node.slot is not None:
+            env.slots[node.slot] = fn
+            return fn
+        return env.declare_variable(node.name, fn, True)
+
+
+class If(Instruction):
+    __slots__ = ("test", "consequent", "alternate")
+
+    def __init__(self, test: Instruction, consequent: Instruction, alternate: Instruction):
+        self.test = test
+        self.consequent = consequent
+        self.alternate = alternate
+        self.run = self.if_statement
+
+    def if_statement(self, env: Environment) -> RuntimeValue:
+        if is_truthy(self.test.run(env)):
+            return self.consequent.run(env)
+        return self.alternate.run(env)
+
+
+class While(Instruction):
+    __slots__ = ("test", "body")
+
+    def __init__(self, test: Instruction, body: list[Instruction]):
+        self.test = test
+        self.body = body
+        self.run = self.while_statement
+
+    def while_statement(self, env: Environment) -> RuntimeValue:
+        last_evaluated = NULL
+        while (value := self.test.run(env)) is TRUE or is_truthy(value):
+            for statement in self.body:
+                last_evaluated = statement.run(env)
+        return last_evaluated
+
+
+class For(Instruction):
+    __slots__ = ("node", "iterable", "body")
+
+    def __init__(self, node: ForStatement, iterable: Instruction, body: list[Instruction]):
+        self.node = node
+        self.iterable = iterable
+        self.body = body
+        self.run = self.for_statement
+
+    def for_statement(self, env: Environment) -> RuntimeValue:
+        last_evaluated = NULL
+        values = iterate(self.iterable.run(env))
+        slot = self.node.slot
+        if slot is not None:
+            slots = env.slots
+            for value in values:
+                slots[slot] = value
+                for statement in self.body:
+                    last_evaluated = statement.run(env)
+        else:
+            for value in values:
+                env.declare_variable(self.node.identifier, value, False)
+                for statement in self.body:
+                    last_evaluated = statement.run(env)
+        return last_evaluated
+
+
+class Object(Instruction):
+    __slots__ = ("node", "values")
+
+    def __init__(self, node: ObjectLiteral, values: list[Instruction | None]):
+        self.node = node
+        self.values = values
+        self.run = self.object_expr
+
+    def object_expr(self, env: Environment) -> RuntimeValue:
+        properties = {}
+        for prop, value in zip(self.node.properties, self.values):
+            if value is not None:
+                properties[prop.key] = value.run(env)
+            elif prop.depth is None:
+                properties[prop.key] = env.lookup_variable(prop.key)
+            else:
+                properties[prop.key] = env.lookup_slot(prop.key, prop.depth, prop.slot)
+        return DictionaryValue(properties=properties)
+
+
+class Vector(Instruction):
+    __slots__ = ("elements",)
+
+    def __init__(self, elements: list[Instruction]):
+        self.elements = elements
+        self.run = self.vector_expr
+
+    def vector_expr(self, env: Environment) -> RuntimeValue:
+        return make_vector(element.run(env) for element in self.elements)
+
+
+class Await(Instruction):
+    __slots__ = ("argument",)
+
+    def __init__(self, argument: Instruction):
+        self.argument = argument
+        self.run = self.await_expr
+
+    def await_expr(self, env: Environment) -> RuntimeValue:
+        return await_value(self.argument.run(env))
+
+
+class Unknown(Instruction):
+    __slots__ = ("node",)
+
+    def __init__(self, node: Statement):
+        self.node = node
+        self.run = self.unknown
+
+    def unknown(self, env: Environment) -> RuntimeValue:
+        # unknown nodes still only fail when they run
+        raise NotImplementedError(f"evaluate node={self.node!r}")
+
+
+class Compiler:
+    """ makes the instructions of a program, and keeps the adaptive ones in `sites` """
+
+    def __init__(self, program: Program):
+        self.declared = declared_names(program)
+        self.sites: list[Adaptive] = []
+        self.line = 0
+
+    def site(self, instruction: Adaptive) -> Adaptive:
+        # expressions have no line of their own, they get their statement's
+        instruction.line = self.line
+        self.sites.append(instruction)
+        return instruction
+
+    def compile_block(self, body: list[Statement]) -> Instruction:
+        instructions = [self.compile(statement) for statement in body]
+        if len(instructions) == 1:
+            return instructions[0]
+        return Block(instructions)
+
+    def compile(self, node: Statement) -> Instruction:
+        line = self.line
+        self.line = node.line or line
+        instruction = self._compile(node)
+        self.line = line
+        return instruction
+
+    def _compile(self, node: Statement) -> Instruction:
+        match node:
+            case NumberLiteral():
+                return Constant(number(node.value))
+            case StringLiteral():
+                return Constant(StringValue(node.value))
+            case BooleanLiteral():
+                return Constant(TRUE if node.value else FALSE)
+            case Identifier() if node.depth is None:
+                return Named(node)
+            case Identifier() if node.slot is None:
+                return self.site(Global(node, self.declared))
+            case Identifier() if node.depth == 0:
+                return Local(node)
+            case Identifier():
+                return Outer(node)
+            case ObjectLiteral():
+                values = [None if prop.value is None else self.compile(prop.value) for prop in node.properties]
+                return Object(node, values)
+            case VectorLiteral():
+                return Vector([self.compile(element) for element in node.elements])
+            case AwaitExpr():
+                return Await(self.compile(node.argument))
+            case CallExpr():
+                return self.site(Call(node, self))
+            case AssignmentExpr():
+                return Assign(node, self.compile(node.value))
+            case BinaryExpr():
+                return self.site(BinaryOp(node, self.compile(node.left), self.compile(node.right)))
+            case LogicalExpr():
+                return self.site(LogicalOp(node, self.compile(node.left), self.compile(node.right)))
+            case Program():
+                return Block([self.compile(statement) for statement in node.body])
+            case VariableDeclaration():
+                return Declare(node, None if node.value is None else self.compile(node.value))
+            case FunctionDeclaration():
+                return DeclareFunction(node, self.compile_block(node.body))
+            case IfStatement():
+                return If(self.compile(node.test), self.compile_block(node.consequent), self.compile_block(node.alternate))
+            case WhileStatement():
+                return While(self.compile(node.test), [self.compile(statement) for statement in node.body])
+            case ForStatement():
+                return For(node, self.compile(node.iterable), [self.compile(statement) for statement in node.body])
+            case _:
+                return Unknown(node)
+
+
+def execute(program: Program, env: Environment, sites: list[Adaptive] | None = None) -> RuntimeValue:
+    """ run `program`; its adaptive instructions are added to `sites` if given, for their counters """
+    compiler = Compiler(program)
+    code = compiler.compile(program)
+    if sites is not None:
+        sites.extend(compiler.sites)
+    return code.run(env)
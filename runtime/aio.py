@@ -0,0 +1,125 @@
+"""
+asyncio for chlang: native functions that are coroutines run on an event
+loop in a thread of its own, so the engines stay synchronous and a script
+that never starts one pays nothing for it.
+
+Calling an async native function starts it and gives a FutureValue at
+once; `等待` blocks until it is done and gives its value. Calls started
+before the first `等待` overlap, and `收集` waits for several at once.
+"""
+import asyncio
+import functools
+import os
+import shlex
+import threading
+from typing import Callable
+from typing import Coroutine
+
+from runtime.environment import FutureValue
+from runtime.environment import IteratorValue
+from runtime.environment import NumberValue
+from runtime.environment import RuntimeValue
+from runtime.environment import StringValue
+from runtime.environment import _wrap
+from runtime.environment import iterate
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="chlang-asyncio", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def _forget_loop():
+    # a forked process, e.g. a worker of 並行映射, has the loop but not its thread
+    global _loop
+    _loop = None
+
+
+os.register_at_fork(after_in_child=_forget_loop)
+
+
+async def _wrapped(coroutine: Coroutine) -> RuntimeValue:
+    return _wrap(await coroutine)
+
+
+def start(coroutine: Coroutine) -> FutureValue:
+    """ run `coroutine` on the event loop, its result wrapped like rtn_wrapper does """
+    return FutureValue(asyncio.run_coroutine_threadsafe(_wrapped(coroutine), _event_loop()))
+
+
+def async_wrapper(fn: Callable[..., Coroutine]) -> Callable[..., FutureValue]:
+    """ rtn_wrapper for a coroutine function: the call starts it """
+    @functools.wraps(fn)
+    def wrapper(*args):
+        return start(fn(*args))
+    return wrapper
+
+
+def await_value(value: RuntimeValue) -> RuntimeValue:
+    """ what `等待 value` gives: the result of a future, anything else as it is """
+    if type(value) is FutureValue:
+        return value.future.result()
+    return value
+
+
+async def _gather(values: tuple[RuntimeValue, ...]) -> IteratorValue:
+    async def result(value: RuntimeValue) -> RuntimeValue:
+        if type(value) is FutureValue:
+            return await asyncio.wrap_future(value.future)
+        return value
+    return IteratorValue(iter(await asyncio.gather(*map(result, values))))
+
+
+def gather(*values: RuntimeValue) -> FutureValue:
+    # 收集（甲、乙、…） or 收集（序列）: one future of all their results, in order
+    if len(values) == 1 and type(values[0]) is not FutureValue:
+        values = tuple(iterate(values[0]))
+    return start(_gather(values))
+
+
+async def _sleep(seconds: RuntimeValue) -> None:
+    if type(seconds) is not NumberValue:
+        raise RuntimeError(f"Expected NumberValue, got {seconds!r}")
+    await asyncio.sleep(seconds.value)
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+async def _read_file(path: RuntimeValue) -> str:
+    if type(path) is not StringValue:
+        raise RuntimeError(f"Expected StringValue, got {path!r}")
+    return await asyncio.to_thread(_read, path.value)
+
+
+async def _run(command: RuntimeValue) -> str:
+    # the output of a command, split like a shell would but run without one
+    if type(command) is not StringValue:
+        raise RuntimeError(f"Expected StringValue, got {command!r}")
+    process = await asyncio.create_subprocess_exec(*shlex.split(command.value), stdout=asyncio.subprocess.PIPE)
+    output, _ = await process.communicate()
+    if process.returncode:
+        raise RuntimeError(f"{command.value!r} exited with {process.returncode}")
+    return output.decode()
+
+
+# the async builtins, by their names
+ASYNC_BUILTINS = [
+    (("睡眠", "sleep"), _sleep),
+    (("讀檔", "read_file"), _read_file),
+]
+
+# runs any command, so only there when asked for, see create_global_env
+RUN_NAMES = ("執行", "run")
+RUN_BUILTINS = [(RUN_NAMES, _run)]
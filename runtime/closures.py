@@ -0,0 +1,321 @@
+"""
+execution engine that turns a Program once into a tree of python closures,
+so what a node does is decided when it is compiled, not every time it runs
+"""
+from typing import Callable
+
+from frontend.chast import AssignmentExpr
+from frontend.chast import AwaitExpr
+from frontend.chast import BinaryExpr
+from frontend.chast import BooleanLiteral
+from frontend.chast import CallExpr
+from frontend.chast import ForStatement
+from frontend.chast import FunctionDeclaration
+from frontend.chast import Identifier
+from frontend.chast import IfStatement
+from frontend.chast import LogicalExpr
+from frontend.chast import NumberLiteral
+from frontend.chast import ObjectLiteral
+from frontend.chast import Program
+from frontend.chast import Statement
+from frontend.chast import StringLiteral
+from frontend.chast import VariableDeclaration
+from frontend.chast import VectorLiteral
+from frontend.chast import WhileStatement
+from runtime.aio import await_value
+from runtime.environment import FALSE
+from runtime.environment import NULL
+from runtime.environment import TRUE
+from runtime.environment import BooleanValue
+from runtime.environment import DictionaryValue
+from runtime.environment import Environment
+from runtime.environment import FunctionValue
+from runtime.environment import NativeFnValue
+from runtime.environment import NumberValue
+from runtime.environment import RuntimeValue
+from runtime.environment import StringValue
+from runtime.environment import iterate
+from runtime.environment import number
+from runtime.eval.expressions import BINARY_OPERATIONS
+from runtime.eval.expressions import LOGICAL_OPERATIONS
+from runtime.eval.expressions import _eval_binary_expr
+from runtime.eval.expressions import _eval_mixed_binary_expr
+from runtime.eval.expressions import _eval_mixed_logical_expr
+from runtime.eval.statements import is_truthy
+from runtime.vector import make_vector
+
+Code = Callable[[Environment], RuntimeValue]
+
+# values that logical operators accept, and whose truth is `value != 0`
+_NUMERIC_TYPES = frozenset({BooleanValue, NumberValue})
+# values that have a `.value` for binary operators
+_VALUE_TYPES = frozenset({BooleanValue, NumberValue, StringValue})
+
+
+def _compile_block(body: list[Statement]) -> Code:
+    codes = [compile_node(statement) for statement in body]
+
+    if not codes:
+        return lambda env: NULL
+    if len(codes) == 1:
+        return codes[0]
+
+    def block(env: Environment) -> RuntimeValue:
+        for code in codes:
+            result = code(env)
+        return result
+    return block
+
+
+def _function_scope(env: Environment, depth: int, name: str) -> Environment:
+    # the scope the resolver found a function variable in, once it is declared there
+    scope = env.ancestor(depth)
+    if name not in scope.variables:
+        raise RuntimeError(f"Undefined {name!r}")
+    return scope
+
+
+def _compile_identifier(node: Identifier) -> Code:
+    symbol = node.symbol
+
+    if node.slot is not None:
+        # a variable of a function is never looked for outside of it, even
+        # before it is declared
+        depth = node.depth
+        if depth == 0:
+            def local(env: Environment) -> RuntimeValue:
+                value = env.variables.get(symbol)
+                if value is None:
+                    raise RuntimeError(f"Undefined {symbol!r}")
+                return value
+            return local
+        return lambda env: _function_scope(env, depth, symbol).variables[symbol]
+
+    def identifier(env: Environment) -> RuntimeValue:
+        # Environment.lookup_variable, walking the scopes in a loop
+        scope = env
+        while symbol not in scope.variables:
+            scope = scope.parent
+            if scope is None:
+                raise RuntimeError(f"Undefined {symbol!r}")
+        return scope.variables[symbol]
+    return identifier
+
+
+def _compile_variable_declaration(node: VariableDeclaration) -> Code:
+    name, const = node.identifier, node.const
+    if node.value is None:
+        return lambda env: env.declare_variable(name, NULL, const)
+
+    value = compile_node(node.value)
+    return lambda env: env.declare_variable(name, value(env), const)
+
+
+def _compile_function_declaration(node: FunctionDeclaration) -> Code:
+    body = _compile_block(node.body)
+
+    def declare(env: Environment) -> RuntimeValue:
+        fn = FunctionValue(
+            name = node.name,
+            parameters = node.params,
+            declaration_env = env,
+            body = node.body,
+            compiled = body,
+        )
+        return env.declare_variable(node.name, fn, True)
+    return declare
+
+
+def _compile_if_statement(node: IfStatement) -> Code:
+    test = compile_node(node.test)
+    consequent = _compile_block(node.consequent)
+    alternate = _compile_block(node.alternate)
+
+    def if_statement(env: Environment) -> RuntimeValue:
+        value = test(env)
+        if type(value) in _NUMERIC_TYPES:
+            # same as is_truthy, without going through the patterns
+            true = value.value != 0
+        else:
+            true = is_truthy(value)
+        if true:
+            return consequent(env)
+        return alternate(env)
+    return if_statement
+
+
+def _compile_while_statement(node: WhileStatement) -> Code:
+    test = compile_node(node.test)
+    codes = [compile_node(statement) for statement in node.body]
+
+    def while_statement(env: Environment) -> RuntimeValue:
+        last_evaluated = NULL
+        # a comparison gives TRUE, which needs no is_truthy
+        while (value := test(env)) is TRUE or is_truthy(value):
+            for code in codes:
+                last_evaluated = code(env)
+        return last_evaluated
+    return while_statement
+
+
+def _compile_for_statement(node: ForStatement) -> Code:
+    iterable = compile_node(node.iterable)
+    codes = [compile_node(statement) for statement in node.body]
+    name = node.identifier
+
+    def for_statement(env: Environment) -> RuntimeValue:
+        last_evaluated = NULL
+        for value in iterate(iterable(env)):
+            env.declare_variable(name, value, False)
+            for code in codes:
+                last_evaluated = code(env)
+        return last_evaluated
+    return for_statement
+
+
+def _compile_assignment(node: AssignmentExpr) -> Code:
+    if type(node.assigne) is not Identifier:
+        def assign_unknown(env: Environment) -> RuntimeValue:
+            raise NotImplementedError(f"trying to assign to {type(node.assigne)=}")
+        return assign_unknown
+
+    name = node.assigne.symbol
+    value = compile_node(node.value)
+    if node.assigne.slot is not None:
+        depth = node.assigne.depth
+
+        def assign_local(env: Environment) -> RuntimeValue:
+            result = value(env)
+            return _function_scope(env, depth, name).assign_variable(name, result)
+        return assign_local
+    return lambda env: env.assign_variable(name, value(env))
+
+
+def _compile_binary_expr(node: BinaryExpr) -> Code:
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+    operator = node.operator
+    operation = BINARY_OPERATIONS.get(operator)
+    if operation is None:
+        # unknown operators still only fail when they run
+        operation = lambda lhs, rhs: _eval_binary_expr(lhs, rhs, operator)
+
+    def binary_expr(env: Environment) -> RuntimeValue:
+        lhs = left(env)
+        rhs = right(env)
+        if type(lhs) not in _VALUE_TYPES or type(rhs) not in _VALUE_TYPES:
+            return _eval_mixed_binary_expr(lhs, rhs, operator)
+        return operation(lhs.value, rhs.value)
+    return binary_expr
+
+
+def _compile_logical_expr(node: LogicalExpr) -> Code:
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+    operator = node.operator
+    operation = LOGICAL_OPERATIONS.get(operator)
+
+    def logical_expr(env: Environment) -> RuntimeValue:
+        lhs = left(env)
+        rhs = right(env)
+        if type(lhs) in _NUMERIC_TYPES and type(rhs) in _NUMERIC_TYPES:
+            if operation is None:
+                raise NotImplementedError(f"eval_logical_expr {operator=}")
+            return operation(lhs.value, rhs.value)
+        return _eval_mixed_logical_expr(lhs, rhs, operator)
+    return logical_expr
+
+
+def _compile_object_expr(node: ObjectLiteral) -> Code:
+    properties = []
+    for prop in node.properties:
+        if prop.value is None:
+            # shorthand properties are read like identifiers
+            properties.append((prop.key, _compile_identifier(Identifier(prop.key, depth=prop.depth, slot=prop.slot))))
+        else:
+            properties.append((prop.key, compile_node(prop.value)))
+
+    def object_expr(env: Environment) -> RuntimeValue:
+        return DictionaryValue(properties={key: value(env) for key, value in properties})
+    return object_expr
+
+
+def _compile_vector_expr(node: VectorLiteral) -> Code:
+    elements = [compile_node(element) for element in node.elements]
+    return lambda env: make_vector(element(env) for element in elements)
+
+
+def _compile_await_expr(node: AwaitExpr) -> Code:
+    argument = compile_node(node.argument)
+    return lambda env: await_value(argument(env))
+
+
+def _compile_call_expr(node: CallExpr) -> Code:
+    args = [compile_node(arg) for arg in node.args]
+    caller = compile_node(node.caller)
+
+    def call_expr(env: Environment) -> RuntimeValue:
+        values = [arg(env) for arg in args]
+        fn = caller(env)
+
+        if type(fn) is NativeFnValue:
+            return fn.call(*values)
+        elif type(fn) is FunctionValue:
+            scope = Environment(fn.declaration_env)
+            # TODO: check the bounds of args, verity arity of function
+            scope.variables.update(zip(fn.parameters, values))
+            if fn.compiled is None:
+                fn.compiled = _compile_block(fn.body)
+            return fn.compiled(scope)
+        else:
+            raise NotImplementedError(f"can not call {fn=}")
+    return call_expr
+
+
+def compile_node(node: Statement) -> Code:
+    match node:
+        case NumberLiteral():
+            value = number(node.value)
+            return lambda env: value
+        case StringLiteral():
+            value = StringValue(node.value)
+            return lambda env: value
+        case BooleanLiteral():
+            value = TRUE if node.value else FALSE
+            return lambda env: value
+        case Identifier():
+            return _compile_identifier(node)
+        case ObjectLiteral():
+            return _compile_object_expr(node)
+        case VectorLiteral():
+            return _compile_vector_expr(node)
+        case AwaitExpr():
+            return _compile_await_expr(node)
+        case CallExpr():
+            return _compile_call_expr(node)
+        case AssignmentExpr():
+            return _compile_assignment(node)
+        case BinaryExpr():
+            return _compile_binary_expr(node)
+        case LogicalExpr():
+            return _compile_logical_expr(node)
+        case Program():
+            return _compile_block(node.body)
+        case VariableDeclaration():
+            return _compile_variable_declaration(node)
+        case FunctionDeclaration():
+            return _compile_function_declaration(node)
+        case IfStatement():
+            return _compile_if_statement(node)
+        case WhileStatement():
+            return _compile_while_statement(node)
+        case ForStatement():
+            return _compile_for_statement(node)
+        case _:
+            def unknown(env: Environment) -> RuntimeValue:
+                raise NotImplementedError(f"evaluate {node=}")
+            return unknown
+
+
+def execute(program: Program, env: Environment) -> RuntimeValue:
+    return compile_node(program)(env)
@@ -1,14 +1,21 @@
 import functools
+import sys
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import Future
 from dataclasses import dataclass
 from dataclasses import field
+from typing import Any
 from typing import Callable
 from typing import Self
 
 from frontend.chast import Statement
 
 
-@dataclass
+@dataclass(slots=True)
 class RuntimeValue:
+    # a value is never changed once made, so the same value can be shared;
+    # see TRUE, FALSE, NULL and number() at the end of this module
     ...
 
 
@@ -17,11 +24,18 @@ class Environment:
     parent: None | Self = field(default=None)
     variables: dict[str, RuntimeValue] = field(default_factory=dict)
     _consts: set[str] = field(default_factory=set)
+    # the variables of a resolved function call, by slot; None until declared
+    slots: list[RuntimeValue | None] | None = field(default=None)
+    # changes whenever one of the variables gets or loses a function,
+    # so call sites may keep the functions they found until it does
+    version: int = field(default=0)
 
     def declare_variable(self, name: str, value: RuntimeValue, is_const:bool=False) -> RuntimeValue:
         # if name in self.variables:
         #     raise RuntimeError(f"redefine {name!r}")
 
+        if type(value) in _FUNCTION_TYPES or type(self.variables.get(name)) in _FUNCTION_TYPES:
+            self.version += 1
         self.variables[name] = value
         if is_const:
             self._consts.add(name)
@@ -32,6 +46,8 @@ class Environment:
         if name in env._consts:
             raise RuntimeError(f"reassign const {name!r}")
 
+        if type(value) in _FUNCTION_TYPES or type(env.variables[name]) in _FUNCTION_TYPES:
+            env.version += 1
         env.variables[name] = value
         return value
 
@@ -39,6 +55,41 @@ class Environment:
         env = self.resolve_var_scope(name)
         return env.variables[name]
 
+    def ancestor(self, depth: int) -> Self:
+        env = self
+        for _ in range(depth):
+            env = env.parent
+        return env
+
+    def lookup_slot(self, name: str, depth: int, slot: int | None) -> RuntimeValue:
+        # a variable where the resolver found it, globals still go by name
+        env = self.ancestor(depth)
+        if slot is None:
+            return env.lookup_variable(name)
+
+        value = env.slots[slot]
+        if value is None:
+            raise RuntimeError(f"Undefined {name!r}")
+        return value
+
+    def assign_slot(self, name: str, depth: int, slot: int | None, value: RuntimeValue) -> RuntimeValue:
+        # consts were rejected by the resolver, globals still go by name
+        env = self.ancestor(depth)
+        if slot is None:
+            return env.assign_variable(name, value)
+
+        if env.slots[slot] is None:
+            raise RuntimeError(f"Undefined {name!r}")
+        env.slots[slot] = value
+        return value
+
+    def visible_names(self) -> dict[str, bool]:
+        """ every name that can be looked up from here, and whether it is const """
+        names = {} if self.parent is None else self.parent.visible_names()
+        for name in self.variables:
+            names[name] = name in self._consts
+        return names
+
     def resolve_var_scope(self, varname: str) -> Self:
         if varname in self.variables:
             return self
@@ -49,27 +100,54 @@ class Environment:
         return self.parent.resolve_var_scope(varname)
 
 
+def _wrap(rtn) -> RuntimeValue:
+    match rtn:
+        case int() | float():
+            return number(rtn)
+        case str():
+            return StringValue(rtn)
+        case bool():
+            return TRUE if rtn else FALSE
+        case dict():
+            return DictionaryValue({k: _wrap(v) for k, v in rtn.items()})
+        case None:
+            return NULL
+        case range():
+            return RangeValue(rtn.start, rtn.stop, rtn.step)
+        case Iterator():
+            # wrapped as they come, a generator is never run ahead
+            return IteratorValue(map(_wrap, rtn))
+        case RuntimeValue():
+            return rtn
+        case _:
+            raise NotImplementedError(f"Unknown return type {rtn=!r}")
+
+
 def rtn_wrapper(fn: Callable) -> Callable:
     @functools.wraps(fn)
     def wrapper(*args):
         # TODO: support keyward arguments
-        rtn = fn(*args)
-        match rtn:
-            case int() | float():
-                return NumberValue(rtn)
-            case str():
-                return StringValue(rtn)
-            case bool():
-                return BooleanValue(rtn)
-            case dict():
-                return DictionaryValue({k: rtn_wrapper(v) for k, v in rtn.items()})
-            case None:
-                return NullValue()
-            case _:
-                raise NotImplementedError(f"Unknown return type {rtn=!r}")
+        return _wrap(fn(*args))
     return wrapper
 
 
+def iterate(value: RuntimeValue) -> Iterator[RuntimeValue]:
+    """ the values a for loop goes through, made one at a time """
+    match value:
+        case RangeValue():
+            return map(number, range(value.start, value.stop, value.step))
+        case IteratorValue():
+            return value.iterator
+        case StringValue():
+            return map(StringValue, value.value)
+        case DictionaryValue():
+            return map(StringValue, value.properties)
+        case VectorValue():
+            return map(number, value.values.tolist())
+        case _:
+            raise NotImplementedError(f"can not iterate {value=}")
+
+
 def _int(arg: RuntimeValue) -> RuntimeValue:
     match arg:
         case StringValue():
@@ -78,21 +156,67 @@ def _int(arg: RuntimeValue) -> RuntimeValue:
             raise RuntimeError(f"Expected NumberValue, got {arg!r}")
 
 
-def create_global_env() -> Environment:
+def _range(*args: RuntimeValue) -> range:
+    for arg in args:
+        if type(arg) is not NumberValue or type(arg.value) is not int:
+            raise RuntimeError(f"Expected an integer NumberValue, got {arg!r}")
+    return range(*(arg.value for arg in args))
+
+
+def _lines(path: RuntimeValue | None = None) -> Iterator[str]:
+    # a line at a time, so a large input is never read whole
+    if path is None:
+        for line in sys.stdin:
+            yield line.rstrip("\r\n")
+        return
+    if type(path) is not StringValue:
+        raise RuntimeError(f"Expected StringValue, got {path!r}")
+    with open(path.value, encoding="utf-8") as file:
+        for line in file:
+            yield line.rstrip("\r\n")
+
+
+def create_global_env(allow_run: bool = False) -> Environment:
     env = Environment()
     # create default global environment
-    env.declare_variable("True", BooleanValue(True), True)
-    env.declare_variable("False", BooleanValue(False), True)
-    env.declare_variable("是", BooleanValue(True), True)
-    env.declare_variable("否", BooleanValue(False), True)
-    env.declare_variable("Null", NullValue(), True)
-    env.declare_variable("空", NullValue(), True)
+    env.declare_variable("True", TRUE, True)
+    env.declare_variable("False", FALSE, True)
+    env.declare_variable("是", TRUE, True)
+    env.declare_variable("否", FALSE, True)
+    env.declare_variable("Null", NULL, True)
+    env.declare_variable("空", NULL, True)
 
     # define a native builtin method
     env.declare_variable("print", NativeFnValue(rtn_wrapper(print)), True)
     env.declare_variable("輸入", NativeFnValue(rtn_wrapper(input)), True)
     env.declare_variable("輸出", NativeFnValue(rtn_wrapper(print)), True)
     env.declare_variable("整數", NativeFnValue(rtn_wrapper(_int)), True)
+    env.declare_variable("範圍", NativeFnValue(rtn_wrapper(_range)), True)
+    env.declare_variable("逐行", NativeFnValue(rtn_wrapper(_lines)), True)
+
+    # not const: scripts already use names like 總和 for their own variables
+    from runtime.vector import REDUCTIONS
+    from runtime.vector import to_vector
+    env.declare_variable("向量", NativeFnValue(rtn_wrapper(to_vector)))
+    env.declare_variable("vector", NativeFnValue(rtn_wrapper(to_vector)))
+    for names, reduction in REDUCTIONS:
+        for name in names:
+            env.declare_variable(name, NativeFnValue(rtn_wrapper(reduction)))
+
+    from runtime.aio import ASYNC_BUILTINS
+    from runtime.aio import RUN_BUILTINS
+    from runtime.aio import async_wrapper
+    from runtime.aio import gather
+    env.declare_variable("收集", NativeFnValue(rtn_wrapper(gather)))
+    env.declare_variable("gather", NativeFnValue(rtn_wrapper(gather)))
+    # 執行 runs any command, so a script only gets it when whoever runs the script says so
+    for names, coroutine in ASYNC_BUILTINS + RUN_BUILTINS if allow_run else ASYNC_BUILTINS:
+        for name in names:
+            env.declare_variable(name, NativeFnValue(async_wrapper(coroutine)))
+
+    from runtime.parallel import parallel_map
+    env.declare_variable("並行映射", NativeFnValue(rtn_wrapper(parallel_map)), True)
+    env.declare_variable("parallel_map", NativeFnValue(rtn_wrapper(parallel_map)), True)
 
     from datetime import datetime
     env.declare_variable("time", NativeFnValue(rtn_wrapper(datetime.now().timestamp)), True)
@@ -100,41 +224,144 @@ def create_global_env() -> Environment:
     return env
 
 
-@dataclass
+@dataclass(slots=True)
 class NullValue(RuntimeValue):
     ...
 
 
-@dataclass
+@dataclass(slots=True)
 class NumberValue(RuntimeValue):
     value: int | float
 
 
-@dataclass
+@dataclass(slots=True)
 class StringValue(RuntimeValue):
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BooleanValue(RuntimeValue):
     value: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class DictionaryValue(RuntimeValue):
     properties: dict[str, RuntimeValue]
 
 
+@dataclass(slots=True)
+class RangeValue(RuntimeValue):
+    # the ints of range(start, stop, step), only made when iterated
+    start: int
+    stop: int
+    step: int = 1
+
+
+@dataclass(slots=True)
+class IteratorValue(RuntimeValue):
+    # values coming from a python iterator, e.g. a generator of a builtin;
+    # unlike other values it changes, iterating it uses it up
+    iterator: Iterator[RuntimeValue]
+
+
+@dataclass(slots=True)
+class VectorValue(RuntimeValue):
+    # numbers kept unboxed, in an array.array or a numpy array;
+    # see runtime.vector for what works on them
+    values: Any
+
+    def __len__(self) -> int:
+        # an empty vector is falsy, also as a plain python value
+        return len(self.values)
+
+
+@dataclass(slots=True)
+class FutureValue(RuntimeValue):
+    # what an async native function started, see runtime.aio;
+    # like IteratorValue it changes, once it is done
+    future: Future
+
+
 FunctionCall = Callable[[list[RuntimeValue], Environment], RuntimeValue]
-@dataclass
+@dataclass(slots=True)
 class NativeFnValue(RuntimeValue):
     call: FunctionCall
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionValue(RuntimeValue):
     name: str
     parameters: list[str]
     declaration_env: Environment
     body: list[Statement]
-
+    # the body as prepared by an execution engine other than the tree walker
+    compiled: Any = field(default=None, repr=False, compare=False)
+    # number of slots for the variables of a call, None if not resolved
+    frame_size: int | None = field(default=None, repr=False, compare=False)
+    # the results of earlier calls, for a function that is pure
+    memo: "Memo | None" = field(default=None, repr=False, compare=False)
+
+
+@dataclass(slots=True)
+class Memo:
+    """
+    results by arguments, the least recently used dropped beyond `size`.
+    Only arguments that are numbers, strings, booleans or Null have a key.
+    """
+    size: int
+    results: OrderedDict = field(default_factory=OrderedDict)
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @staticmethod
+    def key(args: list[RuntimeValue]) -> tuple | None:
+        key = []
+        for arg in args:
+            kind = type(arg)
+            if kind is NumberValue or kind is StringValue or kind is BooleanValue:
+                # 1 and 1.0 are equal, but give different results
+                key.append((kind, type(arg.value), arg.value))
+            elif kind is NullValue:
+                key.append(kind)
+            else:
+                return None
+        return tuple(key)
+
+    def get(self, key: tuple) -> RuntimeValue | None:
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key: tuple, result: RuntimeValue):
+        self.results[key] = result
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+            self.evictions += 1
+
+
+_FUNCTION_TYPES = frozenset({FunctionValue, NativeFnValue})
+
+NULL = NullValue()
+TRUE = BooleanValue(True)
+FALSE = BooleanValue(False)
+
+# the ints most loops count with are made once and shared, like python does
+SMALL_NUMBER_RANGE = range(-128, 4096)
+_SMALL_NUMBERS = [NumberValue(i) for i in SMALL_NUMBER_RANGE]
+_SMALL_MIN = SMALL_NUMBER_RANGE.start
+_SMALL_MAX = SMALL_NUMBER_RANGE.stop
+
+
+def number(value: int | float) -> NumberValue:
+    if type(value) is int and _SMALL_MIN <= value < _SMALL_MAX:
+        return _SMALL_NUMBERS[value - _SMALL_MIN]
+    return NumberValue(value)
+
+
+def boolean(value) -> BooleanValue:
+    return TRUE if value else FALSE
@@ -1,9 +1,14 @@
 from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
+from threading import get_ident
 from typing import Callable
 
 from frontend.chast import AssignmentExpr
+from frontend.chast import AwaitExpr
 from frontend.chast import BinaryExpr
 from frontend.chast import CallExpr
+from frontend.chast import FunctionDeclaration
 from frontend.chast import Identifier
 from frontend.chast import LogicalExpr
 from frontend.chast import NumberLiteral
@@ -11,71 +16,115 @@ from frontend.chast import ObjectLiteral
 from frontend.chast import Program
 from frontend.chast import Statement
 from frontend.chast import VariableDeclaration
+from frontend.chast import VectorLiteral
+from runtime.aio import await_value
+from runtime.environment import FALSE
+from runtime.environment import NULL
+from runtime.environment import TRUE
 from runtime.environment import BooleanValue
 from runtime.environment import DictionaryValue
 from runtime.environment import Environment
 from runtime.environment import FunctionValue
 from runtime.environment import NativeFnValue
-from runtime.environment import NullValue
 from runtime.environment import NumberValue
 from runtime.environment import RuntimeValue
+from runtime.environment import StringValue
+from runtime.environment import VectorValue
+from runtime.environment import number
+from runtime.vector import broadcast
+from runtime.vector import make_vector
 
 EvalFunc = Callable[[Statement, Environment], RuntimeValue]
 
+# the values that have a `.value` for operators to work on
+_VALUE_TYPES = frozenset({BooleanValue, NumberValue, StringValue})
+
+
+def _shift_left(lhs: int | float, rhs: int | float) -> RuntimeValue:
+    if isinstance(lhs, float) or isinstance(rhs, float):
+        raise NotImplementedError("float left shift")
+    return number(lhs << rhs)
+
+
+def _shift_right(lhs: int | float, rhs: int | float) -> RuntimeValue:
+    if isinstance(lhs, float) or isinstance(rhs, float):
+        raise NotImplementedError("float right shift")
+    return number(lhs >> rhs)
+
+
+def _xor(lhs: int | float, rhs: int | float) -> RuntimeValue:
+    if isinstance(lhs, float) or isinstance(rhs, float):
+        raise NotImplementedError("float xor")
+    return number(lhs ^ rhs)
+
+
+def _divide(lhs: int | float, rhs: int | float) -> RuntimeValue:
+    if rhs == 0:
+        raise ZeroDivisionError("division by zero")
+    return number(lhs / rhs)
+
+
+# operator -> operation on the unwrapped values of both sides,
+# looked up once per node by the compiling engines
+BINARY_OPERATIONS: dict[str, Callable[[int | float, int | float], RuntimeValue]] = {
+    "+": lambda lhs, rhs: number(lhs + rhs),
+    "-": lambda lhs, rhs: number(lhs - rhs),
+    "*": lambda lhs, rhs: number(lhs * rhs),
+    "/": _divide,
+    "%": lambda lhs, rhs: number(lhs % rhs),
+    "<<": _shift_left,
+    ">>": _shift_right,
+    "^": _xor,
+    "!=": lambda lhs, rhs: TRUE if lhs != rhs else FALSE,
+    "==": lambda lhs, rhs: TRUE if lhs == rhs else FALSE,
+    ">": lambda lhs, rhs: TRUE if lhs > rhs else FALSE,
+    ">=": lambda lhs, rhs: TRUE if lhs >= rhs else FALSE,
+    "<": lambda lhs, rhs: TRUE if lhs < rhs else FALSE,
+    "<=": lambda lhs, rhs: TRUE if lhs <= rhs else FALSE,
+}
+
+LOGICAL_OPERATIONS: dict[str, Callable[[int | float | bool, int | float | bool], RuntimeValue]] = {
+    "and": lambda lhs, rhs: TRUE if lhs and rhs else FALSE,
+    "or": lambda lhs, rhs: TRUE if lhs or rhs else FALSE,
+    "!=": lambda lhs, rhs: TRUE if lhs != rhs else FALSE,
+    "==": lambda lhs, rhs: TRUE if lhs == rhs else FALSE,
+    ">": lambda lhs, rhs: TRUE if lhs > rhs else FALSE,
+    ">=": lambda lhs, rhs: TRUE if lhs >= rhs else FALSE,
+    "<": lambda lhs, rhs: TRUE if lhs < rhs else FALSE,
+    "<=": lambda lhs, rhs: TRUE if lhs <= rhs else FALSE,
+}
+
 
 def _eval_binary_expr(lhs: int | float, rhs: int | float, operator: str) -> RuntimeValue:
-    match operator:
-        case "+":
-            return NumberValue(lhs + rhs)
-        case "-":
-            return NumberValue(lhs - rhs)
-        case "*":
-            return NumberValue(lhs * rhs)
-        case "/":
-            if rhs == 0:
-                raise ZeroDivisionError()
-            return NumberValue(lhs / rhs)
-        case "%":
-            return NumberValue(lhs % rhs)
-        case "<<":
-            if isinstance(lhs, float) or isinstance(rhs, float):
-                raise NotImplementedError("float left shift")
-            return NumberValue(lhs << rhs)
-        case ">>":
-            if isinstance(lhs, float) or isinstance(rhs, float):
-                raise NotImplementedError("float right shift")
-            return NumberValue(lhs >> rhs)
-        case "^":
-            if isinstance(lhs, float) or isinstance(rhs, float):
-                raise NotImplementedError("float xor")
-            return NumberValue(lhs ^ rhs)
-        case "!=":
-            return BooleanValue(lhs != rhs)
-        case "==":
-            return BooleanValue(lhs == rhs)
-        case ">":
-            return BooleanValue(lhs > rhs)
-        case ">=":
-            return BooleanValue(lhs >= rhs)
-        case "<":
-            return BooleanValue(lhs < rhs)
-        case "<=":
-            return BooleanValue(lhs <= rhs)
-        case _:
-            raise NotImplementedError(f"_eval_numeric_expr {operator=}")
+    operation = BINARY_OPERATIONS.get(operator)
+    if operation is None:
+        raise NotImplementedError(f"_eval_numeric_expr {operator=}")
+    return operation(lhs, rhs)
+
+
+def _eval_mixed_binary_expr(lhs: RuntimeValue, rhs: RuntimeValue, operator: str) -> RuntimeValue:
+    # one side is not a number, string or boolean; every engine ends up here
+    if type(lhs) is VectorValue or type(rhs) is VectorValue:
+        return broadcast(operator, lhs, rhs)
+    # TODO: mix type operation
+    return NULL
+
+
+def _eval_mixed_logical_expr(lhs: RuntimeValue, rhs: RuntimeValue, operator: str) -> RuntimeValue:
+    # one side is not a number or boolean; every engine ends up here
+    if type(lhs) is VectorValue or type(rhs) is VectorValue:
+        return broadcast(operator, lhs, rhs)
+    raise NotImplementedError(f"logical operation between non-boolean or non-number: {lhs=} {rhs=}")
 
 
 def eval_binary_expr(node: BinaryExpr, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
     lhs = evaluate(node.left, env)
     rhs = evaluate(node.right, env)
 
-    lhs_val = getattr(lhs, "value", None)
-    rhs_val = getattr(rhs, "value", None)
-    if lhs_val is None or rhs_val is None:
-        # TODO: mix type operation
-        return NullValue()
+    if type(lhs) not in _VALUE_TYPES or type(rhs) not in _VALUE_TYPES:
+        return _eval_mixed_binary_expr(lhs, rhs, node.operator)
 
-    return _eval_binary_expr(lhs_val, rhs_val, node.operator)
+    return _eval_binary_expr(lhs.value, rhs.value, node.operator)
 
 
 def eval_logical_expr(node: LogicalExpr, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
@@ -86,31 +135,32 @@ def eval_logical_expr(node: LogicalExpr, env: Environment, evaluate: EvalFunc) -
         (isinstance(lhs, BooleanValue) or isinstance(lhs, NumberValue))
         and (isinstance(rhs, BooleanValue) or isinstance(rhs, NumberValue))
     ):
-        match node.operator:
-            case "and":
-                return BooleanValue(bool(lhs.value and rhs.value))
-            case "or":
-                return BooleanValue(bool(lhs.value or rhs.value))
-            case "!=":
-                return BooleanValue(lhs.value != rhs.value)
-            case "==":
-                return BooleanValue(lhs.value == rhs.value)
-            case ">":
-                return BooleanValue(lhs.value > rhs.value)
-            case ">=":
-                return BooleanValue(lhs.value >= rhs.value)
-            case "<":
-                return BooleanValue(lhs.value < rhs.value)
-            case "<=":
-                return BooleanValue(lhs.value <= rhs.value)
-            case _:
-                raise NotImplementedError(f"eval_logical_expr {node.operator=}")
+        operation = LOGICAL_OPERATIONS.get(node.operator)
+        if operation is None:
+            raise NotImplementedError(f"eval_logical_expr {node.operator=}")
+        return operation(lhs.value, rhs.value)
     else:
-        raise NotImplementedError(f"logical operation between non-boolean or non-number: {lhs=} {rhs=}")
+        return _eval_mixed_logical_expr(lhs, rhs, node.operator)
 
 
 def eval_identifier(node: Identifier, env: Environment) -> RuntimeValue:
-    return env.lookup_variable(node.symbol)
+    depth = node.depth
+    if depth is None:
+        return env.lookup_variable(node.symbol)
+
+    # Environment.lookup_slot, inlined for the most common node
+    while depth:
+        env = env.parent
+        depth -= 1
+    if node.slot is None:
+        variables = env.variables
+        if node.symbol in variables:
+            return variables[node.symbol]
+        return env.lookup_variable(node.symbol)
+    value = env.slots[node.slot]
+    if value is None:
+        raise RuntimeError(f"Undefined {node.symbol!r}")
+    return value
 
 
 def eval_assignment(node: AssignmentExpr, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
@@ -118,42 +168,172 @@ def eval_assignment(node: AssignmentExpr, env: Environment, evaluate: EvalFunc)
         raise NotImplementedError(f"trying to assign to {type(node.assigne)=}")
 
     value = evaluate(node.value, env)
-    return env.assign_variable(node.assigne.symbol, value)
+    target = node.assigne
+    if target.depth is None:
+        return env.assign_variable(target.symbol, value)
+    return env.assign_slot(target.symbol, target.depth, target.slot, value)
 
 
 def eval_object_expr(obj: ObjectLiteral, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
     properties = {}
 
     for prop in obj.properties:
-        if prop.value is None:
+        if prop.value is None and prop.depth is None:
             properties[prop.key] = env.lookup_variable(prop.key)
+        elif prop.value is None:
+            properties[prop.key] = env.lookup_slot(prop.key, prop.depth, prop.slot)
         else:
             properties[prop.key] = evaluate(prop.value, env)
 
     return DictionaryValue(properties=properties)
 
 
+def eval_vector_expr(node: VectorLiteral, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
+    return make_vector(evaluate(element, env) for element in node.elements)
+
+
+def eval_await_expr(node: AwaitExpr, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
+    return await_value(evaluate(node.argument, env))
+
+
+def _declares_functions(body: list[Statement]) -> bool:
+    from frontend.optimizer import walk
+    return any(type(node) is FunctionDeclaration for statement in body for node in walk(statement))
+
+
+@dataclass(slots=True)
+class CallCache:
+    """
+    what a call site found the last time it ran, kept in CallExpr.cache.
+
+    A callee that is a global is not looked up again while the version of
+    the scope it was found in stays the same. A resolved function whose
+    body declares no functions can not leave its frame behind, so frames
+    of finished calls are kept in `frames` and used again.
+
+    A tree may be evaluated by several threads at once, e.g. the same
+    Program run for two scripts. The cache belongs to the thread that made
+    it, as another could change it between reads or take a frame in use
+    for another layout; the call site calls the uncached way elsewhere.
+    """
+    thread: int = field(default_factory=get_ident)
+    fn: RuntimeValue | None = None
+    # where a global callee was found, how many scopes up, and the
+    # version that scope had then
+    owner: Environment | None = None
+    depth: int = 0
+    version: int = -1
+    # the layout of a frame of fn: how many arguments it takes, and the
+    # empty slots after them
+    body: list[Statement] | None = None
+    count: int = 0
+    rest: list[None] = field(default_factory=list)
+    frames: list[Environment] | None = None
+
+    def update(self, expr: CallExpr, fn: RuntimeValue, env: Environment):
+        self.fn = fn
+        self.owner = None
+        caller = expr.caller
+        if type(caller) is Identifier and caller.depth is not None and caller.slot is None:
+            owner = env.ancestor(caller.depth)
+            if caller.symbol in owner.variables:
+                self.owner = owner
+                self.depth = caller.depth
+                self.version = owner.version
+
+        if type(fn) is not FunctionValue or fn.frame_size is None:
+            self.body = None
+            self.frames = None
+        elif fn.body is not self.body:
+            # another declaration, or the first one
+            self.body = fn.body
+            self.count = min(len(expr.args), len(fn.parameters))
+            self.rest = [None] * (fn.frame_size - self.count)
+            # a memoized function is called the general way, its frames go to waste
+            self.frames = None if fn.memo is not None or _declares_functions(fn.body) else []
+
+
 def eval_call_expr(expr: CallExpr, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
     args = [evaluate(x, env) for x in expr.args]
-    fn = evaluate(expr.caller, env)
 
+    cache = expr.cache
+    if cache is None:
+        cache = expr.cache = CallCache()
+    elif cache.thread != get_ident():
+        return _call(evaluate(expr.caller, env), args, evaluate)
+    fn = None
+    if cache.owner is not None:
+        owner = env
+        depth = cache.depth
+        while depth:
+            owner = owner.parent
+            depth -= 1
+        if owner is cache.owner and owner.version == cache.version:
+            fn = cache.fn
+    if fn is None:
+        fn = evaluate(expr.caller, env)
+        if fn is not cache.fn or cache.owner is not None:
+            cache.update(expr, fn, env)
+
+    if cache.frames is not None:
+        # a function like the last one, in a frame of an earlier call if
+        # one is left
+        count = cache.count
+        if cache.frames:
+            scope = cache.frames.pop()
+            scope.parent = fn.declaration_env
+            slots = scope.slots
+            slots[:count] = args[:count]
+            slots[count:] = cache.rest
+        else:
+            scope = Environment(fn.declaration_env, slots=args[:count] + cache.rest)
+
+        result = NULL
+        for statement in fn.body:
+            result = evaluate(statement, scope)
+        cache.frames.append(scope)
+        return result
+    return _call(fn, args, evaluate)
+
+
+def _call(fn: RuntimeValue, args: list[RuntimeValue], evaluate: EvalFunc) -> RuntimeValue:
     if type(fn) is NativeFnValue:
         # TODO: support keyward arguments
         return fn.call(*args)
     elif type(fn) is FunctionValue:
+        if fn.memo is None:
+            return _call_function(fn, args, evaluate)
+        key = fn.memo.key(args)
+        if key is None:
+            return _call_function(fn, args, evaluate)
+        result = fn.memo.get(key)
+        if result is None:
+            result = _call_function(fn, args, evaluate)
+            fn.memo.put(key, result)
+        return result
+    else:
+        raise NotImplementedError(f"can not call {fn=}")
+
+
+def _call_function(fn: FunctionValue, args: list[RuntimeValue], evaluate: EvalFunc) -> RuntimeValue:
+    if fn.frame_size is None:
         scope = Environment(fn.declaration_env)
 
         # create variables for function parameters
         # TODO: check the bounds of args, verity arity of function
         for varname, arg in zip(fn.parameters, args):
             scope.declare_variable(varname, arg, False)
+    else:
+        # parameters take the first slots, the rest wait for declarations
+        slots = [None] * fn.frame_size
+        count = min(len(args), len(fn.parameters))
+        slots[:count] = args[:count]
+        scope = Environment(fn.declaration_env, slots=slots)
 
-        result = NullValue()
-        for statement in fn.body:
-            # evaluate statement line by line
-            result = evaluate(statement, scope)
+    result = NULL
+    for statement in fn.body:
+        # evaluate statement line by line
+        result = evaluate(statement, scope)
 
-        return result
-    else:
-        raise NotImplementedError(f"can not call {fn=}")
+    return result
 
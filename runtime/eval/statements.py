@@ -1,25 +1,32 @@
 from typing import Callable
 
+from frontend.chast import ForStatement
 from frontend.chast import FunctionDeclaration
 from frontend.chast import IfStatement
 from frontend.chast import Program
 from frontend.chast import Statement
 from frontend.chast import VariableDeclaration
 from frontend.chast import WhileStatement
+from runtime.environment import FALSE
+from runtime.environment import NULL
+from runtime.environment import TRUE
 from runtime.environment import BooleanValue
 from runtime.environment import DictionaryValue
 from runtime.environment import Environment
 from runtime.environment import FunctionValue
+from runtime.environment import Memo
 from runtime.environment import NullValue
 from runtime.environment import NumberValue
 from runtime.environment import RuntimeValue
 from runtime.environment import StringValue
+from runtime.environment import VectorValue
+from runtime.environment import iterate
 
 EvalFunc = Callable[[Statement, Environment], RuntimeValue]
 
 
 def eval_program(node: Program, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
-    last_evaluated = NullValue()
+    last_evaluated = NULL
 
     for statement in node.body:
         last_evaluated = evaluate(statement, env)
@@ -31,7 +38,11 @@ def eval_variable_declaration(node: VariableDeclaration, env: Environment, evalu
     if node.value is not None:
         value = evaluate(node.value, env)
     else:
-        value = NullValue()
+        value = NULL
+    if node.slot is not None:
+        # the resolver already rejected reassigning a const
+        env.slots[node.slot] = value
+        return value
     return env.declare_variable(node.identifier, value, node.const)
 
 
@@ -41,23 +52,41 @@ def eval_function_declaration(node: FunctionDeclaration, env: Environment) -> Ru
         parameters = node.params,
         declaration_env = env,
         body = node.body,
+        frame_size = node.frame_size,
+        memo = Memo(node.memoize) if node.memoize else None,
     )
 
+    if node.slot is not None:
+        env.slots[node.slot] = fn
+        return fn
     return env.declare_variable(node.name, fn, True)
 
 
-def eval_if_statement(node: IfStatement, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
-    runtime_true = evaluate(node.test, env)
-    match runtime_true:
+def is_truthy(value: RuntimeValue) -> bool:
+    # the shared values first, without going through the patterns
+    if value is TRUE:
+        return True
+    if value is FALSE or value is NULL:
+        return False
+    match value:
         case NumberValue(0) | NullValue() | BooleanValue(False):
-            true = False
-        case StringValue("") | DictionaryValue({}):
-            true = False
+            return False
+        case StringValue(""):
+            return False
+        case DictionaryValue():
+            # a {} pattern would match every mapping, not only the empty one
+            return len(value.properties) != 0
+        case VectorValue():
+            return len(value) != 0
         case _:
-            true = True
+            return True
+
+
+def eval_if_statement(node: IfStatement, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
+    true = is_truthy(evaluate(node.test, env))
     body = node.consequent if true else node.alternate
 
-    last_evaluated = NullValue()
+    last_evaluated = NULL
     for statement in body:
         last_evaluated = evaluate(statement, env)
 
@@ -65,10 +94,29 @@ def eval_if_statement(node: IfStatement, env: Environment, evaluate: EvalFunc) -
 
 
 def eval_while_statement(node: WhileStatement, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
-    last_evaluated = NullValue()
+    last_evaluated = NULL
 
-    while evaluate(node.test, env).value:
+    while is_truthy(evaluate(node.test, env)):
         for statement in node.body:
             last_evaluated = evaluate(statement, env)
 
     return last_evaluated
+
+
+def eval_for_statement(node: ForStatement, env: Environment, evaluate: EvalFunc) -> RuntimeValue:
+    last_evaluated = NULL
+
+    values = iterate(evaluate(node.iterable, env))
+    if node.slot is not None:
+        slots, slot = env.slots, node.slot
+        for value in values:
+            slots[slot] = value
+            for statement in node.body:
+                last_evaluated = evaluate(statement, env)
+    else:
+        for value in values:
+            env.declare_variable(node.identifier, value, False)
+            for statement in node.body:
+                last_evaluated = evaluate(statement, env)
+
+    return last_evaluated
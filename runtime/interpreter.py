@@ -1,6 +1,9 @@
 from frontend.chast import AssignmentExpr
+from frontend.chast import AwaitExpr
 from frontend.chast import BinaryExpr
+from frontend.chast import BooleanLiteral
 from frontend.chast import CallExpr
+from frontend.chast import ForStatement
 from frontend.chast import FunctionDeclaration
 from frontend.chast import Identifier
 from frontend.chast import IfStatement
@@ -11,12 +14,14 @@ from frontend.chast import Program
 from frontend.chast import Statement
 from frontend.chast import StringLiteral
 from frontend.chast import VariableDeclaration
+from frontend.chast import VectorLiteral
 from frontend.chast import WhileStatement
+from runtime.environment import FALSE
+from runtime.environment import TRUE
 from runtime.environment import Environment
-from runtime.environment import NullValue
-from runtime.environment import NumberValue
 from runtime.environment import RuntimeValue
 from runtime.environment import StringValue
+from runtime.environment import number
 from runtime.eval import expressions
 from runtime.eval import statements
 
@@ -24,9 +29,11 @@ from runtime.eval import statements
 def evaluate(node: Statement, env: Environment) -> RuntimeValue:
     match node:
         case NumberLiteral():
-            return NumberValue(node.value)
+            return number(node.value)
         case StringLiteral():
             return StringValue(node.value)
+        case BooleanLiteral():
+            return TRUE if node.value else FALSE
         case Identifier():
             return expressions.eval_identifier(node, env)
         case ObjectLiteral():
@@ -49,6 +56,12 @@ def evaluate(node: Statement, env: Environment) -> RuntimeValue:
             return statements.eval_if_statement(node, env, evaluate)
         case WhileStatement():
             return statements.eval_while_statement(node, env, evaluate)
+        case ForStatement():
+            return statements.eval_for_statement(node, env, evaluate)
+        case VectorLiteral():
+            return expressions.eval_vector_expr(node, env, evaluate)
+        case AwaitExpr():
+            return expressions.eval_await_expr(node, env, evaluate)
         case _:
             raise NotImplementedError(f"evaluate {node=}")
 
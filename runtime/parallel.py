@@ -0,0 +1,304 @@
+"""
+the 並行映射 builtin: calls a chlang function on every item of a sequence
+in a pool of processes, so CPU bound work uses every core.
+
+The function is pickled with a snapshot of the variables from outside it
+that its body uses, or the functions declared in it, and nothing else of
+the scopes around it; builtins are sent by name and looked up again in
+the worker, where it runs on the tree walker. A worker works on copies:
+assignments it makes to the captured variables are not seen by the caller.
+"""
+import io
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from frontend.chast import AssignmentExpr
+from frontend.chast import AwaitExpr
+from frontend.chast import BinaryExpr
+from frontend.chast import CallExpr
+from frontend.chast import ForStatement
+from frontend.chast import FunctionDeclaration
+from frontend.chast import Identifier
+from frontend.chast import IfStatement
+from frontend.chast import LogicalExpr
+from frontend.chast import MemberExpr
+from frontend.chast import ObjectLiteral
+from frontend.chast import Statement
+from frontend.chast import VariableDeclaration
+from frontend.chast import VectorLiteral
+from frontend.chast import WhileStatement
+from frontend.optimizer import walk
+from runtime.aio import RUN_NAMES
+from runtime.environment import Environment
+from runtime.environment import FunctionValue
+from runtime.environment import IteratorValue
+from runtime.environment import Memo
+from runtime.environment import NativeFnValue
+from runtime.environment import NumberValue
+from runtime.environment import RuntimeValue
+from runtime.environment import create_global_env
+from runtime.environment import iterate
+from runtime.eval.expressions import CallCache
+
+# chunks per worker when the caller gives no chunk size, a few so that a
+# worker that finishes early takes over some of the work of another
+CHUNKS_PER_WORKER = 4
+
+
+def _unresolve(body: list[Statement]):
+    # the slots the resolver gave a body, so its variables go by name
+    for statement in body:
+        for node in walk(statement):
+            match node:
+                case Identifier():
+                    node.depth = node.slot = None
+                case ObjectLiteral():
+                    for prop in node.properties:
+                        prop.depth = prop.slot = None
+                case VariableDeclaration() | ForStatement():
+                    node.slot = None
+                case FunctionDeclaration():
+                    node.slot = node.frame_size = None
+
+
+def _declared(body: list[Statement]) -> set[str]:
+    # the names a function body declares, not those of functions in it
+    names = set()
+    for statement in body:
+        match statement:
+            case VariableDeclaration():
+                names.add(statement.identifier)
+            case FunctionDeclaration():
+                names.add(statement.name)
+            case IfStatement():
+                names |= _declared(statement.consequent)
+                names |= _declared(statement.alternate)
+            case WhileStatement():
+                names |= _declared(statement.body)
+            case ForStatement():
+                names.add(statement.identifier)
+                names |= _declared(statement.body)
+    return names
+
+
+def _captured(fn: FunctionValue) -> dict[str, RuntimeValue]:
+    """
+    the variables from outside fn that its body, or a function declared in
+    it, uses, by name: what fn takes along to another process
+    """
+    captured = {}
+
+    def use(name: str, depth: int | None, slot: int | None, level: int, scopes: list[set[str]]):
+        # level is how many functions down from fn the name is used
+        if name in captured:
+            return
+        if depth is not None:
+            if depth <= level:
+                return
+            scope = fn.declaration_env.ancestor(depth - level - 1)
+            # engines other than the tree walker may keep every scope by name
+            if slot is not None and scope.slots is not None:
+                if scope.slots[slot] is not None:
+                    captured[name] = scope.slots[slot]
+                return
+        elif any(name in scope for scope in scopes):
+            return
+        try:
+            captured[name] = fn.declaration_env.lookup_variable(name)
+        except (KeyError, RuntimeError):
+            pass  # undefined, and it stays so in the worker
+
+    def visit(body: list[Statement], parameters: list[str], level: int, scopes: list[set[str]]):
+        scopes = [*scopes, set(parameters) | _declared(body)]
+        nodes = list(body)
+        while nodes:
+            node = nodes.pop()
+            match node:
+                case Identifier():
+                    use(node.symbol, node.depth, node.slot, level, scopes)
+                case FunctionDeclaration():
+                    visit(node.body, node.params, level + 1, scopes)
+                case VariableDeclaration():
+                    if node.value is not None:
+                        nodes.append(node.value)
+                case IfStatement():
+                    nodes += [node.test, *node.consequent, *node.alternate]
+                case WhileStatement():
+                    nodes += [node.test, *node.body]
+                case ForStatement():
+                    nodes += [node.iterable, *node.body]
+                case AssignmentExpr():
+                    nodes += [node.assigne, node.value]
+                case BinaryExpr() | LogicalExpr():
+                    nodes += [node.left, node.right]
+                case CallExpr():
+                    nodes += [node.caller, *node.args]
+                case ObjectLiteral():
+                    for prop in node.properties:
+                        if prop.value is None:
+                            use(prop.key, prop.depth, prop.slot, level, scopes)
+                        else:
+                            nodes.append(prop.value)
+                case VectorLiteral():
+                    nodes += node.elements
+                case AwaitExpr():
+                    nodes.append(node.argument)
+                case MemberExpr():
+                    # a property that is not computed is a key, not a variable
+                    nodes += [node.obj, node.prop] if node.computed else [node.obj]
+
+    visit(fn.body, fn.parameters, 0, [])
+    return captured
+
+
+def _function(name, parameters, body, memo_size) -> FunctionValue:
+    # the slots the resolver gave the body were those of the scopes
+    # around it in the caller, here its variables are found by name
+    _unresolve(body)
+    memo = None if memo_size is None else Memo(memo_size)
+    return FunctionValue(name, parameters, None, body, memo=memo)
+
+
+def _set_environment(fn: FunctionValue, declaration_env: Environment):
+    fn.declaration_env = declaration_env
+
+
+# the persistent id of the global scope, which is the builtins of the worker
+_ROOT = "<root>"
+
+
+class _Pickler(pickle.Pickler):
+    """
+    pickles values for another process: builtins go by their name, and
+    what an engine attached to a function or a call site is left behind.
+    A function takes along only the variables it uses, its scope in the
+    other process is the global scope there.
+    """
+
+    def __init__(self, file, root: Environment):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.root = root
+        self.builtins = {id(value): name for name, value in root.variables.items() if type(value) is NativeFnValue}
+
+    def persistent_id(self, obj):
+        if obj is self.root:
+            return _ROOT
+        if type(obj) is NativeFnValue:
+            name = self.builtins.get(id(obj))
+            if name is None:
+                raise pickle.PicklingError(f"{obj!r} is not a builtin")
+            return name
+        return None
+
+    def reducer_override(self, obj):
+        kind = type(obj)
+        if kind is FunctionValue:
+            memo_size = None if obj.memo is None else obj.memo.size
+            snapshot = Environment(self.root, _captured(obj))
+            # the snapshot comes after the function is memoized, as it may
+            # hold the function itself, e.g. for a recursive one
+            return _function, (obj.name, obj.parameters, obj.body, memo_size), snapshot, None, None, _set_environment
+        if kind is CallCache:
+            return CallCache, ()
+        return NotImplemented
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, root: Environment):
+        super().__init__(file)
+        self.root = root
+
+    def persistent_load(self, name: str) -> NativeFnValue | Environment:
+        if name == _ROOT:
+            return self.root
+        return self.root.variables[name]
+
+
+def _global(env: Environment) -> Environment:
+    while env.parent is not None:
+        env = env.parent
+    return env
+
+
+def _dumps(obj, root: Environment) -> bytes:
+    file = io.BytesIO()
+    _Pickler(file, root).dump(obj)
+    return file.getvalue()
+
+
+def _loads(data: bytes, root: Environment):
+    return _Unpickler(io.BytesIO(data), root).load()
+
+
+def _culprit(fn: FunctionValue, root: Environment, seen: set[int]) -> str:
+    # the first captured variable that can not be pickled, through the functions it uses
+    seen.add(id(fn))
+    for name, value in _captured(fn).items():
+        try:
+            _dumps(value, root)
+        except Exception:
+            if type(value) is FunctionValue and id(value) not in seen:
+                return _culprit(value, root, seen)
+            return f"{name!r} = {value!r}"
+    return "its body"
+
+
+# the function a worker runs, and the builtins of the worker
+_worker: tuple[FunctionValue, Environment] | None = None
+
+
+def _init_worker(payload: bytes, allow_run: bool):
+    global _worker
+    builtins = create_global_env(allow_run)
+    _worker = (_loads(payload, builtins), builtins)
+
+
+def _run_chunk(payload: bytes) -> bytes:
+    from runtime.eval.expressions import _call_function
+    from runtime.interpreter import evaluate
+
+    fn, builtins = _worker
+    results = [_call_function(fn, [item], evaluate) for item in _loads(payload, builtins)]
+    return _dumps(results, builtins)
+
+
+def parallel_map(fn: RuntimeValue, sequence: RuntimeValue, chunk_size: RuntimeValue | None = None) -> IteratorValue:
+    """ 並行映射（函式、序列、每批大小）: fn of every item, in order """
+    if type(fn) is not FunctionValue:
+        raise RuntimeError(f"並行映射 expects a chlang function, got {fn!r}")
+    env = fn.declaration_env
+    if chunk_size is not None and (type(chunk_size) is not NumberValue or type(chunk_size.value) is not int or chunk_size.value < 1):
+        raise RuntimeError(f"Expected a positive integer NumberValue as chunk size, got {chunk_size!r}")
+
+    items = list(iterate(sequence))
+    if not items:
+        return IteratorValue(iter(()))
+
+    root = _global(env)
+    try:
+        payload = _dumps(fn, root)
+    except Exception as error:
+        raise RuntimeError(
+            f"並行映射 can not send {fn.name!r} to another process, "
+            f"it captures {_culprit(fn, root, set())} that can not be pickled: {error}"
+        ) from None
+
+    workers = min(os.cpu_count() or 1, len(items))
+    if chunk_size is None:
+        size, extra = divmod(len(items), workers * CHUNKS_PER_WORKER)
+        size += bool(extra)
+    else:
+        size = chunk_size.value
+    try:
+        chunks = [_dumps(items[i:i + size], root) for i in range(0, len(items), size)]
+    except Exception as error:
+        raise RuntimeError(f"並行映射 can not send the items to another process: {error}") from None
+
+    results = []
+    # the workers may run commands only if the script may
+    allow_run = any(type(root.variables.get(name)) is NativeFnValue for name in RUN_NAMES)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(payload, allow_run)) as executor:
+        for chunk in executor.map(_run_chunk, chunks):
+            results += _loads(chunk, root)
+    return IteratorValue(iter(results))
@@ -0,0 +1,137 @@
+"""
+runs many programs in one thread, switching between them round-robin like
+green threads, so a script stuck in a loop can not hold up the others.
+
+Every program runs on the stack engine, which gives the turn back after a
+slice of steps, a step being a round of a loop or a call. A program that
+uses up its quota of steps or of seconds is stopped with QuotaExceeded and
+the others go on; since quotas are checked between slices, a program can
+go over them by one slice at most. Native functions are not interrupted:
+a script waiting for `輸入` or `等待` holds up all the others meanwhile.
+"""
+import time
+from collections import deque
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Generator
+
+from frontend.chast import Program
+from runtime.environment import Environment
+from runtime.environment import RuntimeValue
+from runtime.environment import create_global_env
+from runtime.stackwalker import steps
+
+# steps a program runs before the next one has its turn
+SLICE = 1000
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class GreenThread:
+    name: str
+    run: Generator[None, None, RuntimeValue] = field(repr=False)
+    max_steps: int | None = None
+    max_seconds: float | None = None
+    steps: int = 0  # counted a whole slice at a time
+    seconds: float = 0.0
+    done: bool = False
+    result: RuntimeValue | None = None
+    error: Exception | None = None
+
+
+class Scheduler:
+    def __init__(self, slice: int = SLICE, max_steps: int | None = None, max_seconds: float | None = None):
+        if slice < 1:
+            raise ValueError(f"a slice takes at least 1 step, got {slice}")
+        self.slice = slice
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.threads: list[GreenThread] = []
+        self._ready: deque[GreenThread] = deque()
+
+    def spawn(self, program: Program, env: Environment | None = None, name: str | None = None,
+              max_steps: int | None = None, max_seconds: float | None = None) -> GreenThread:
+        """ add a program, with the scheduler's quotas unless given its own """
+        if env is None:
+            env = create_global_env()
+        thread = GreenThread(
+            name if name is not None else f"program {len(self.threads)}",
+            steps(program, env, self.slice),
+            self.max_steps if max_steps is None else max_steps,
+            self.max_seconds if max_seconds is None else max_seconds,
+        )
+        self.threads.append(thread)
+        self._ready.append(thread)
+        return thread
+
+    def _switch_to(self, thread: GreenThread):
+        # run a slice of thread, then see whether it is done or over a quota
+        start = time.perf_counter()
+        try:
+            next(thread.run)
+        except StopIteration as done:
+            thread.result = done.value
+            thread.done = True
+        except Exception as error:
+            thread.error = error
+            thread.done = True
+        thread.seconds += time.perf_counter() - start
+        if thread.done:
+            return
+
+        thread.steps += self.slice
+        if thread.max_steps is not None and thread.steps > thread.max_steps:
+            thread.error = QuotaExceeded(f"{thread.name} took more than {thread.max_steps} steps")
+        elif thread.max_seconds is not None and thread.seconds > thread.max_seconds:
+            thread.error = QuotaExceeded(f"{thread.name} took more than {thread.max_seconds} seconds")
+        else:
+            self._ready.append(thread)
+            return
+        thread.run.close()
+        thread.done = True
+
+    def run(self) -> list[GreenThread]:
+        """ run every program to its end or its quota, give them in the order spawned """
+        while self._ready:
+            self._switch_to(self._ready.popleft())
+        return self.threads
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from frontend.parser import Parser
+    from frontend.parser import ParserError
+    from frontend.resolver import Resolver
+    from frontend.resolver import ResolverError
+
+    # what the lexer, parser and resolver raise for a script they can not take
+    SCRIPT_ERRORS = (ParserError, SyntaxError, NotImplementedError, ValueError, IndexError, ResolverError)
+
+    arg_parser = argparse.ArgumentParser(description="run chlang scripts side by side in one thread")
+    arg_parser.add_argument("files", nargs="+")
+    arg_parser.add_argument("--slice", type=int, default=SLICE, help="steps before switching to the next script")
+    arg_parser.add_argument("--max-steps", type=int, help="stop a script after this many steps")
+    arg_parser.add_argument("--max-seconds", type=float, help="stop a script after this much time")
+    args = arg_parser.parse_args()
+
+    scheduler = Scheduler(args.slice, args.max_steps, args.max_seconds)
+    for path in args.files:
+        env = create_global_env()
+        with open(path) as fs:
+            source = fs.read()
+        try:
+            program = Parser().produce_ast(source)
+            Resolver().resolve(program, env.visible_names())
+        except SCRIPT_ERRORS as error:
+            # the others still run
+            print(f"{path}: {type(error).__name__}: {error}")
+            continue
+        scheduler.spawn(program, env, path)
+
+    for thread in scheduler.run():
+        outcome = thread.result if thread.error is None else f"{type(thread.error).__name__}: {thread.error}"
+        print(f"{thread.name}: {outcome}  ({thread.steps} steps, {thread.seconds:.3f}s)")
@@ -0,0 +1,323 @@
+"""
+execution engine that walks the syntax tree like the tree walker does, but
+keeps what is left to do on a task stack of its own instead of python's.
+
+A call pushes the body of the function as tasks on top of whatever its
+caller still has to do, and the tasks carry their environment, so nothing
+has to be popped when a function ends. A call that is the last thing a
+function body does therefore leaves nothing of its caller behind: such
+tail calls run in constant space, and any other recursion only grows the
+task stack, never python's.
+
+Since the whole state of a run is in those two stacks, a run can also stop
+in between and go on later: `steps` is a generator that yields every so
+many steps, a step being a round of a loop or a call, which is what the
+scheduler time-slices scripts with.
+"""
+from typing import Generator
+
+from frontend.chast import AssignmentExpr
+from frontend.chast import AwaitExpr
+from frontend.chast import BinaryExpr
+from frontend.chast import BooleanLiteral
+from frontend.chast import CallExpr
+from frontend.chast import ForStatement
+from frontend.chast import FunctionDeclaration
+from frontend.chast import Identifier
+from frontend.chast import IfStatement
+from frontend.chast import LogicalExpr
+from frontend.chast import NumberLiteral
+from frontend.chast import ObjectLiteral
+from frontend.chast import Program
+from frontend.chast import Statement
+from frontend.chast import StringLiteral
+from frontend.chast import VariableDeclaration
+from frontend.chast import VectorLiteral
+from frontend.chast import WhileStatement
+from runtime.aio import await_value
+from runtime.environment import FALSE
+from runtime.environment import NULL
+from runtime.environment import TRUE
+from runtime.environment import BooleanValue
+from runtime.environment import DictionaryValue
+from runtime.environment import Environment
+from runtime.environment import FunctionValue
+from runtime.environment import NativeFnValue
+from runtime.environment import NumberValue
+from runtime.environment import RuntimeValue
+from runtime.environment import StringValue
+from runtime.environment import iterate
+from runtime.environment import number
+from runtime.eval.expressions import LOGICAL_OPERATIONS
+from runtime.eval.expressions import _eval_binary_expr
+from runtime.eval.expressions import _eval_mixed_binary_expr
+from runtime.eval.expressions import _eval_mixed_logical_expr
+from runtime.eval.expressions import eval_identifier
+from runtime.eval.statements import eval_function_declaration
+from runtime.eval.statements import is_truthy
+from runtime.vector import make_vector
+
+# tasks, each a tuple (task, node, env)
+EVAL = 0      # evaluate node, push its value
+POP = 1       # drop the value on top, a statement that is not the last of its block
+BLOCK = 2     # evaluate the statements in node, push the value of the last
+BINARY = 3    # the operands are on the stack
+LOGICAL = 4
+ASSIGN = 5    # the value is on the stack
+DECLARE = 6
+CALL = 7      # the arguments and then the function are on the stack
+OBJECT = 8    # the values of the non shorthand properties are on the stack
+IF = 9        # the test is on the stack
+WHILE = 10    # the value so far and the test are on the stack
+ITERATE = 11  # the iterable is on the stack
+FOR = 12      # the iterator and the value so far are on the stack
+VECTOR = 13   # the elements are on the stack
+AWAIT = 14    # the awaited value is on the stack
+
+_DONE = object()
+
+_NUMERIC_TYPES = frozenset({BooleanValue, NumberValue})
+_VALUE_TYPES = frozenset({BooleanValue, NumberValue, StringValue})
+
+
+def _block(tasks: list, body: list[Statement], env: Environment):
+    # the first statement ends up on top; every value but the last is dropped
+    for i in range(len(body) - 1, -1, -1):
+        tasks.append((EVAL, body[i], env))
+        if i:
+            tasks.append((POP, None, None))
+
+
+def steps(node: Statement, env: Environment, budget: int) -> Generator[None, None, RuntimeValue]:
+    """
+    evaluate node, yielding after every `budget` steps (rounds of a loop and
+    calls), and return its value; with a budget of 0 it never yields
+    """
+    # counts down to 0 at the next yield, from 0 it goes negative and never gets there
+    countdown = budget
+    tasks = [(EVAL, node, env)]
+    values = []
+    push = values.append
+    pop = values.pop
+    schedule = tasks.append
+
+    while tasks:
+        task, node, env = tasks.pop()
+
+        if task == EVAL:
+            kind = type(node)
+            if kind is Identifier:
+                push(eval_identifier(node, env))
+            elif kind is NumberLiteral:
+                push(number(node.value))
+            elif kind is BinaryExpr or kind is LogicalExpr:
+                schedule((BINARY if kind is BinaryExpr else LOGICAL, node, env))
+                schedule((EVAL, node.right, env))
+                schedule((EVAL, node.left, env))
+            elif kind is CallExpr:
+                # the arguments first, then the function, as the tree walker
+                schedule((CALL, node, env))
+                schedule((EVAL, node.caller, env))
+                for arg in reversed(node.args):
+                    schedule((EVAL, arg, env))
+            elif kind is AssignmentExpr:
+                if type(node.assigne) is not Identifier:
+                    raise NotImplementedError(f"trying to assign to {type(node.assigne)=}")
+                schedule((ASSIGN, node, env))
+                schedule((EVAL, node.value, env))
+            elif kind is IfStatement:
+                schedule((IF, node, env))
+                schedule((EVAL, node.test, env))
+            elif kind is WhileStatement:
+                push(NULL)
+                schedule((WHILE, node, env))
+                schedule((EVAL, node.test, env))
+            elif kind is ForStatement:
+                schedule((ITERATE, node, env))
+                schedule((EVAL, node.iterable, env))
+            elif kind is VariableDeclaration:
+                schedule((DECLARE, node, env))
+                if node.value is None:
+                    push(NULL)
+                else:
+                    schedule((EVAL, node.value, env))
+            elif kind is FunctionDeclaration:
+                push(eval_function_declaration(node, env))
+            elif kind is StringLiteral:
+                push(StringValue(node.value))
+            elif kind is BooleanLiteral:
+                push(TRUE if node.value else FALSE)
+            elif kind is ObjectLiteral:
+                schedule((OBJECT, node, env))
+                for prop in reversed(node.properties):
+                    if prop.value is not None:
+                        schedule((EVAL, prop.value, env))
+            elif kind is AwaitExpr:
+                schedule((AWAIT, node, env))
+                schedule((EVAL, node.argument, env))
+            elif kind is VectorLiteral:
+                schedule((VECTOR, node, env))
+                for element in reversed(node.elements):
+                    schedule((EVAL, element, env))
+            elif kind is Program:
+                schedule((BLOCK, node.body, env))
+            else:
+                raise NotImplementedError(f"evaluate {node=}")
+
+        elif task == POP:
+            pop()
+
+        elif task == BLOCK:
+            if node:
+                _block(tasks, node, env)
+            else:
+                push(NULL)
+
+        elif task == BINARY:
+            rhs = pop()
+            lhs = pop()
+            if type(lhs) not in _VALUE_TYPES or type(rhs) not in _VALUE_TYPES:
+                push(_eval_mixed_binary_expr(lhs, rhs, node.operator))
+            else:
+                push(_eval_binary_expr(lhs.value, rhs.value, node.operator))
+
+        elif task == LOGICAL:
+            rhs = pop()
+            lhs = pop()
+            if type(lhs) not in _NUMERIC_TYPES or type(rhs) not in _NUMERIC_TYPES:
+                push(_eval_mixed_logical_expr(lhs, rhs, node.operator))
+            else:
+                operation = LOGICAL_OPERATIONS.get(node.operator)
+                if operation is None:
+                    raise NotImplementedError(f"eval_logical_expr {node.operator=}")
+                push(operation(lhs.value, rhs.value))
+
+        elif task == CALL:
+            countdown -= 1
+            if not countdown:
+                countdown = budget
+                yield
+            fn = pop()
+            count = len(node.args)
+            if count:
+                args = values[-count:]
+                del values[-count:]
+            else:
+                args = []
+
+            if type(fn) is NativeFnValue:
+                push(fn.call(*args))
+            elif type(fn) is FunctionValue:
+                if fn.frame_size is None:
+                    scope = Environment(fn.declaration_env)
+                    for varname, arg in zip(fn.parameters, args):
+                        scope.declare_variable(varname, arg, False)
+                else:
+                    slots = [None] * fn.frame_size
+                    count = min(count, len(fn.parameters))
+                    slots[:count] = args[:count]
+                    scope = Environment(fn.declaration_env, slots=slots)
+                # the body takes the place of the call, its last value is the result
+                if fn.body:
+                    _block(tasks, fn.body, scope)
+                else:
+                    push(NULL)
+            else:
+                raise NotImplementedError(f"can not call {fn=}")
+
+        elif task == ASSIGN:
+            target = node.assigne
+            if target.depth is None:
+                env.assign_variable(target.symbol, values[-1])
+            else:
+                env.assign_slot(target.symbol, target.depth, target.slot, values[-1])
+
+        elif task == DECLARE:
+            if node.slot is not None:
+                env.slots[node.slot] = values[-1]
+            else:
+                env.declare_variable(node.identifier, values[-1], node.const)
+
+        elif task == OBJECT:
+            count = sum(prop.value is not None for prop in node.properties)
+            given = iter(values[len(values) - count:])
+            del values[len(values) - count:]
+            properties = {}
+            for prop in node.properties:
+                if prop.value is not None:
+                    properties[prop.key] = next(given)
+                elif prop.depth is None:
+                    properties[prop.key] = env.lookup_variable(prop.key)
+                else:
+                    properties[prop.key] = env.lookup_slot(prop.key, prop.depth, prop.slot)
+            push(DictionaryValue(properties=properties))
+
+        elif task == AWAIT:
+            values[-1] = await_value(values[-1])
+
+        elif task == VECTOR:
+            count = len(node.elements)
+            elements = values[len(values) - count:]
+            del values[len(values) - count:]
+            push(make_vector(elements))
+
+        elif task == IF:
+            body = node.consequent if is_truthy(pop()) else node.alternate
+            if body:
+                _block(tasks, body, env)
+            else:
+                push(NULL)
+
+        elif task == WHILE:
+            value = pop()
+            if value is TRUE or is_truthy(value):
+                countdown -= 1
+                if not countdown:
+                    countdown = budget
+                    yield
+                # the body leaves the new value of the loop, then test again
+                schedule((WHILE, node, env))
+                schedule((EVAL, node.test, env))
+                if node.body:
+                    pop()
+                    _block(tasks, node.body, env)
+
+        elif task == ITERATE:
+            push(iterate(pop()))
+            push(NULL)
+            schedule((FOR, node, env))
+
+        elif task == FOR:
+            value = next(values[-2], _DONE)
+            if value is _DONE:
+                last_evaluated = pop()
+                pop()
+                push(last_evaluated)
+            else:
+                countdown -= 1
+                if not countdown:
+                    countdown = budget
+                    yield
+                if node.slot is not None:
+                    env.slots[node.slot] = value
+                else:
+                    env.declare_variable(node.identifier, value, False)
+                # the body leaves the new value of the loop, then the next one
+                schedule((FOR, node, env))
+                if node.body:
+                    pop()
+                    _block(tasks, node.body, env)
+
+    return values.pop()
+
+
+def run(node: Statement, env: Environment) -> RuntimeValue:
+    try:
+        next(steps(node, env, 0))
+    except StopIteration as done:
+        return done.value
+    raise AssertionError("steps yielded without a budget")
+
+
+def execute(program: Program, env: Environment) -> RuntimeValue:
+    return run(program, env)
@@ -0,0 +1,721 @@
+"""
+execution engine that translates a Program into a python ast.Module and
+runs the code object python compiles from it.
+
+Values are plain python values: numbers, strings, booleans, None for Null,
+dicts and functions. They are boxed into RuntimeValues only where a native
+function or the caller of `execute` sees them; a function then takes along
+scopes with the variables it uses, so that 並行映射 can send it to another
+process. Every generated statement
+carries the line of its chlang statement, and the code object is compiled
+under the name of the source file, so tracebacks point into the .ch file.
+
+An operator on strings gives a NumberValue in the other engines, e.g.
+`「a」 加 「b」`; here that string is kept as a _NumberText, which boxes
+back into the same NumberValue.
+"""
+import ast
+import keyword
+import re
+import types
+
+from frontend.chast import AssignmentExpr
+from frontend.chast import AwaitExpr
+from frontend.chast import BinaryExpr
+from frontend.chast import BooleanLiteral
+from frontend.chast import CallExpr
+from frontend.chast import ForStatement
+from frontend.chast import FunctionDeclaration
+from frontend.chast import Identifier
+from frontend.chast import IfStatement
+from frontend.chast import LogicalExpr
+from frontend.chast import NumberLiteral
+from frontend.chast import ObjectLiteral
+from frontend.chast import Program
+from frontend.chast import Statement
+from frontend.chast import StringLiteral
+from frontend.chast import VariableDeclaration
+from frontend.chast import VectorLiteral
+from frontend.chast import WhileStatement
+from frontend.optimizer import walk
+from runtime.aio import await_value
+from runtime.environment import FALSE
+from runtime.environment import NULL
+from runtime.environment import TRUE
+from runtime.environment import BooleanValue
+from runtime.environment import DictionaryValue
+from runtime.environment import FutureValue
+from runtime.environment import Environment
+from runtime.environment import FunctionValue
+from runtime.environment import IteratorValue
+from runtime.environment import NativeFnValue
+from runtime.environment import NullValue
+from runtime.environment import NumberValue
+from runtime.environment import RangeValue
+from runtime.environment import RuntimeValue
+from runtime.environment import StringValue
+from runtime.environment import VectorValue
+from runtime.environment import number
+from runtime.eval.expressions import BINARY_OPERATIONS
+from runtime.eval.expressions import LOGICAL_OPERATIONS
+from runtime.eval.expressions import _eval_mixed_binary_expr
+from runtime.eval.expressions import _eval_mixed_logical_expr
+from runtime.vector import make_vector
+
+
+class _NumberText(str):
+    """ a string an operator gave, which the other engines keep in a NumberValue """
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        # is_truthy only takes the number 0 for false
+        return True
+
+
+# python values that operators take as numbers, and those with a `.value`
+_NUMERIC_TYPES = frozenset({bool, int, float})
+_VALUE_TYPES = frozenset({bool, int, float, str, _NumberText})
+# what comparisons and logical operators take as NumberValues or BooleanValues
+_LOGICAL_TYPES = _NUMERIC_TYPES | {_NumberText}
+
+_OPERATORS = {
+    "+": ast.Add, "-": ast.Sub, "*": ast.Mult, "/": ast.Div, "%": ast.Mod,
+}
+_COMPARISONS = {
+    "==": ast.Eq, "!=": ast.NotEq, "<": ast.Lt, "<=": ast.LtE, ">": ast.Gt, ">=": ast.GtE,
+}
+
+_MANGLE_PREFIX = "_ch"
+
+
+def _mangle(name: str) -> str:
+    # the generated code keeps its helpers in names starting with "_",
+    # so chlang names that could clash with them or with python get a prefix
+    if name.startswith("_") or keyword.iskeyword(name):
+        return _MANGLE_PREFIX + name
+    return name
+
+
+def _unmangle(name: str) -> str:
+    return name.removeprefix(_MANGLE_PREFIX)
+
+
+def _box(value, boxed: dict | None = None) -> RuntimeValue:
+    # boxed keeps the functions boxed so far, for those that reach each other
+    match value:
+        case bool():
+            return TRUE if value else FALSE
+        case int() | float():
+            return number(value)
+        case _NumberText():
+            return NumberValue(str(value))
+        case str():
+            return StringValue(value)
+        case None:
+            return NULL
+        case dict():
+            return DictionaryValue({key: _box(item, boxed) for key, item in value.items()})
+        case RuntimeValue():
+            return value
+        case _ if hasattr(value, "boxed"):
+            return value.boxed
+        case _ if hasattr(value, "declaration"):
+            return _box_function(value, {} if boxed is None else boxed)
+        case _:
+            raise NotImplementedError(f"Unknown python value {value=!r}")
+
+
+def _unbox(value: RuntimeValue):
+    match value:
+        case NumberValue(str()):
+            return _NumberText(value.value)
+        case NumberValue() | StringValue() | BooleanValue():
+            return value.value
+        case NullValue():
+            return None
+        case DictionaryValue():
+            return {key: _unbox(item) for key, item in value.properties.items()}
+        case RangeValue() | IteratorValue():
+            # only ever iterated, see _iterate
+            return value
+        case VectorValue() | FutureValue():
+            return value
+        case NativeFnValue():
+            def native(*args):
+                return _unbox(value.call(*[_box(arg) for arg in args]))
+            native.boxed = value
+            return native
+        case FunctionValue() if hasattr(value.compiled, "declaration"):
+            # one of ours, back from a native function
+            return value.compiled
+        case FunctionValue():
+            # declared by another engine, keep running it on the tree walker
+            from runtime.eval.expressions import _call_function
+            from runtime.interpreter import evaluate
+
+            def function(*args):
+                return _unbox(_call_function(value, [_box(arg) for arg in args], evaluate))
+            function.boxed = value
+            return function
+        case _:
+            raise NotImplementedError(f"Unknown runtime value {value=!r}")
+
+
+def _outer_names(declaration: FunctionDeclaration) -> tuple[list[dict[int, str]], set[str]]:
+    """
+    the variables from outside a function that its body, or a function
+    declared in it, uses: for every function scope around it, a scope up
+    at a time, the names by slot; and the globals by name
+    """
+    scopes: list[dict[int, str]] = []
+    names = set()
+
+    def use(name: str, depth: int | None, slot: int | None, level: int):
+        # level is how many functions down from the declaration the name is used
+        if depth is None or slot is None:
+            names.add(name)
+            up = 0 if depth is None else depth - level - 1
+        elif depth > level:
+            up = depth - level
+        else:
+            return
+        while len(scopes) < up:
+            scopes.append({})
+        if slot is not None:
+            scopes[up - 1][slot] = name
+
+    nodes = [(statement, 0) for statement in declaration.body]
+    while nodes:
+        node, level = nodes.pop()
+        match node:
+            case FunctionDeclaration():
+                nodes += [(statement, level + 1) for statement in node.body]
+            case IfStatement():
+                nodes += [(child, level) for child in (node.test, *node.consequent, *node.alternate)]
+            case WhileStatement():
+                nodes += [(child, level) for child in (node.test, *node.body)]
+            case ForStatement():
+                nodes += [(child, level) for child in (node.iterable, *node.body)]
+            case _:
+                # no functions are declared in an expression
+                for child in walk(node):
+                    match child:
+                        case Identifier():
+                            use(child.symbol, child.depth, child.slot, level)
+                        case ObjectLiteral():
+                            for prop in child.properties:
+                                if prop.value is None:
+                                    use(prop.key, prop.depth, prop.slot, level)
+    return scopes, names
+
+
+def _box_function(fn, boxed: dict) -> FunctionValue:
+    """
+    the FunctionValue of a function the generated code declared, with
+    scopes made from what fn closes over, as far as its body uses them:
+    the variables of the functions around it from its closure, the globals
+    from the namespace it runs in, and the scope `execute` was given
+    """
+    function = boxed.get(fn)
+    if function is not None:
+        return function
+    declaration = fn.declaration
+    function = boxed[fn] = FunctionValue(
+        name = declaration.name,
+        parameters = declaration.params,
+        declaration_env = None,
+        body = declaration.body,
+        compiled = fn,
+        frame_size = declaration.frame_size,
+    )
+
+    namespace = fn.__globals__
+    cells = dict(zip(fn.__code__.co_freevars, fn.__closure__ or ()))
+
+    def value_of(name: str) -> RuntimeValue | None:
+        name = _mangle(name)
+        if name in cells:
+            try:
+                return _box(cells[name].cell_contents, boxed)
+            except ValueError:
+                return None  # not declared yet
+        if name in namespace:
+            return _box(namespace[name], boxed)
+        return None
+
+    scopes, names = _outer_names(declaration)
+    variables = {}
+    for name in names:
+        if _mangle(name) not in cells:
+            value = value_of(name)
+            if value is not None:
+                variables[name] = value
+    env = Environment(namespace["_env"], variables)
+    if declaration.frame_size is None:
+        # not resolved, the variables around it go by name
+        variables = {}
+        for name in cells:
+            value = value_of(_unmangle(name))
+            if value is not None:
+                variables[_unmangle(name)] = value
+        env = Environment(env, variables)
+    else:
+        for scope in reversed(scopes):
+            slots = [None] * (max(scope, default=-1) + 1)
+            for slot, name in scope.items():
+                slots[slot] = value_of(name)
+            env = Environment(env, slots=slots)
+    function.declaration_env = env
+    return function
+
+
+# the helpers below are what the generated code calls whenever the
+# inlined fast path does not apply
+
+def _binary(operator: str, lhs, rhs):
+    if type(lhs) not in _VALUE_TYPES or type(rhs) not in _VALUE_TYPES:
+        return _unbox(_eval_mixed_binary_expr(_box(lhs), _box(rhs), operator))
+    operation = BINARY_OPERATIONS.get(operator)
+    if operation is None:
+        raise NotImplementedError(f"_eval_numeric_expr {operator=}")
+    return _unbox(operation(lhs, rhs))
+
+
+def _logical(operator: str, lhs, rhs):
+    if type(lhs) in _LOGICAL_TYPES and type(rhs) in _LOGICAL_TYPES:
+        operation = LOGICAL_OPERATIONS.get(operator)
+        if operation is None:
+            raise NotImplementedError(f"eval_logical_expr {operator=}")
+        return _unbox(operation(lhs, rhs))
+    return _unbox(_eval_mixed_logical_expr(_box(lhs), _box(rhs), operator))
+
+
+def _iterate(value):
+    # what a for loop goes over, as python values
+    match value:
+        case RangeValue():
+            return range(value.start, value.stop, value.step)
+        case IteratorValue():
+            return map(_unbox, value.iterator)
+        case str() | dict():
+            return iter(value)
+        case VectorValue():
+            return iter(value.values.tolist())
+    raise NotImplementedError(f"can not iterate value={_box(value)!r}")
+
+
+def _await(value):
+    return _unbox(await_value(_box(value)))
+
+
+def _vector(*elements):
+    return make_vector(map(_box, elements))
+
+
+def _not_callable(value):
+    # called in place of a value that is not a function, after the arguments
+    # are evaluated as in the other engines
+    def not_callable(*args):
+        raise NotImplementedError(f"can not call fn={_box(value)!r}")
+    return not_callable
+
+
+def _undefined(name: str, value):
+    raise RuntimeError(f"Undefined {name!r}")
+
+
+def _reassign_const(name: str, value):
+    raise RuntimeError(f"reassign const {name!r}")
+
+
+class _Scope:
+    """ the names a function or the program declares, found before it runs """
+
+    def __init__(self, parent: "_Scope | None"):
+        self.parent = parent
+        self.declared: set[str] = set()
+        self.consts: set[str] = set()
+        self.nonlocals: set[str] = set()
+        self.globals: set[str] = set()
+        # the names surely declared where the transpiler is in the body
+        self.bound: set[str] = set()
+
+    def collect(self, body: list[Statement]):
+        # blocks of if, while and for share the scope they are in,
+        # function bodies get a scope of their own
+        for statement in body:
+            match statement:
+                case VariableDeclaration():
+                    self.declared.add(statement.identifier)
+                    if statement.const:
+                        self.consts.add(statement.identifier)
+                case FunctionDeclaration():
+                    self.declared.add(statement.name)
+                    self.consts.add(statement.name)
+                case IfStatement():
+                    self.collect(statement.consequent)
+                    self.collect(statement.alternate)
+                case WhileStatement():
+                    self.collect(statement.body)
+                case ForStatement():
+                    self.declared.add(statement.identifier)
+                    self.collect(statement.body)
+
+    def resolve(self, name: str) -> "_Scope | None":
+        scope = self
+        while scope is not None and name not in scope.declared:
+            scope = scope.parent
+        return scope
+
+
+def _load(name: str) -> ast.Name:
+    return ast.Name(id=name, ctx=ast.Load())
+
+
+def _store(name: str) -> ast.Name:
+    return ast.Name(id=name, ctx=ast.Store())
+
+
+def _call(name: str, *args: ast.expr) -> ast.Call:
+    return ast.Call(func=_load(name), args=list(args), keywords=[])
+
+
+def _set_line(nodes: list[ast.AST], line: int) -> list[ast.AST]:
+    # nested statements were placed already, so only the nodes made for this
+    # statement are still without a position
+    line = max(line, 1)
+    for root in nodes:
+        for node in ast.walk(root):
+            if "lineno" in node._attributes and not hasattr(node, "lineno"):
+                node.lineno = node.end_lineno = line
+                node.col_offset = node.end_col_offset = 0
+    return nodes
+
+
+class Transpiler:
+    def __init__(self, env: Environment):
+        self.nodes: list[Statement] = []
+        self.temps = 0
+
+        # the program runs in the global scope, next to the builtins
+        self.scope = _Scope(None)
+        while env is not None:
+            self.scope.declared.update(env.variables)
+            self.scope.bound.update(env.variables)
+            self.scope.consts.update(env._consts)
+            env = env.parent
+
+    def _temp(self) -> str:
+        self.temps += 1
+        return f"_t{self.temps}"
+
+    def _node(self, node: Statement) -> ast.Constant:
+        self.nodes.append(node)
+        return ast.Constant(len(self.nodes) - 1)
+
+    def transpile(self, program: Program) -> ast.Module:
+        self.scope.collect(program.body)
+        body = [ast.Assign(targets=[_store("_result")], value=ast.Constant(None), lineno=1)]
+        body.extend(self._block(program.body, "_result"))
+        return ast.fix_missing_locations(ast.Module(body=body, type_ignores=[]))
+
+    def _block(self, body: list[Statement], target: str | None) -> list[ast.stmt]:
+        # the value of a block is that of its last statement, left in `target`;
+        # what it declares is not surely declared after it
+        bound = set(self.scope.bound)
+        statements = []
+        for i, statement in enumerate(body):
+            last = i == len(body) - 1
+            statements.extend(_set_line(self._statement(statement, target if last else None), statement.line))
+        if not body and target is not None:
+            statements.append(ast.Assign(targets=[_store(target)], value=ast.Constant(None)))
+        self.scope.bound = bound
+        return statements or [ast.Pass()]
+
+    def _statement(self, node: Statement, target: str | None) -> list[ast.stmt]:
+        targets = [] if target is None else [_store(target)]
+        match node:
+            case VariableDeclaration():
+                value = ast.Constant(None) if node.value is None else self._expression(node.value)
+                targets.append(_store(_mangle(node.identifier)))
+                self.scope.bound.add(node.identifier)
+                return [ast.Assign(targets=targets, value=value)]
+            case FunctionDeclaration():
+                statements = [self._function(node)]
+                self.scope.bound.add(node.name)
+                if target is not None:
+                    statements.append(ast.Assign(targets=targets, value=_load(_mangle(node.name))))
+                return statements
+            case IfStatement():
+                return [ast.If(
+                    test=self._expression(node.test),
+                    body=self._block(node.consequent, target),
+                    orelse=self._block(node.alternate, target),
+                )]
+            case WhileStatement():
+                statements = []
+                if target is not None:
+                    statements.append(ast.Assign(targets=targets, value=ast.Constant(None)))
+                # python's truth of the values is that of is_truthy, as for if
+                statements.append(ast.While(test=self._expression(node.test), body=self._block(node.body, target), orelse=[]))
+                return statements
+            case ForStatement():
+                statements = []
+                if target is not None:
+                    statements.append(ast.Assign(targets=targets, value=ast.Constant(None)))
+                iterable = _call("_iterate", self._expression(node.iterable))
+                bound = set(self.scope.bound)
+                self.scope.bound.add(node.identifier)
+                body = self._block(node.body, target)
+                self.scope.bound = bound
+                statements.append(ast.For(target=_store(_mangle(node.identifier)), iter=iterable, body=body, orelse=[]))
+                return statements
+            case AssignmentExpr() if type(node.assigne) is Identifier and self._assignable(node.assigne.symbol):
+                name = node.assigne.symbol
+                targets.append(_store(_mangle(name)))
+                return [ast.Assign(targets=targets, value=self._declared_first(name, self._expression(node.value)))]
+            case _:
+                value = self._expression(node)
+
+        if target is None:
+            return [ast.Expr(value=value)]
+        return [ast.Assign(targets=targets, value=value)]
+
+    def _function(self, node: FunctionDeclaration) -> ast.FunctionDef:
+        outer = self.scope
+        self.scope = _Scope(outer)
+        self.scope.declared.update(node.params)
+        self.scope.collect(node.body)
+        try:
+            body = self._block(node.body, "_r")
+        finally:
+            scope, self.scope = self.scope, outer
+        body.append(ast.Return(value=_load("_r")))
+
+        declarations = []
+        if scope.globals:
+            declarations.append(ast.Global(names=sorted(scope.globals)))
+        if scope.nonlocals:
+            declarations.append(ast.Nonlocal(names=sorted(scope.nonlocals)))
+
+        # extra arguments are ignored, and a missing one is never declared,
+        # so reading it raises as an undefined name
+        params = [ast.arg(arg=_mangle(param)) for param in node.params]
+        arguments = ast.arguments(
+            posonlyargs=[], args=params, vararg=ast.arg(arg="_args"),
+            kwonlyargs=[], kw_defaults=[], kwarg=None,
+            defaults=[_load("_missing") for _ in params],
+        )
+        missing = [
+            ast.If(
+                test=ast.Compare(left=_load(param.arg), ops=[ast.Is()], comparators=[_load("_missing")]),
+                body=[ast.Delete(targets=[ast.Name(id=param.arg, ctx=ast.Del())])],
+                orelse=[],
+            )
+            for param in params
+        ]
+        return ast.FunctionDef(
+            name=_mangle(node.name),
+            args=arguments,
+            body=declarations + missing + body,
+            decorator_list=[_call("_declared", _load("_nodes"), self._node(node))],
+            returns=None,
+        )
+
+    def _assignable(self, name: str) -> bool:
+        # where the assignment goes is known before it runs; a name that is
+        # const or undeclared there raises once the value is evaluated
+        scope = self.scope.resolve(name)
+        if scope is None or name in scope.consts:
+            return False
+        if scope is not self.scope:
+            if scope.parent is None:
+                self.scope.globals.add(_mangle(name))
+            else:
+                self.scope.nonlocals.add(_mangle(name))
+        return True
+
+    def _declared_first(self, name: str, value: ast.expr) -> ast.expr:
+        # python would bind a name that is not declared yet, the other engines
+        # raise; `(value, name)[0]` reads it after the value, as they check it
+        if name in self.scope.resolve(name).bound:
+            return value
+        check = ast.Tuple(elts=[value, _load(_mangle(name))], ctx=ast.Load())
+        return ast.Subscript(value=check, slice=ast.Constant(0), ctx=ast.Load())
+
+    def _assignment(self, node: AssignmentExpr) -> ast.expr:
+        if type(node.assigne) is not Identifier:
+            return _call("_unsupported", _load("_nodes"), self._node(node))
+
+        name = node.assigne.symbol
+        value = self._expression(node.value)
+        if self._assignable(name):
+            return ast.NamedExpr(target=_store(_mangle(name)), value=self._declared_first(name, value))
+        helper = "_undefined" if self.scope.resolve(name) is None else "_reassign_const"
+        return _call(helper, ast.Constant(name), value)
+
+    def _operand(self, node: Statement) -> tuple[ast.expr, ast.expr, ast.expr | None]:
+        # (first use, later uses, test of being a number): literals need no
+        # test and names are cheap to read twice, anything else is
+        # evaluated once into a temporary
+        value = self._expression(node)
+        if isinstance(node, NumberLiteral | BooleanLiteral):
+            return value, value, None
+        if isinstance(value, ast.Name):
+            return value, value, _call("_type", value)
+        temp = self._temp()
+        return _load(temp), _load(temp), _call("_type", ast.NamedExpr(target=_store(temp), value=value))
+
+    def _callee(self, node: Statement) -> ast.expr:
+        # every chlang function is a python function here, anything else
+        # would raise python's TypeError instead of the other engines' error
+        callee, callee_again, type_of = self._operand(node)
+        if type_of is None:
+            return _call("_not_callable", callee)
+        return ast.IfExp(
+            test=ast.Compare(left=type_of, ops=[ast.Is()], comparators=[_load("_FunctionType")]),
+            body=callee,
+            orelse=_call("_not_callable", callee_again),
+        )
+
+    def _numeric(self, node: BinaryExpr | LogicalExpr, fast, helper: str) -> ast.expr:
+        if fast is None:
+            return _call(helper, ast.Constant(node.operator), self._expression(node.left), self._expression(node.right))
+
+        lhs, lhs_again, lhs_type = self._operand(node.left)
+        rhs, rhs_again, rhs_type = self._operand(node.right)
+
+        tests = [
+            ast.Compare(left=type_of, ops=[ast.In()], comparators=[_load("_NUMERIC_TYPES")])
+            for type_of in (lhs_type, rhs_type) if type_of is not None
+        ]
+        slow = _call(helper, ast.Constant(node.operator), lhs_again, rhs_again)
+        if len(tests) == 0:
+            return fast(lhs, rhs)
+        if len(tests) == 1:
+            test = tests[0]
+        else:
+            # `&` rather than `and`, both sides must be evaluated in order
+            test = ast.BinOp(left=tests[0], op=ast.BitAnd(), right=tests[1])
+        return ast.IfExp(test=test, body=fast(lhs, rhs), orelse=slow)
+
+    def _binary_expr(self, node: BinaryExpr) -> ast.expr:
+        operator = _OPERATORS.get(node.operator)
+        fast = None
+        if operator is not None:
+            fast = lambda lhs, rhs: ast.BinOp(left=lhs, op=operator(), right=rhs)
+        return self._numeric(node, fast, "_binary")
+
+    def _logical_expr(self, node: LogicalExpr) -> ast.expr:
+        fast = None
+        if node.operator in _COMPARISONS:
+            comparison = _COMPARISONS[node.operator]
+            fast = lambda lhs, rhs: ast.Compare(left=lhs, ops=[comparison()], comparators=[rhs])
+        elif node.operator in ("and", "or"):
+            op = ast.And if node.operator == "and" else ast.Or
+            # `not not` turns the operand python picks into a boolean
+            fast = lambda lhs, rhs: ast.UnaryOp(op=ast.Not(), operand=ast.UnaryOp(
+                op=ast.Not(), operand=ast.BoolOp(op=op(), values=[lhs, rhs])))
+        return self._numeric(node, fast, "_logical")
+
+    def _expression(self, node: Statement) -> ast.expr:
+        match node:
+            case NumberLiteral() | StringLiteral() | BooleanLiteral():
+                return ast.Constant(node.value)
+            case Identifier():
+                return _load(_mangle(node.symbol))
+            case ObjectLiteral():
+                keys, values = [], []
+                for prop in node.properties:
+                    keys.append(ast.Constant(prop.key))
+                    if prop.value is None:
+                        values.append(_load(_mangle(prop.key)))
+                    else:
+                        values.append(self._expression(prop.value))
+                return ast.Dict(keys=keys, values=values)
+            case VectorLiteral():
+                return _call("_vector", *[self._expression(element) for element in node.elements])
+            case AwaitExpr():
+                return _call("_await", self._expression(node.argument))
+            case CallExpr():
+                return ast.Call(
+                    func=self._callee(node.caller),
+                    args=[self._expression(arg) for arg in node.args],
+                    keywords=[],
+                )
+            case AssignmentExpr():
+                return self._assignment(node)
+            case BinaryExpr():
+                return self._binary_expr(node)
+            case LogicalExpr():
+                return self._logical_expr(node)
+            case _:
+                # unknown nodes still only fail when they run
+                return _call("_unsupported", _load("_nodes"), self._node(node))
+
+
+def _declared(nodes: list[Statement], index: int):
+    def declare(fn):
+        fn.declaration = nodes[index]
+        return fn
+    return declare
+
+
+def _unsupported(nodes: list[Statement], index: int):
+    node = nodes[index]
+    if isinstance(node, AssignmentExpr):
+        raise NotImplementedError(f"trying to assign to {type(node.assigne)=}")
+    raise NotImplementedError(f"evaluate {node=}")
+
+
+_HELPERS = {
+    "_type": type,
+    "_missing": object(),
+    "_NUMERIC_TYPES": _NUMERIC_TYPES,
+    "_FunctionType": types.FunctionType,
+    "_binary": _binary,
+    "_logical": _logical,
+    "_iterate": _iterate,
+    "_vector": _vector,
+    "_await": _await,
+    "_not_callable": _not_callable,
+    "_undefined": _undefined,
+    "_reassign_const": _reassign_const,
+    "_declared": _declared,
+    "_unsupported": _unsupported,
+}
+
+_UNBOUND_LOCAL = re.compile(r"variable '(.+?)'")
+
+
+def transpile(program: Program, env: Environment) -> tuple[ast.Module, list[Statement]]:
+    """ the python module for `program`, and the nodes it refers to by index """
+    transpiler = Transpiler(env)
+    return transpiler.transpile(program), transpiler.nodes
+
+
+def execute(program: Program, env: Environment, filename: str = "<chlang>") -> RuntimeValue:
+    module, nodes = transpile(program, env)
+    code = compile(module, filename, "exec")
+
+    namespace = {"__builtins__": {}, "_nodes": nodes, "_env": env, **_HELPERS}
+    scopes = []
+    while env is not None:
+        scopes.append(env)
+        env = env.parent
+    for scope in reversed(scopes):
+        for name, value in scope.variables.items():
+            namespace[_mangle(name)] = _unbox(value)
+
+    try:
+        exec(code, namespace)
+    except NameError as error:
+        # reading a name before it is declared, as the tree walker reports it
+        name = error.name
+        if name is None:
+            match = _UNBOUND_LOCAL.search(str(error))
+            name = match and match.group(1)
+        if name is None:
+            raise
+        raise RuntimeError(f"Undefined {_unmangle(name)!r}").with_traceback(error.__traceback__) from None
+    return _box(namespace["_result"])
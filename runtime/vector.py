@@ -0,0 +1,155 @@
+"""
+numeric vectors: a series of numbers kept unboxed in an array.array, or in
+a numpy array when numpy is installed, so operators and reductions over a
+whole series run in C instead of once per element through NumberValues.
+
+Operators broadcast like numpy's: a vector and a number combine the number
+with every element, two vectors of the same length combine element by
+element. Comparisons give a vector of 1 and 0, which `總和` counts.
+"""
+import array
+import itertools
+import operator
+from collections.abc import Iterable
+
+from runtime.environment import NumberValue
+from runtime.environment import RuntimeValue
+from runtime.environment import VectorValue
+from runtime.environment import iterate
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_OPERATIONS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+_COMPARISONS = frozenset({"==", "!=", ">", ">=", "<", "<="})
+
+
+def _array(numbers: list[int | float], integral: bool):
+    if numpy is not None:
+        return numpy.array(numbers, dtype=numpy.int64 if integral else numpy.float64)
+    return array.array("q" if integral else "d", numbers)
+
+
+def make_vector(values: Iterable[RuntimeValue]) -> VectorValue:
+    """ the vector of `values`, which must all be numbers """
+    numbers = []
+    for value in values:
+        if type(value) is not NumberValue:
+            raise RuntimeError(f"Expected NumberValue, got {value!r}")
+        numbers.append(value.value)
+    integral = all(type(n) is int for n in numbers)
+    try:
+        return VectorValue(_array(numbers, integral))
+    except OverflowError:
+        raise RuntimeError("integer too large for a vector") from None
+
+
+def to_vector(value: RuntimeValue) -> VectorValue:
+    # the 向量 builtin: a vector of what a for loop would go through
+    if type(value) is VectorValue:
+        return value
+    return make_vector(iterate(value))
+
+
+def _operand(value: RuntimeValue):
+    if type(value) is VectorValue:
+        return value.values
+    if type(value) is NumberValue:
+        return value.value
+    raise NotImplementedError(f"vector operation with {value=}")
+
+
+def _integral(operand) -> bool:
+    if type(operand) is array.array:
+        return operand.typecode == "q"
+    return type(operand) is int
+
+
+def broadcast(operator: str, lhs: RuntimeValue, rhs: RuntimeValue) -> VectorValue:
+    """ `lhs operator rhs` with one or both sides a vector """
+    operation = _OPERATIONS.get(operator)
+    if operation is None:
+        raise NotImplementedError(f"vector operation {operator=}")
+    left = _operand(lhs)
+    right = _operand(rhs)
+    if type(lhs) is VectorValue and type(rhs) is VectorValue and len(left) != len(right):
+        raise RuntimeError(f"vectors of different lengths {len(left)} and {len(right)}")
+
+    if numpy is not None:
+        if operator in ("/", "%") and numpy.any(right == 0):
+            raise ZeroDivisionError()
+        result = operation(left, right)
+        if operator in _COMPARISONS:
+            result = result.astype(numpy.int64)
+        return VectorValue(result)
+
+    if type(lhs) is VectorValue:
+        rights = right if type(rhs) is VectorValue else itertools.repeat(right, len(left))
+        results = map(operation, left, rights)
+    else:
+        results = map(operation, itertools.repeat(left, len(right)), right)
+    if operator in _COMPARISONS or (operator != "/" and _integral(left) and _integral(right)):
+        typecode = "q"
+    else:
+        typecode = "d"
+    try:
+        return VectorValue(array.array(typecode, results))
+    except OverflowError:
+        raise RuntimeError("integer too large for a vector") from None
+
+
+def _numbers(value: RuntimeValue):
+    # the numbers a reduction goes over, any sequence of numbers will do
+    return to_vector(value).values
+
+
+def total(value: RuntimeValue) -> int | float:
+    numbers = _numbers(value)
+    if numpy is not None:
+        # numpy gives its own scalar types
+        return numbers.sum().item()
+    return sum(numbers)
+
+
+def minimum(value: RuntimeValue) -> int | float:
+    numbers = _numbers(value)
+    if len(numbers) == 0:
+        raise RuntimeError("min of an empty vector")
+    return numbers.min().item() if numpy is not None else min(numbers)
+
+
+def maximum(value: RuntimeValue) -> int | float:
+    numbers = _numbers(value)
+    if len(numbers) == 0:
+        raise RuntimeError("max of an empty vector")
+    return numbers.max().item() if numpy is not None else max(numbers)
+
+
+def mean(value: RuntimeValue) -> float:
+    numbers = _numbers(value)
+    if len(numbers) == 0:
+        raise RuntimeError("mean of an empty vector")
+    return numbers.mean().item() if numpy is not None else sum(numbers) / len(numbers)
+
+
+# the builtins, by their names
+REDUCTIONS = [
+    (("總和", "sum"), total),
+    (("最小", "min"), minimum),
+    (("最大", "max"), maximum),
+    (("平均", "mean"), mean),
+]
@@ -0,0 +1,70 @@
+from array import array
+from dataclasses import dataclass
+from dataclasses import field
+from enum import IntEnum
+from enum import auto
+
+from frontend.chast import FunctionDeclaration
+
+
+class Op(IntEnum):
+    # every instruction is two slots in the code: the opcode and its argument
+    LOAD_CONST = auto()         # push consts[arg]
+    LOAD_NAME = auto()          # push the variable names[arg]
+    STORE_NAME = auto()         # assign top to names[arg], keep it on the stack
+    LOAD_LOCAL = auto()         # push the variable of the function consts[arg] = (name, depth) scopes up
+    STORE_LOCAL = auto()        # assign top to it, keep it on the stack
+    DECLARE_NAME = auto()       # declare names[arg] with top, keep it on the stack
+    DECLARE_CONST = auto()      # same, as a constant
+    POP_TOP = auto()
+    BINARY_OP = auto()          # pop rhs, lhs, push lhs <consts[arg]> rhs
+    LOGICAL_OP = auto()
+    JUMP = auto()               # go to arg
+    POP_JUMP_IF_FALSE = auto()  # pop, go to arg if it is not truthy (if, while)
+    GET_ITER = auto()           # replace top with an iterator over it
+    FOR_ITER = auto()           # push the next value of the iterator under top, or drop the iterator and go to arg
+    CALL = auto()               # pop the callee and arg arguments under it
+    MAKE_FUNCTION = auto()      # push a function of the code consts[arg]
+    BUILD_OBJECT = auto()       # pop values for the keys in consts[arg]
+    BUILD_VECTOR = auto()       # pop arg numbers into a vector
+    AWAIT = auto()              # replace top with its value once it is done
+    RETURN_VALUE = auto()
+    RAISE = auto()              # raise NotImplementedError(consts[arg])
+
+
+@dataclass
+class CodeObject:
+    name: str
+    code: array = field(default_factory=lambda: array("I"))
+    consts: list = field(default_factory=list)
+    names: list[str] = field(default_factory=list)
+    # the function this is the code of
+    declaration: FunctionDeclaration | None = field(default=None, repr=False)
+    _const_slots: dict = field(default_factory=dict, repr=False, compare=False)
+    _name_slots: dict[str, int] = field(default_factory=dict, repr=False, compare=False)
+
+    def emit(self, op: Op, arg: int = 0) -> int:
+        """ append an instruction, return where it is """
+        self.code.append(op)
+        self.code.append(arg)
+        return len(self.code) - 2
+
+    def patch(self, at: int, arg: int):
+        self.code[at + 1] = arg
+
+    def add_const(self, value, key=None) -> int:
+        """ `key` lets equal constants share one slot, e.g. the same literal """
+        if key is not None and key in self._const_slots:
+            return self._const_slots[key]
+        self.consts.append(value)
+        slot = len(self.consts) - 1
+        if key is not None:
+            self._const_slots[key] = slot
+        return slot
+
+    def add_name(self, name: str) -> int:
+        slot = self._name_slots.get(name)
+        if slot is None:
+            self.names.append(name)
+            slot = self._name_slots[name] = len(self.names) - 1
+        return slot
@@ -0,0 +1,181 @@
+from frontend.chast import AssignmentExpr
+from frontend.chast import AwaitExpr
+from frontend.chast import BinaryExpr
+from frontend.chast import BooleanLiteral
+from frontend.chast import CallExpr
+from frontend.chast import ForStatement
+from frontend.chast import FunctionDeclaration
+from frontend.chast import Identifier
+from frontend.chast import IfStatement
+from frontend.chast import LogicalExpr
+from frontend.chast import NumberLiteral
+from frontend.chast import ObjectLiteral
+from frontend.chast import Program
+from frontend.chast import Statement
+from frontend.chast import StringLiteral
+from frontend.chast import VariableDeclaration
+from frontend.chast import VectorLiteral
+from frontend.chast import WhileStatement
+from runtime.environment import FALSE
+from runtime.environment import NULL
+from runtime.environment import TRUE
+from runtime.environment import BooleanValue
+from runtime.environment import NumberValue
+from runtime.environment import StringValue
+from runtime.environment import number
+
+from .bytecode import CodeObject
+from .bytecode import Op
+
+_NULL_KEY = ("null",)
+
+
+class Compiler:
+    """
+    compile statements into a CodeObject.
+    Every statement leaves exactly one value on the stack,
+    a block keeps only the value of its last statement.
+    """
+
+    def __init__(self, code: CodeObject):
+        self.code = code
+
+    def compile_block(self, body: list[Statement]):
+        if not body:
+            self.code.emit(Op.LOAD_CONST, self.code.add_const(NULL, _NULL_KEY))
+            return
+        for i, statement in enumerate(body):
+            if i:
+                self.code.emit(Op.POP_TOP)
+            self.compile(statement)
+
+    def compile(self, node: Statement):
+        code = self.code
+        match node:
+            case NumberLiteral():
+                key = (NumberValue, type(node.value), node.value)
+                code.emit(Op.LOAD_CONST, code.add_const(number(node.value), key))
+            case StringLiteral():
+                key = (StringValue, node.value)
+                code.emit(Op.LOAD_CONST, code.add_const(StringValue(node.value), key))
+            case BooleanLiteral():
+                key = (BooleanValue, node.value)
+                code.emit(Op.LOAD_CONST, code.add_const(TRUE if node.value else FALSE, key))
+            case Identifier():
+                self._load(node.symbol, node.depth, node.slot)
+            case ObjectLiteral():
+                keys = []
+                for prop in node.properties:
+                    if prop.value is None:
+                        self._load(prop.key, prop.depth, prop.slot)
+                    else:
+                        self.compile(prop.value)
+                    keys.append(prop.key)
+                code.emit(Op.BUILD_OBJECT, code.add_const(tuple(keys)))
+            case VectorLiteral():
+                for element in node.elements:
+                    self.compile(element)
+                code.emit(Op.BUILD_VECTOR, len(node.elements))
+            case AwaitExpr():
+                self.compile(node.argument)
+                code.emit(Op.AWAIT)
+            case CallExpr():
+                # arguments first, then the callee, like the tree walker
+                for arg in node.args:
+                    self.compile(arg)
+                self.compile(node.caller)
+                code.emit(Op.CALL, len(node.args))
+            case AssignmentExpr():
+                if type(node.assigne) is not Identifier:
+                    self._raise(f"trying to assign to {type(node.assigne)=}")
+                    return
+                self.compile(node.value)
+                target = node.assigne
+                if target.slot is None:
+                    code.emit(Op.STORE_NAME, code.add_name(target.symbol))
+                else:
+                    code.emit(Op.STORE_LOCAL, self._local(target.symbol, target.depth))
+            case BinaryExpr():
+                self.compile(node.left)
+                self.compile(node.right)
+                code.emit(Op.BINARY_OP, code.add_const(node.operator, ("op", node.operator)))
+            case LogicalExpr():
+                self.compile(node.left)
+                self.compile(node.right)
+                code.emit(Op.LOGICAL_OP, code.add_const(node.operator, ("op", node.operator)))
+            case Program():
+                self.compile_block(node.body)
+            case VariableDeclaration():
+                if node.value is None:
+                    code.emit(Op.LOAD_CONST, code.add_const(NULL, _NULL_KEY))
+                else:
+                    self.compile(node.value)
+                op = Op.DECLARE_CONST if node.const else Op.DECLARE_NAME
+                code.emit(op, code.add_name(node.identifier))
+            case FunctionDeclaration():
+                code.emit(Op.MAKE_FUNCTION, code.add_const(compile_function(node)))
+                code.emit(Op.DECLARE_CONST, code.add_name(node.name))
+            case IfStatement():
+                self.compile(node.test)
+                to_alternate = code.emit(Op.POP_JUMP_IF_FALSE)
+                self.compile_block(node.consequent)
+                to_end = code.emit(Op.JUMP)
+                code.patch(to_alternate, len(code.code))
+                self.compile_block(node.alternate)
+                code.patch(to_end, len(code.code))
+            case WhileStatement():
+                # the last value of the body stays under the test
+                code.emit(Op.LOAD_CONST, code.add_const(NULL, _NULL_KEY))
+                loop = len(code.code)
+                self.compile(node.test)
+                to_end = code.emit(Op.POP_JUMP_IF_FALSE)
+                code.emit(Op.POP_TOP)
+                self.compile_block(node.body)
+                code.emit(Op.JUMP, loop)
+                code.patch(to_end, len(code.code))
+            case ForStatement():
+                # the iterator stays under the last value of the body
+                self.compile(node.iterable)
+                code.emit(Op.GET_ITER)
+                code.emit(Op.LOAD_CONST, code.add_const(NULL, _NULL_KEY))
+                loop = code.emit(Op.FOR_ITER)
+                code.emit(Op.DECLARE_NAME, code.add_name(node.identifier))
+                code.emit(Op.POP_TOP)
+                if node.body:
+                    code.emit(Op.POP_TOP)
+                    self.compile_block(node.body)
+                code.emit(Op.JUMP, loop)
+                code.patch(loop, len(code.code))
+            case _:
+                self._raise(f"evaluate {node=}")
+
+    def _local(self, name: str, depth: int) -> int:
+        return self.code.add_const((name, depth), ("local", name, depth))
+
+    def _load(self, name: str, depth: int | None, slot: int | None):
+        # a variable the resolver found in a function is only looked for
+        # there, globals and unresolved names go by name
+        if slot is None:
+            self.code.emit(Op.LOAD_NAME, self.code.add_name(name))
+        else:
+            self.code.emit(Op.LOAD_LOCAL, self._local(name, depth))
+
+    def _raise(self, message: str):
+        # unsupported nodes only fail once they run, as in the tree walker
+        self.code.emit(Op.RAISE, self.code.add_const(message))
+
+
+def compile_function(node: FunctionDeclaration) -> CodeObject:
+    code = CodeObject(name=node.name, declaration=node)
+    compiler = Compiler(code)
+    compiler.compile_block(node.body)
+    code.emit(Op.RETURN_VALUE)
+    return code
+
+
+def compile_program(program: Program) -> CodeObject:
+    code = CodeObject(name="<program>")
+    compiler = Compiler(code)
+    compiler.compile(program)
+    code.emit(Op.RETURN_VALUE)
+    return code
@@ -0,0 +1,54 @@
+from .bytecode import CodeObject
+from .bytecode import Op
+
+_JUMPS = {Op.JUMP, Op.POP_JUMP_IF_FALSE, Op.FOR_ITER}
+
+
+def _describe(code: CodeObject, op: Op, arg: int) -> str:
+    match op:
+        case Op.LOAD_CONST | Op.BINARY_OP | Op.LOGICAL_OP | Op.BUILD_OBJECT | Op.RAISE:
+            return repr(code.consts[arg])
+        case Op.MAKE_FUNCTION:
+            return f"<code {code.consts[arg].name}>"
+        case Op.LOAD_NAME | Op.STORE_NAME | Op.DECLARE_NAME | Op.DECLARE_CONST:
+            return code.names[arg]
+        case Op.LOAD_LOCAL | Op.STORE_LOCAL:
+            name, depth = code.consts[arg]
+            return f"{name}, {depth} up"
+        case _ if op in _JUMPS:
+            return f"to {arg}"
+        case _:
+            return ""
+
+
+def disassemble(code: CodeObject) -> str:
+    """ a listing of the code, then of every function it makes """
+    lines = [f"Disassembly of {code.name}:"]
+    functions = []
+    for pc in range(0, len(code.code), 2):
+        op = Op(code.code[pc])
+        arg = code.code[pc + 1]
+        if op is Op.MAKE_FUNCTION:
+            functions.append(code.consts[arg])
+        description = _describe(code, op, arg)
+        if description:
+            lines.append(f"{pc:>6} {op.name:<22} {arg:>4} ({description})")
+        else:
+            lines.append(f"{pc:>6} {op.name:<22} {arg:>4}")
+
+    for function in functions:
+        lines.append("")
+        lines.append(disassemble(function))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from frontend.parser import Parser
+
+    from .compiler import compile_program
+
+    with open(sys.argv[1]) as fs:
+        program = Parser().produce_ast(fs.read())
+    print(disassemble(compile_program(program)))
@@ -0,0 +1,234 @@
+from frontend.chast import FunctionDeclaration
+from frontend.chast import Program
+from runtime.aio import await_value
+from runtime.environment import BooleanValue
+from runtime.environment import DictionaryValue
+from runtime.environment import Environment
+from runtime.environment import FunctionValue
+from runtime.environment import NativeFnValue
+from runtime.environment import NumberValue
+from runtime.environment import RuntimeValue
+from runtime.environment import StringValue
+from runtime.environment import iterate
+from runtime.eval.expressions import BINARY_OPERATIONS
+from runtime.eval.expressions import LOGICAL_OPERATIONS
+from runtime.eval.expressions import _eval_binary_expr
+from runtime.eval.expressions import _eval_mixed_binary_expr
+from runtime.eval.expressions import _eval_mixed_logical_expr
+from runtime.eval.statements import is_truthy
+from runtime.vector import make_vector
+
+from .bytecode import CodeObject
+from .bytecode import Op
+from .compiler import compile_function
+from .compiler import compile_program
+
+# values that logical operators accept, and whose truth is `value != 0`
+_NUMERIC_TYPES = frozenset({BooleanValue, NumberValue})
+# values that have a `.value` for binary operators
+_VALUE_TYPES = frozenset({BooleanValue, NumberValue, StringValue})
+
+
+class Frame:
+    __slots__ = ("code", "env", "stack", "pc")
+
+    def __init__(self, code: CodeObject, env: Environment):
+        self.code = code
+        self.env = env
+        self.stack: list[RuntimeValue] = []
+        self.pc = 0
+
+
+def _lookup(env: Environment, name: str) -> RuntimeValue:
+    # Environment.lookup_variable, walking the scopes in a loop
+    scope = env
+    while name not in scope.variables:
+        scope = scope.parent
+        if scope is None:
+            raise RuntimeError(f"Undefined {name!r}")
+    return scope.variables[name]
+
+
+def _function_scope(env: Environment, name: str, depth: int) -> Environment:
+    # the scope the resolver found a function variable in, once it is declared there
+    scope = env.ancestor(depth)
+    if name not in scope.variables:
+        raise RuntimeError(f"Undefined {name!r}")
+    return scope
+
+
+def run(code: CodeObject, env: Environment) -> RuntimeValue:
+    """
+    the dispatch loop. chlang calls push a Frame instead of recursing
+    in python, so the depth of chlang recursion is not bound by python's
+    """
+    LOAD_CONST = int(Op.LOAD_CONST)
+    LOAD_NAME = int(Op.LOAD_NAME)
+    STORE_NAME = int(Op.STORE_NAME)
+    LOAD_LOCAL = int(Op.LOAD_LOCAL)
+    STORE_LOCAL = int(Op.STORE_LOCAL)
+    DECLARE_NAME = int(Op.DECLARE_NAME)
+    DECLARE_CONST = int(Op.DECLARE_CONST)
+    POP_TOP = int(Op.POP_TOP)
+    BINARY_OP = int(Op.BINARY_OP)
+    LOGICAL_OP = int(Op.LOGICAL_OP)
+    JUMP = int(Op.JUMP)
+    POP_JUMP_IF_FALSE = int(Op.POP_JUMP_IF_FALSE)
+    GET_ITER = int(Op.GET_ITER)
+    FOR_ITER = int(Op.FOR_ITER)
+    CALL = int(Op.CALL)
+    MAKE_FUNCTION = int(Op.MAKE_FUNCTION)
+    BUILD_OBJECT = int(Op.BUILD_OBJECT)
+    BUILD_VECTOR = int(Op.BUILD_VECTOR)
+    AWAIT = int(Op.AWAIT)
+    RETURN_VALUE = int(Op.RETURN_VALUE)
+    RAISE = int(Op.RAISE)
+
+    frames: list[Frame] = []
+    frame = Frame(code, env)
+    instructions, consts, names = code.code, code.consts, code.names
+    stack = frame.stack
+    push, pop = stack.append, stack.pop
+    pc = 0
+
+    while True:
+        op = instructions[pc]
+        arg = instructions[pc + 1]
+        pc += 2
+
+        if op == LOAD_LOCAL:
+            name, depth = consts[arg]
+            value = (env.ancestor(depth) if depth else env).variables.get(name)
+            if value is None:
+                raise RuntimeError(f"Undefined {name!r}")
+            push(value)
+        elif op == LOAD_NAME:
+            push(_lookup(env, names[arg]))
+        elif op == LOAD_CONST:
+            push(consts[arg])
+        elif op == BINARY_OP:
+            rhs = pop()
+            lhs = pop()
+            if type(lhs) not in _VALUE_TYPES or type(rhs) not in _VALUE_TYPES:
+                push(_eval_mixed_binary_expr(lhs, rhs, consts[arg]))
+            else:
+                operation = BINARY_OPERATIONS.get(consts[arg])
+                if operation is None:
+                    push(_eval_binary_expr(lhs.value, rhs.value, consts[arg]))
+                else:
+                    push(operation(lhs.value, rhs.value))
+        elif op == POP_TOP:
+            pop()
+        elif op == STORE_NAME:
+            env.assign_variable(names[arg], stack[-1])
+        elif op == STORE_LOCAL:
+            name, depth = consts[arg]
+            _function_scope(env, name, depth).assign_variable(name, stack[-1])
+        elif op == POP_JUMP_IF_FALSE:
+            value = pop()
+            if type(value) in _NUMERIC_TYPES:
+                # same as is_truthy, without going through the patterns
+                if value.value == 0:
+                    pc = arg
+            elif not is_truthy(value):
+                pc = arg
+        elif op == JUMP:
+            pc = arg
+        elif op == FOR_ITER:
+            value = next(stack[-2], None)
+            if value is None:
+                last_evaluated = pop()
+                stack[-1] = last_evaluated
+                pc = arg
+            else:
+                push(value)
+        elif op == GET_ITER:
+            stack[-1] = iterate(stack[-1])
+        elif op == LOGICAL_OP:
+            rhs = pop()
+            lhs = pop()
+            if type(lhs) in _NUMERIC_TYPES and type(rhs) in _NUMERIC_TYPES:
+                operation = LOGICAL_OPERATIONS.get(consts[arg])
+                if operation is None:
+                    raise NotImplementedError(f"eval_logical_expr operator={consts[arg]!r}")
+                push(operation(lhs.value, rhs.value))
+            else:
+                push(_eval_mixed_logical_expr(lhs, rhs, consts[arg]))
+        elif op == CALL:
+            fn = pop()
+            if arg:
+                args = stack[-arg:]
+                del stack[-arg:]
+            else:
+                args = []
+
+            if type(fn) is NativeFnValue:
+                # TODO: support keyward arguments
+                push(fn.call(*args))
+            elif type(fn) is FunctionValue:
+                if fn.compiled is None:
+                    fn.compiled = compile_function(FunctionDeclaration(fn.name, fn.parameters, fn.body))
+                scope = Environment(fn.declaration_env)
+                # TODO: check the bounds of args, verity arity of function
+                scope.variables.update(zip(fn.parameters, args))
+
+                frame.pc = pc
+                frames.append(frame)
+                frame = Frame(fn.compiled, scope)
+                env = scope
+                instructions, consts, names = frame.code.code, frame.code.consts, frame.code.names
+                stack = frame.stack
+                push, pop = stack.append, stack.pop
+                pc = 0
+            else:
+                raise NotImplementedError(f"can not call {fn=}")
+        elif op == RETURN_VALUE:
+            result = pop()
+            if not frames:
+                return result
+            frame = frames.pop()
+            env = frame.env
+            instructions, consts, names = frame.code.code, frame.code.consts, frame.code.names
+            stack = frame.stack
+            push, pop = stack.append, stack.pop
+            pc = frame.pc
+            push(result)
+        elif op == DECLARE_NAME:
+            env.declare_variable(names[arg], stack[-1], False)
+        elif op == DECLARE_CONST:
+            env.declare_variable(names[arg], stack[-1], True)
+        elif op == MAKE_FUNCTION:
+            function_code = consts[arg]
+            node = function_code.declaration
+            push(FunctionValue(
+                name = node.name,
+                parameters = node.params,
+                declaration_env = env,
+                body = node.body,
+                compiled = function_code,
+            ))
+        elif op == BUILD_OBJECT:
+            keys = consts[arg]
+            if keys:
+                values = stack[-len(keys):]
+                del stack[-len(keys):]
+            else:
+                values = []
+            push(DictionaryValue(properties=dict(zip(keys, values))))
+        elif op == AWAIT:
+            stack[-1] = await_value(stack[-1])
+        elif op == BUILD_VECTOR:
+            if arg:
+                values = stack[-arg:]
+                del stack[-arg:]
+            else:
+                values = []
+            push(make_vector(values))
+        elif op == RAISE:
+            raise NotImplementedError(consts[arg])
+        else:
+            raise RuntimeError(f"bad opcode {op} at {pc - 2} in {frame.code.name}")
+
+
+def execute(program: Program, env: Environment) -> RuntimeValue:
+    return run(compile_program(program), env)
@@ -0,0 +1,97 @@
+"""
+the adaptive engine's instructions specialize, miss and turn generic again
+while giving what the tree walker gives
+"""
+import contextlib
+import io
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from runtime import adaptive
+from runtime.adaptive import MISS_LIMIT
+from runtime.adaptive import WARMUP
+from runtime.environment import create_global_env
+from runtime.interpreter import evaluate
+
+# numbers, then strings, then numbers again through the same sites
+SCRIPT = """\
+定義 合（a、b）：
+    a 加 b
+定義 一（x）：
+    x 減 1
+定義 二（x）：
+    x 乘 2
+定義 用（g）：
+    g（3）
+為每個 v 存在於 範圍（{first}）：
+    輸出（合（v、v）、用（一））
+為每個 v 存在於 「{strings}」：
+    輸出（合（v、v）、用（二））
+為每個 v 存在於 範圍（{last}）：
+    輸出（合（v、v）、用（一））
+"""
+
+
+def _run(source: str, engine):
+    env = create_global_env()
+    program = Parser().produce_ast(source)
+    Resolver().resolve(program, env.visible_names())
+    sites = []
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        if engine is evaluate:
+            evaluate(program, env)
+        else:
+            engine(program, env, sites)
+    return output.getvalue().split(), [site.stats() for site in sites]
+
+
+def _site(stats: list[tuple], what: str) -> tuple[str, int, int, int]:
+    # (kind, hits, misses, deopts) of the one site doing `what`
+    found = [site[2:] for site in stats if site[1] == what]
+    assert len(found) == 1
+    return found[0]
+
+
+def _same_as_the_tree_walker(first: int, strings: int, last: int) -> list[tuple]:
+    source = SCRIPT.format(first=first, strings="s" * strings, last=last)
+    output, stats = _run(source, adaptive.execute)
+    assert output == _run(source, evaluate)[0]
+    return stats
+
+
+def test_specialize_miss_and_deopt():
+    # numbers until the sites specialize and hit twice, strings and 二
+    # until they give up, then numbers and 一 for twice the warmup
+    stats = _same_as_the_tree_walker(WARMUP + 2, MISS_LIMIT, 2 * WARMUP + 1)
+    assert _site(stats, "binary +") == ("add numbers", 2 + 1, MISS_LIMIT, 1)
+    assert _site(stats, "call g") == ("function", 2 + 1, MISS_LIMIT, 1)
+    # 二's body runs only while the call site misses
+    assert _site(stats, "binary *") == ("numbers", MISS_LIMIT - WARMUP, 0, 0)
+    assert _site(stats, "binary -") == ("subtract numbers", 3 * WARMUP + 3 - WARMUP, 0, 0)
+    # globals and builtins are always where they were found
+    globals = [site[2:] for site in stats if site[1].startswith("global ")]
+    assert {kind for kind, _, _, _ in globals} == {"generic", "global", "builtin"}
+    assert all(not misses and not deopts for _, _, misses, deopts in globals)
+
+
+def test_generic_after_the_misses():
+    stats = _same_as_the_tree_walker(WARMUP, MISS_LIMIT, 0)
+    assert _site(stats, "binary +") == ("generic", 0, MISS_LIMIT, 1)
+    assert _site(stats, "call g") == ("generic", 0, MISS_LIMIT, 1)
+
+
+def test_warmup():
+    stats = _same_as_the_tree_walker(WARMUP - 1, 0, 0)
+    assert _site(stats, "binary +") == ("generic", 0, 0, 0)
+    stats = _same_as_the_tree_walker(WARMUP, 0, 0)
+    assert _site(stats, "binary +") == ("add numbers", 0, 0, 0)
+    assert _site(stats, "call g") == ("function", 0, 0, 0)
+
+
+def test_what_never_specializes_backs_off():
+    # strings from the start: the addition gives up after the warmup, and
+    # looks again after twice as many runs
+    stats = _same_as_the_tree_walker(0, 3 * WARMUP - 1, 1)
+    assert _site(stats, "binary +") == ("add numbers", 0, 0, 0)
+    # 二 is called from the start, the last call is to 一
+    assert _site(stats, "call g") == ("function", 2 * WARMUP - 1, 1, 0)
@@ -0,0 +1,33 @@
+"""
+執行 runs commands only when asked for
+"""
+import sys
+
+import pytest
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from frontend.resolver import ResolverError
+from runtime.environment import StringValue
+from runtime.environment import create_global_env
+from runtime.interpreter import evaluate
+
+RUN = f"等待 執行（「{sys.executable} -c 'print(1)'」）"
+
+
+def _run(source: str, env):
+    program = Parser().produce_ast(source)
+    Resolver().resolve(program, env.visible_names())
+    return evaluate(program, env)
+
+
+@pytest.mark.parametrize("name", ["執行", "run"])
+def test_run_is_left_out_by_default(name):
+    env = create_global_env()
+    assert name not in env.visible_names()
+    with pytest.raises(ResolverError):
+        _run(RUN, env)
+
+
+def test_run_when_allowed():
+    assert _run(RUN, create_global_env(allow_run=True)) == StringValue("1\n")
@@ -0,0 +1,33 @@
+import io
+import pickle
+
+from frontend.cache import MAGIC
+from frontend.cache import ASTCache
+from frontend.cache import _cache_tag
+from frontend.cache import hash_source
+from frontend.cache import produce_ast_cached
+from frontend.parser import Parser
+
+SOURCE = "定義 f（x）：\n    x 加 1\n令 y 為 f（2）\n"
+
+
+def test_second_load_comes_from_the_cache(tmp_path):
+    ast_cache = ASTCache(tmp_path)
+    program = produce_ast_cached(Parser(), io.BytesIO(SOURCE.encode()), ast_cache)
+    key = hash_source(io.BytesIO(SOURCE.encode()))
+    assert ast_cache.load(key) == program
+
+
+class _Exploit:
+    def __reduce__(self):
+        return exec, ("import pathlib; pathlib.Path('pwned').touch()",)
+
+
+def test_an_entry_that_is_not_a_syntax_tree_runs_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    key = hash_source(io.BytesIO(SOURCE.encode()))
+    entry = tmp_path / (key + ".ast")
+    entry.write_bytes(MAGIC + _cache_tag() + bytes.fromhex(key) + pickle.dumps(_Exploit()))
+    assert ASTCache(tmp_path).load(key) is None
+    assert not (tmp_path / "pwned").exists()
+    assert not entry.exists()
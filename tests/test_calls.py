@@ -0,0 +1,151 @@
+"""
+the tree walker's call site caches give what a fresh lookup would
+"""
+import contextlib
+import io
+import sys
+import threading
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from runtime.environment import create_global_env
+from runtime.interpreter import evaluate
+
+
+def _run(source: str) -> list[str]:
+    env = create_global_env()
+    program = Parser().produce_ast(source)
+    Resolver().resolve(program, env.visible_names())
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        evaluate(program, env)
+    return output.getvalue().split()
+
+
+def _numbers(*values) -> list[str]:
+    return [f"NumberValue(value={value})" for value in values]
+
+
+def test_a_global_rebound_in_a_loop():
+    source = """\
+定義 加一（x）：
+    x 加 1
+定義 乘十（x）：
+    令 y 為 x 乘 10
+    y
+令 f 為 加一
+令 i 為 0
+每當 i 小於 5：
+    輸出（f（i））
+    i 為 i 加 1
+    若 i 等於 3：
+        f 為 乘十
+"""
+    assert _run(source) == _numbers(1, 2, 3, 30, 40)
+
+
+def test_a_function_declared_again():
+    source = """\
+定義 f（x）：
+    x 加 1
+定義 呼叫（）：
+    f（10）
+輸出（呼叫（））
+定義 f（x）：
+    令 y 為 x 乘 2
+    y
+輸出（呼叫（））
+"""
+    assert _run(source) == _numbers(11, 20)
+
+
+def test_functions_passed_to_one_call_site():
+    # different numbers of slots, and a native function in between
+    source = """\
+定義 套用（g、x）：
+    g（x）
+定義 加一（x）：
+    x 加 1
+定義 平方加（x）：
+    令 a 為 x 乘 x
+    令 b 為 a 加 x
+    b
+為每個 i 存在於 範圍（3）：
+    輸出（套用（加一、i）、套用（平方加、i）、套用（整數、「7」））
+"""
+    assert _run(source) == _numbers(1, 0, 7, 2, 2, 7, 3, 6, 7)
+
+
+def test_closures_made_in_a_loop():
+    # one call site, a new declaration_env every round
+    source = """\
+定義 做（k）：
+    定義 加上（x）：
+        x 加 k
+    加上
+令 甲 為 做（100）
+為每個 k 存在於 範圍（3）：
+    令 g 為 做（k）
+    輸出（g（10）、甲（10））
+"""
+    assert _run(source) == _numbers(10, 110, 11, 110, 12, 110)
+
+
+def test_recursion_through_one_call_site():
+    # every pending call needs a frame of its own
+    source = """\
+定義 費氏（n）：
+    若 n 小於 2：
+        n
+    不然：
+        費氏（n 減 1）加 費氏（n 減 2）
+輸出（費氏（15））
+"""
+    assert _run(source) == _numbers(610)
+
+
+THREADED = """\
+定義 套用（g、x）：
+    g（x）
+定義 加一（x）：
+    x 加 1
+定義 平方加（x）：
+    令 a 為 x 乘 x
+    令 b 為 a 加 x
+    b
+令 選 為 加一
+若 誰：
+    選 為 平方加
+令 和 為 0
+為每個 i 存在於 範圍（200）：
+    和 為 和 加 套用（選、i）
+和
+"""
+
+
+def test_one_tree_in_many_threads():
+    # the same call sites with another function in each thread
+    program = Parser().produce_ast(THREADED)
+    names = create_global_env().visible_names()
+    names["誰"] = False
+    Resolver().resolve(program, names)
+    expected = {0: sum(i + 1 for i in range(200)), 1: sum(i * i + i for i in range(200))}
+    results = []
+
+    def run(who: int):
+        for _ in range(20):
+            env = create_global_env()
+            env.declare_variable("誰", create_global_env().lookup_variable("是" if who else "否"))
+            results.append((who, evaluate(program, env).value))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        threads = [threading.Thread(target=run, args=(i % 2,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(results) == 160
+    assert all(value == expected[who] for who, value in results)
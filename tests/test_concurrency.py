@@ -0,0 +1,78 @@
+"""
+many threads parse and run scripts at once, as a worker service does; every
+parser and engine keeps its state per instance or per call, so each thread
+gets the results of its own script.
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from runtime import closures
+from runtime import interpreter
+from runtime import stackwalker
+from runtime.environment import create_global_env
+
+SCRIPT = """\
+定義 階乘（n）：
+{indent}若 n 小於 2：
+{indent}{indent}1
+{indent}不然：
+{indent}{indent}n 乘 階乘（n 減 1）
+令 和 為 0
+令 i 為 0
+每當 i 小於 {count}：
+{indent}和 為 和 加 i 乘 {seed}
+{indent}i 為 i 加 1
+和 加 階乘（{factorial}）
+"""
+
+THREADS = 16
+SCRIPTS = 400
+
+
+def _factorial(n: int) -> int:
+    return 1 if n < 2 else n * _factorial(n - 1)
+
+
+def _script(seed: int) -> tuple[str, int]:
+    # scripts indented differently, so a shared indent stack would break them
+    indent = " " * (1 + seed % 8) if seed % 3 else "\t"
+    count = 20 + seed % 50
+    factorial = seed % 12
+    source = SCRIPT.format(indent=indent, count=count, seed=seed, factorial=factorial)
+    return source, seed * count * (count - 1) // 2 + _factorial(factorial)
+
+
+@pytest.fixture
+def switch_often():
+    # switch threads every few bytecodes, not every 5 ms
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize("engine", [interpreter.evaluate, stackwalker.execute, closures.execute], ids=["tree", "stack", "closure"])
+def test_parse_and_run_in_many_threads(switch_often, engine):
+    def run(seed: int) -> tuple[int, int]:
+        source, expected = _script(seed)
+        env = create_global_env()
+        program = Parser().produce_ast(source)
+        Resolver().resolve(program, env.visible_names())
+        return engine(program, env).value, expected
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(run, range(SCRIPTS)))
+    assert [result for result, _ in results] == [expected for _, expected in results]
+
+
+def test_one_parser_after_a_failed_parse(switch_often):
+    parser = Parser()
+    with pytest.raises(Exception):
+        parser.produce_ast("定義 f（x）：\n        x 加\n")
+    source, expected = _script(5)
+    env = create_global_env()
+    assert interpreter.evaluate(parser.produce_ast(source), env).value == expected
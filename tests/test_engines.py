@@ -0,0 +1,302 @@
+"""
+every engine gives what the tree walker gives, printed output and result
+"""
+import contextlib
+import io
+
+import pytest
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from frontend.resolver import ResolverError
+from main import ENGINES
+from runtime.environment import create_global_env
+
+SCRIPTS = {
+    "string plus": """\
+令 a 為 「ab」 加 「cd」
+令 b 為 a 加 「e」
+輸出（a、b、b 乘 2、「x」 乘 3）
+輸出（a 等於 a、a 不等於 b）
+若 「」 加 「」：
+    輸出（「truthy」）
+定義 f（x、y）：
+    x 加 y
+輸出（f（「p」、「q」）、【k：「a」 加 「b」】）
+b
+""",
+    "loop tests": """令 v 為 《1、2、3》
+令 n 為 0
+每當 v：
+    n 為 n 加 1
+    若 n 大於 2：
+        v 為 《》
+令 d 為 【a：1】
+令 k 為 0
+每當 d：
+    k 為 k 加 1
+    d 為 【】
+若 【a：1】：
+    輸出（「dict truthy」）
+令 s 為 「ab」
+每當 s：
+    s 為 「」
+令 m 為 3
+每當 m：
+    m 為 m 減 1
+輸出（n、k、s、m）
+""",
+    "functions and recursion": """\
+定義 費氏（n）：
+    若 n 小於 2：
+        n
+    不然：
+        費氏（n 減 1）加 費氏（n 減 2）
+定義 加總（a、b、c）：
+    a 加 b 加 c
+定義 空的（）：
+    令 x 為 1
+    若 x 大於 2：
+        x
+輸出（費氏（15）、加總（1、2、3）、空的（））
+定義 階乘（n）：
+    若 n 小於等於 1：
+        1
+    不然：
+        n 乘 階乘（n 減 1）
+階乘（10）
+""",
+    "closures over outer variables": """\
+令 計數 為 0
+定義 計數器（起點）：
+    令 n 為 起點
+    定義 下一個（）：
+        n 為 n 加 1
+        計數 為 計數 加 1
+        n
+    下一個
+令 甲 為 計數器（10）
+令 乙 為 計數器（100）
+輸出（甲（）、甲（）、乙（）、甲（））
+定義 加上（k）：
+    定義 f（x）：
+        x 加 k
+    f
+令 加五 為 加上（5）
+輸出（加五（1）、加五（10））
+計數
+""",
+    "if, else if, else and no else": """\
+定義 分類（n）：
+    若 n 小於 0：
+        「負」
+    或若 n 等於 0：
+        「零」
+    不然：
+        「正」
+定義 只有若（n）：
+    若 n 大於 10：
+        「大」
+輸出（分類（0 減 1）、分類（0）、分類（3））
+輸出（只有若（11）、只有若（1））
+若 0：
+    輸出（「不會」）
+若 「」：
+    輸出（「空字串是真」）
+若 空：
+    輸出（「空是真」）
+""",
+    "while and for loops": """\
+令 和 為 0
+令 i 為 0
+每當 i 小於 10：
+    和 為 和 加 i
+    i 為 i 加 1
+令 字 為 0
+為每個 c 存在於 「你好嗎」：
+    字 為 字 加 1
+    輸出（c）
+令 鍵們 為 0
+為每個 k 存在於 【a：1、b：2】：
+    輸出（k）
+    鍵們 為 鍵們 加 1
+令 積 為 1
+為每個 n 存在於 範圍（1、6）：
+    積 為 積 乘 n
+為每個 n 存在於 範圍（10、0、0 減 3）：
+    輸出（n）
+定義 內（）：
+    令 t 為 0
+    為每個 j 存在於 範圍（4）：
+        t 為 t 加 j
+    輸出（j）
+    t
+輸出（和、字、鍵們、積、內（）、n）
+為每個 x 存在於 範圍（0）：
+    輸出（x）
+""",
+    "objects, vectors and operators": """\
+令 a 為 1
+令 物件 為 【a、b：2、c：【d：「e」】】
+輸出（物件）
+令 v 為 《1、2、3》
+令 w 為 v 加 v 乘 2
+輸出（w、v 大於 1、總和（w））
+輸出（1 除 2、7 餘 3、2 乘 3.5、1 加 是）
+輸出（3 大於 2 且 2 大於 3、3 大於 2 或 2 大於 3）
+v
+""",
+    "functions through a native function": """\
+常數 倍數 為 3
+定義 幫手（x）：
+    x 乘 倍數
+定義 做（k）：
+    定義 加上（x）：
+        幫手（x） 加 k
+    加上
+輸出（向量（並行映射（幫手、範圍（4））））
+輸出（向量（並行映射（做（100）、範圍（3））））
+令 和 為 0
+為每個 g 存在於 並行映射（做、範圍（3））：
+    和 為 和 加 g（10）
+和
+""",
+    "divide by zero": """\
+輸出（1）
+令 z 為 0
+1 除 z
+""",
+    "modulo by zero": """\
+令 z 為 0
+7 餘 z
+""",
+    "call what is not a function": """\
+令 a 為 1
+a（輸出（2））
+""",
+    "iterate a number": """\
+為每個 x 存在於 5：
+    x
+""",
+    "compare strings": """\
+「ab」 等於 「ab」
+""",
+    "a string in a vector": """\
+《1、「a」》
+""",
+    "a member": """\
+令 o 為 【a：1】
+o.a
+""",
+    "a missing argument": """\
+定義 f（a、b）：
+    b
+輸出（f（1、2））
+f（1）
+""",
+    "an extra argument": """\
+定義 f（a）：
+    a
+f（1、2）
+""",
+    "a range of a string": """\
+範圍（「a」）
+""",
+    "assign a local before it is declared": """\
+令 x 為 1
+定義 f（）：
+    x 為 5
+    令 x 為 2
+    x
+輸出（f（））
+x
+""",
+    "read a local before it is declared": """\
+令 x 為 1
+定義 g（）：
+    輸出（x）
+    令 x 為 2
+    x
+g（）
+""",
+}
+
+
+# rejected by the resolver, so run unresolved to reach the engines' own checks
+UNRESOLVED = {
+    "reassign a const": """\
+常數 a 為 1
+輸出（a）
+a 為 2
+""",
+    "reassign a const from a function": """\
+常數 a 為 1
+定義 f（）：
+    a 為 2
+輸出（0）
+f（）
+""",
+    "reassign a function": """\
+定義 g（）：
+    1
+g 為 2
+""",
+    "reassign a builtin": """\
+輸出 為 1
+""",
+    "assign an undeclared name": """\
+定義 f（）：
+    c 為 2
+f（）
+""",
+}
+
+
+def _run(engine, source: str, resolve: bool = True) -> tuple[str, str]:
+    env = create_global_env()
+    program = Parser().produce_ast(source)
+    if resolve:
+        Resolver().resolve(program, env.visible_names())
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        try:
+            result = repr(engine(program, env))
+        except Exception as error:
+            # what was printed before still has to be the same
+            result = f"{type(error).__name__}: {error}"
+    return output.getvalue(), result
+
+
+@pytest.mark.parametrize("engine", [name for name in ENGINES if name != "tree"])
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_same_as_the_tree_walker(engine, script):
+    source = SCRIPTS[script]
+    assert _run(ENGINES[engine], source) == _run(ENGINES["tree"], source)
+
+
+@pytest.mark.parametrize("engine", [name for name in ENGINES if name != "tree"])
+@pytest.mark.parametrize("script", UNRESOLVED)
+def test_same_checks_as_the_tree_walker(engine, script):
+    source = UNRESOLVED[script]
+    assert _run(ENGINES[engine], source, False) == _run(ENGINES["tree"], source, False)
+
+
+@pytest.mark.parametrize("script", UNRESOLVED)
+def test_the_resolver_finds_them_first(script):
+    env = create_global_env()
+    with pytest.raises(ResolverError):
+        Resolver().resolve(Parser().produce_ast(UNRESOLVED[script]), env.visible_names())
+
+
+@pytest.mark.parametrize("script", ["assign a local before it is declared", "read a local before it is declared"])
+def test_a_local_is_undefined_before_its_declaration(script):
+    assert _run(ENGINES["tree"], SCRIPTS[script]) == ("", "RuntimeError: Undefined 'x'")
+
+
+def test_a_function_of_another_engine():
+    # resolved, so its variables are in the slots of its calls
+    env = create_global_env()
+    for engine, source in [("tree", "定義 f（x）：\n    令 y 為 x 乘 2\n    y 加 1\n"), ("python", "f（20）\n")]:
+        program = Parser().produce_ast(source)
+        Resolver().resolve(program, env.visible_names())
+        result = ENGINES[engine](program, env)
+    assert repr(result) == "NumberValue(value=41)"
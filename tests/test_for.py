@@ -0,0 +1,99 @@
+"""
+為每個 goes through ranges, strings, dicts, vectors and iterators the same
+on every engine, its variable a global at the top level and a slot in a
+function, and keeps the last value after the loop
+"""
+import contextlib
+import io
+
+import pytest
+
+from frontend.chast import ForStatement
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from main import ENGINES
+from runtime.environment import create_global_env
+
+AT_TOP = """\
+為每個 x 存在於 {iterable}：
+    輸出（x）
+輸出（x）
+"""
+
+IN_A_FUNCTION = """\
+定義 走（）：
+    為每個 x 存在於 {iterable}：
+        輸出（x）
+    x
+輸出（走（））
+"""
+
+# the loop does not run, x keeps what it had
+NO_ROUNDS = """\
+令 x 為 9
+為每個 x 存在於 {iterable}：
+    輸出（x）
+定義 走（）：
+    令 y 為 8
+    為每個 y 存在於 {iterable}：
+        輸出（y）
+    y
+輸出（x、走（））
+"""
+
+
+def _run(engine, source: str) -> list[str]:
+    env = create_global_env()
+    program = Parser().produce_ast(source)
+    Resolver().resolve(program, env.visible_names())
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        ENGINES[engine](program, env)
+    return output.getvalue().split()
+
+
+def _strings(*values) -> list[str]:
+    return [f"StringValue(value={value!r})" for value in values]
+
+
+def _numbers(*values) -> list[str]:
+    return [f"NumberValue(value={value})" for value in values]
+
+
+@pytest.fixture
+def lines(tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_text("first\nsecond\n", encoding="utf-8")
+    return f"逐行（「{path}」）"
+
+
+ITERABLES = [
+    ("範圍（3）", _numbers(0, 1, 2, 2)),
+    ("範圍（1、7、3）", _numbers(1, 4, 4)),
+    ("「ab」", _strings("a", "b", "b")),
+    ("【a：1、b：2】", _strings("a", "b", "b")),
+    ("《1、2》", _numbers(1, 2, 2)),
+    ("lines", _strings("first", "second", "second")),
+]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("script", [AT_TOP, IN_A_FUNCTION], ids=["global", "slot"])
+@pytest.mark.parametrize("iterable,expected", ITERABLES, ids=[iterable for iterable, _ in ITERABLES])
+def test_for_each(request, engine, script, iterable, expected):
+    if iterable == "lines":
+        iterable = request.getfixturevalue("lines")
+    assert _run(engine, script.format(iterable=iterable)) == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("iterable", ["範圍（0）", "「」", "【】", "《》"])
+def test_no_rounds(engine, iterable):
+    assert _run(engine, NO_ROUNDS.format(iterable=iterable)) == _numbers(9, 8)
+
+
+def test_where_the_variable_lives():
+    program = Parser().produce_ast(AT_TOP.format(iterable="範圍（3）") + IN_A_FUNCTION.format(iterable="範圍（3）"))
+    Resolver().resolve(program, create_global_env().visible_names())
+    at_top, in_a_function = program.body[0], program.body[2].body[0]
+    assert type(at_top) is ForStatement and at_top.slot is None
+    assert type(in_a_function) is ForStatement and in_a_function.slot is not None
@@ -0,0 +1,86 @@
+import io
+import time
+
+import pytest
+
+from frontend.lexer import tokenize
+from frontend.lexer import tokenize_iter
+
+SOURCE = """\
+定義 求和函式（參數1、參數2）：
+    輸出（參數1、參數2）
+    參數1+參數2
+
+令 x 為 「中文 字串」
+若 x 大於等於 'abc'：
+\t輸出（"雙引號"）
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_stream_across_chunk_boundaries(chunk_size):
+    expected = tokenize(SOURCE)
+    assert list(tokenize_iter(io.StringIO(SOURCE), chunk_size)) == expected
+    # bytes may end in the middle of a character
+    assert list(tokenize_iter(io.BytesIO(SOURCE.encode()), chunk_size)) == expected
+
+
+def test_long_string_across_many_chunks():
+    source = "令 長 為 「" + "字" * 300_000 + "」\n"
+    start = time.perf_counter()
+    tokens = list(tokenize_iter(io.StringIO(source), 64))
+    # reading the string again for every chunk takes seconds
+    assert time.perf_counter() - start < 1
+    assert tokens == tokenize(source)
+
+
+def test_many_distinct_names_in_a_stream():
+    source = "".join(f"令 名字{i} 為 {i}\n" for i in range(50_000))
+    assert list(tokenize_iter(io.StringIO(source), 1000)) == tokenize(source)
+
+
+def test_unterminated_string_in_a_stream():
+    with pytest.raises(SyntaxError):
+        list(tokenize_iter(io.StringIO("令 x 為 「沒有結尾\n" * 100), 16))
+
+
+def _words(source: str) -> list[tuple[str, str]]:
+    return [(token.type.name, token.value) for token in tokenize(source)[:-1]]
+
+
+@pytest.mark.parametrize("name", ["除數", "加入", "命令", "加總", "餘額", "若干", "因為", "非常", "或許", "為什麼", "加加函式"])
+def test_name_between_spaces_stays_whole(name):
+    assert _words(f"令 {name} 為 {name} 加 1") == [
+        ("Let", "令"), ("Identifier", name), ("Equals", "="), ("Identifier", name), ("BinaryOp", "+"), ("Number", "1"),
+    ]
+
+
+def test_name_between_punctuation_stays_whole():
+    assert _words("y，加入（除數）") == [
+        ("Identifier", "y"), ("Dot", "."), ("Identifier", "加入"),
+        ("OpenParen", "("), ("Identifier", "除數"), ("CloseParen", ")"),
+    ]
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("令答案為亂數", [("Let", "令"), ("Identifier", "答案"), ("Equals", "="), ("Identifier", "亂數")]),
+    ("令x為1", [("Let", "令"), ("Identifier", "x"), ("Equals", "="), ("Number", "1")]),
+    ("若使用者輸入等於答案：", [("If", "若"), ("Identifier", "使用者輸入"), ("BinaryOp", "=="), ("Identifier", "答案"), ("Colon", ":")]),
+    ("每當i小於等於10：", [("While", "每當"), ("Identifier", "i"), ("BinaryOp", "<="), ("Number", "10"), ("Colon", ":")]),
+    ("a不等於b", [("Identifier", "a"), ("BinaryOp", "!="), ("Identifier", "b")]),
+])
+def test_spaceless_source_is_split(source, expected):
+    assert _words(source) == expected
+
+
+def test_ascii_keyword_must_be_a_whole_word():
+    assert _words("let letter = 1") == [("Let", "let"), ("Identifier", "letter"), ("Equals", "="), ("Number", "1")]
+
+
+def test_spaceless_tokens_know_their_positions():
+    from frontend.lexer import tokenize_packed
+
+    tokens = list(tokenize_packed("令答案為  亂數\n"))
+    assert [(token.raw, token.start) for token in tokens[:4]] == [
+        ("令", (1, 0)), ("答案", (1, 1)), ("為", (1, 3)), ("亂數", (1, 6)),
+    ]
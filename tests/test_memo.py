@@ -0,0 +1,165 @@
+"""
+--memoize: which functions remember their results, and how the memo keeps them
+"""
+import contextlib
+import io
+
+import pytest
+
+from frontend.parser import Parser
+from frontend.purity import memoize
+from frontend.resolver import Resolver
+from runtime.environment import NULL
+from runtime.environment import BooleanValue
+from runtime.environment import Memo
+from runtime.environment import NumberValue
+from runtime.environment import StringValue
+from runtime.environment import create_global_env
+from runtime.interpreter import evaluate
+
+
+def _run(source: str, size: int = 16):
+    # the names memoized, what the program printed and its global scope
+    env = create_global_env()
+    program = Parser().produce_ast(source)
+    pure = memoize(program, size, env.visible_names())
+    Resolver().resolve(program, env.visible_names())
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        evaluate(program, env)
+    return pure, output.getvalue().split(), env
+
+
+def _stats(memo: Memo) -> tuple[int, int, int, int]:
+    return memo.hits, memo.misses, memo.evictions, len(memo.results)
+
+
+def test_a_pure_function_is_memoized():
+    source = """\
+定義 費氏（n）：
+    若 n 小於 2：
+        n
+    不然：
+        費氏（n 減 1） 加 費氏（n 減 2）
+輸出（費氏（30））
+"""
+    pure, output, env = _run(source, 64)
+    assert pure == {"費氏"}
+    assert output == ["NumberValue(value=832040)"]
+    # every n from 0 to 30 is worked out once
+    hits, misses, evictions, remembered = _stats(env.lookup_variable("費氏").memo)
+    assert (misses, evictions, remembered) == (31, 0, 31)
+    assert hits == 28
+
+
+IMPURE = """\
+令 計 為 0
+定義 印（x）：
+    輸出（x）
+    x
+定義 記（x）：
+    計 為 計 加 1
+    x
+定義 經印（x）：
+    印（x）
+定義 經經印（x）：
+    經印（x）
+定義 平方（x）：
+    x 乘 x
+定義 經平方（x）：
+    平方（x）
+"""
+
+
+@pytest.mark.parametrize("name", ["印", "記", "經印", "經經印"])
+def test_an_impure_function_is_not(name):
+    source = IMPURE + f"{name}（1）\n{name}（1）\n"
+    pure, output, env = _run(source)
+    assert name not in pure
+    assert pure == {"平方", "經平方"}
+    assert env.lookup_variable(name).memo is None
+    if name != "記":
+        assert output == ["NumberValue(value=1)"] * 2
+    else:
+        assert env.lookup_variable("計").value == 2
+
+
+def test_recursion_through_an_impure_function():
+    source = """\
+定義 甲（n）：
+    若 n 小於 1：
+        0
+    不然：
+        乙（n 減 1）
+定義 乙（n）：
+    輸出（n）
+    甲（n）
+甲（2）
+"""
+    pure, output, _ = _run(source)
+    assert pure == set()
+    assert output == ["NumberValue(value=1)", "NumberValue(value=0)"]
+
+
+def test_calling_what_a_global_holds_is_not():
+    pure, _, _ = _run("定義 f（x）：\n    x\n令 h 為 f\n定義 g（x）：\n    h（x）\n")
+    assert pure == {"f"}
+
+
+def test_least_recently_used_is_dropped():
+    source = """\
+定義 雙（x）：
+    x 乘 2
+雙（1）
+雙（2）
+雙（1）
+雙（3）
+雙（2）
+雙（1）
+"""
+    _, _, env = _run(source, 2)
+    memo = env.lookup_variable("雙").memo
+    # 1 2 1 hit, 3 drops 2, 2 drops 1, 1 drops 3
+    assert _stats(memo) == (1, 5, 3, 2)
+    assert list(memo.results) == [Memo.key([NumberValue(2)]), Memo.key([NumberValue(1)])]
+
+
+def test_counters():
+    memo = Memo(2)
+    one, two, three = ([NumberValue(n)] for n in (1, 2, 3))
+    assert memo.get(Memo.key(one)) is None
+    memo.put(Memo.key(one), NumberValue(10))
+    assert memo.get(Memo.key(one)) == NumberValue(10)
+    memo.put(Memo.key(two), NumberValue(20))
+    memo.put(Memo.key(three), NumberValue(30))
+    assert memo.get(Memo.key(one)) is None
+    assert memo.get(Memo.key(three)) == NumberValue(30)
+    assert _stats(memo) == (2, 2, 1, 2)
+
+
+def test_keys_keep_types_apart():
+    keys = [
+        Memo.key([NumberValue(1)]),
+        Memo.key([NumberValue(1.0)]),
+        Memo.key([BooleanValue(True)]),
+        Memo.key([StringValue("1")]),
+        Memo.key([NULL]),
+        Memo.key([NumberValue(0)]),
+        Memo.key([BooleanValue(False)]),
+    ]
+    assert len(set(keys)) == len(keys)
+    assert Memo.key([NumberValue(1), NumberValue(2)]) != Memo.key([NumberValue(2), NumberValue(1)])
+
+
+def test_only_plain_values_have_a_key():
+    assert Memo.key([NumberValue(1), create_global_env().lookup_variable("輸出")]) is None
+
+
+def test_one_and_one_point_zero_are_remembered_apart():
+    source = """\
+定義 同（x）：
+    x
+輸出（同（1）、同（1.0）、同（是）、同（1））
+"""
+    _, output, env = _run(source)
+    assert output == ["NumberValue(value=1)", "NumberValue(value=1.0)", "BooleanValue(value=True)", "NumberValue(value=1)"]
+    assert _stats(env.lookup_variable("同").memo) == (1, 3, 0, 3)
@@ -0,0 +1,146 @@
+import contextlib
+import io
+
+import pytest
+
+from frontend.chast import BooleanLiteral
+from frontend.chast import Identifier
+from frontend.chast import IfStatement
+from frontend.chast import NumberLiteral
+from frontend.chast import Program
+from frontend.chast import VariableDeclaration
+from frontend.chast import WhileStatement
+from frontend.optimizer import BranchPruning
+from frontend.optimizer import ConstantFolding
+from frontend.optimizer import DeadCode
+from frontend.optimizer import LoopInvariantHoisting
+from frontend.optimizer import PassManager
+from frontend.optimizer import optimize
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from runtime.environment import create_global_env
+from runtime.interpreter import evaluate
+
+
+def _parse(source: str):
+    return Parser().produce_ast(source)
+
+
+def _run(source: str, optimized: bool) -> tuple[str, str]:
+    # what a program prints, and its value or the error it ends with
+    program = _parse(source)
+    if optimized:
+        optimize(program)
+    env = create_global_env()
+    Resolver().resolve(program, env.visible_names())
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        try:
+            result = repr(evaluate(program, env))
+        except Exception as error:
+            result = type(error).__name__
+    return output.getvalue(), result
+
+
+def test_constant_folding():
+    program = optimize(_parse("令 a 為 1 加 2 乘 3\n令 b 為 2 大於 1\n令 c 為 是\n"), [ConstantFolding])
+    assert program == Program(body=[
+        VariableDeclaration("a", NumberLiteral(7), False),
+        VariableDeclaration("b", BooleanLiteral(True), False),
+        VariableDeclaration("c", BooleanLiteral(True), False),
+    ])
+
+
+def test_folding_leaves_what_raises_for_the_program():
+    program = optimize(_parse("令 a 為 1 除 0\n"), [ConstantFolding])
+    assert program == _parse("令 a 為 1 除 0\n")
+
+
+def test_folding_leaves_a_declared_boolean_name():
+    source = "令 是 為 0\n令 a 為 是\n"
+    assert optimize(_parse(source), [ConstantFolding]) == _parse(source)
+
+
+def test_branch_pruning():
+    source = "定義 f（）：\n    若 1 大於 2：\n        輸出（1）\n    不然：\n        輸出（2）\n    輸出（3）\n"
+    assert optimize(_parse(source)) == _parse("定義 f（）：\n    輸出（2）\n    輸出（3）\n")
+
+
+def test_pruning_keeps_an_empty_last_branch():
+    # its Null is the value of the program
+    source = "若 否：\n    輸出（1）\n"
+    assert optimize(_parse(source), [BranchPruning]) == _parse(source)
+
+
+def test_dead_code():
+    source = "1\n每當 0：\n    輸出（1）\n輸出（2）\n每當 1：\n    輸出（3）\n輸出（4）\n令 a 為 5\n"
+    assert optimize(_parse(source), [DeadCode]) == _parse("輸出（2）\n每當 1：\n    輸出（3）\n")
+
+
+def test_dead_code_keeps_the_value_of_the_block():
+    source = "輸出（1）\n2\n"
+    assert optimize(_parse(source), [DeadCode]) == _parse(source)
+
+
+HOISTABLE = """\
+令 k 為 2
+令 a 為 0
+每當 a 小於 30：
+    令 q 為 k 乘 5
+    a 為 a 加 q
+a
+"""
+
+
+def test_hoisting_behind_a_guard():
+    program = optimize(_parse(HOISTABLE), [LoopInvariantHoisting])
+    guard = program.body[2]
+    assert type(guard) is IfStatement
+    hoisted, loop = guard.consequent
+    assert type(hoisted) is VariableDeclaration and hoisted.const
+    assert type(loop) is WhileStatement
+    assert guard.test == loop.test
+    assert loop.body[0].value == Identifier(hoisted.identifier)
+    assert _run(HOISTABLE, True) == _run(HOISTABLE, False) == ("", "NumberValue(value=30)")
+
+
+def test_a_loop_that_never_runs_evaluates_nothing():
+    source = "令 a 為 1\n令 z 為 0\n每當 a 小於 0：\n    令 q 為 1 除 z\n    a 為 a 加 q\na\n"
+    assert _run(source, True) == _run(source, False) == ("", "NumberValue(value=1)")
+
+
+RAISES_AFTER_OUTPUT = """\
+令 i 為 0
+令 z 為 0
+每當 i 小於 1：
+    輸出（「side」）
+    令 q 為 1 除 z
+    i 為 i 加 1
+"""
+
+
+def test_nothing_that_raises_is_hoisted_ahead_of_output():
+    output, error = _run(RAISES_AFTER_OUTPUT, True)
+    assert error == "ZeroDivisionError"
+    assert (output, error) == _run(RAISES_AFTER_OUTPUT, False)
+    assert output
+
+
+def test_nothing_is_hoisted_past_an_operator_that_stays():
+    # i 加 1 runs first in the round, had it raised 1 除 z must not have run
+    source = "令 z 為 0\n令 i 為 0\n每當 i 小於 1：\n    i 為 i 加 1\n    令 q 為 1 除 z\n"
+    program = optimize(_parse(source), [LoopInvariantHoisting])
+    assert program == _parse(source)
+
+
+@pytest.mark.parametrize("passes", [None, [ConstantFolding, DeadCode]])
+def test_stats(passes):
+    manager = PassManager() if passes is None else PassManager(passes)
+    manager.run(_parse("令 a 為 1 加 2\n3\n" + HOISTABLE))
+    stats = manager.stats()
+    assert [name for name, _, _ in stats] == [optimization.name for optimization in manager.passes]
+    assert all(seconds >= 0 for _, _, seconds in stats)
+    changes = {name: count for name, count, _ in stats}
+    assert changes["constant folding"] == 1
+    assert changes["dead code"] == 1
+    if passes is None:
+        assert changes == {"constant folding": 1, "branch pruning": 0, "dead code": 1, "loop invariant hoisting": 1}
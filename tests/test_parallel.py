@@ -0,0 +1,76 @@
+"""
+並行映射 sends a function the variables it uses and nothing else
+"""
+import contextlib
+import io
+
+import pytest
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from main import ENGINES
+from runtime.environment import create_global_env
+
+PROLOGUE = """\
+令 等一下 為 睡眠（0.1）
+令 行們 為 逐行（「{path}」）
+常數 倍數 為 3
+定義 幫手（x）：
+    x 乘 倍數
+定義 費氏（n）：
+    若 n 小於 2：
+        n
+    不然：
+        費氏（n 減 1）加 費氏（n 減 2）
+"""
+
+USES_WHAT_IT_REACHES = PROLOGUE + """\
+定義 工作（x）：
+    令 偏移 為 10
+    定義 內部（y）：
+        y 加 偏移
+    內部（幫手（x））加 費氏（x）
+輸出（向量（並行映射（工作、範圍（8））））
+定義 外層（k）：
+    定義 加k（x）：
+        x 加 k
+    並行映射（加k、範圍（4））
+輸出（向量（外層（100）））
+"""
+
+USES_THE_LINES = PROLOGUE + """\
+定義 壞（x）：
+    行們
+並行映射（壞、範圍（2））
+"""
+
+
+def _run(engine, source: str) -> str:
+    env = create_global_env()
+    program = Parser().produce_ast(source)
+    Resolver().resolve(program, env.visible_names())
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        ENGINES[engine](program, env)
+    return output.getvalue()
+
+
+@pytest.fixture
+def lines(tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_text("a\nb\n")
+    return path
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_unpicklable_globals_stay_behind(engine, lines):
+    output = _run(engine, USES_WHAT_IT_REACHES.format(path=lines))
+    assert output.splitlines() == [
+        "VectorValue(values=array('q', [10, 14, 17, 21, 25, 30, 36, 44]))",
+        "VectorValue(values=array('q', [100, 101, 102, 103]))",
+    ]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_using_what_can_not_be_sent_names_it(engine, lines):
+    with pytest.raises(RuntimeError, match="'行們'"):
+        _run(engine, USES_THE_LINES.format(path=lines))
@@ -0,0 +1,62 @@
+"""
+lexing and parsing walk the source once, so 10 times the source takes about
+10 times as long; a step that copies the rest of the source would take 100.
+From tens of KB to a few MB the time per byte stays about the same.
+"""
+import time
+
+import pytest
+
+from frontend.lexer import tokenize
+from frontend.parser import Parser
+
+BLOCK = """\
+定義 函式{i}（甲、乙）：
+    令 丙 為 甲 加 乙 乘 {i}
+    若 丙 大於 10：
+        輸出（「大於十」、丙）
+    丙
+令 變數{i} 為 函式{i}（1、2）
+"""
+
+# 10 times the time would be linear, 100 times quadratic
+MAX_RATIO = 25
+# between the fastest and slowest time per byte, over sizes 10 times apart
+MAX_SPREAD = 4
+
+
+def _source(blocks: int) -> str:
+    return "".join(BLOCK.format(i=i) for i in range(blocks))
+
+
+def _best_time(fn, src: str, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(src)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize("fn", [tokenize, lambda src: Parser().produce_ast(src)], ids=["tokenize", "parse"])
+def test_linear_in_source_size(fn):
+    small = _source(100)
+    large = _source(1000)
+    assert len(large) >= 10 * len(small)
+    ratio = _best_time(fn, large) / _best_time(fn, small)
+    assert ratio < MAX_RATIO, f"10x the source took {ratio:.1f}x the time"
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("fn", [tokenize, lambda src: Parser().produce_ast(src)], ids=["tokenize", "parse"])
+def test_constant_time_per_byte(fn):
+    per_byte = {}
+    for blocks in (200, 2000, 20000):
+        src = _source(blocks)
+        size = len(src.encode("utf-8"))
+        # one run of the largest is long enough not to be noise
+        per_byte[size] = _best_time(fn, src, 3 if blocks < 20000 else 1) / size
+    assert max(per_byte) > 2 ** 21
+    spread = max(per_byte.values()) / min(per_byte.values())
+    times = ", ".join(f"{size // 1024} KB: {seconds * 1e9:.0f} ns" for size, seconds in per_byte.items())
+    assert spread < MAX_SPREAD, f"time per byte varies {spread:.1f}x ({times})"
@@ -0,0 +1,121 @@
+"""
+the scheduler takes turns between programs, and one that loops forever,
+raises or can not be parsed does not stop the others
+"""
+import contextlib
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from runtime.environment import create_global_env
+from runtime.scheduler import QuotaExceeded
+from runtime.scheduler import Scheduler
+
+FOREVER = """\
+令 i 為 0
+每當 是：
+    i 為 i 加 1
+"""
+
+COUNT = """\
+令 i 為 0
+每當 i 小於 {n}：
+    輸出（「{name}」）
+    i 為 i 加 1
+i
+"""
+
+RAISES = """\
+令 i 為 0
+每當 i 小於 10：
+    i 為 i 加 1
+    若 i 等於 5：
+        1 除 0
+"""
+
+
+def _spawn(scheduler: Scheduler, source: str, **kwargs):
+    env = create_global_env()
+    program = Parser().produce_ast(source)
+    Resolver().resolve(program, env.visible_names())
+    return scheduler.spawn(program, env, **kwargs)
+
+
+def _run(scheduler: Scheduler) -> list[str]:
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        scheduler.run()
+    return output.getvalue().split()
+
+
+@pytest.mark.parametrize("quota", [{"max_steps": 5000}, {"max_seconds": 0.05}], ids=["steps", "seconds"])
+def test_a_quota_stops_only_its_thread(quota):
+    scheduler = Scheduler(slice=100)
+    forever = _spawn(scheduler, FOREVER, name="forever", **quota)
+    counter = _spawn(scheduler, COUNT.format(n=3, name="a"))
+    output = _run(scheduler)
+    assert forever.done and type(forever.error) is QuotaExceeded
+    assert "forever" in str(forever.error)
+    assert counter.done and counter.error is None and counter.result.value == 3
+    assert len(output) == 3
+
+
+def test_the_step_quota_is_kept_to_a_slice():
+    scheduler = Scheduler(slice=100, max_steps=1000)
+    thread = _spawn(scheduler, FOREVER)
+    scheduler.run()
+    assert 1000 < thread.steps <= 1100
+
+
+def test_round_robin():
+    # a round of the loop or a call is a step
+    def order(slice: int) -> list[str]:
+        scheduler = Scheduler(slice=slice)
+        _spawn(scheduler, COUNT.format(n=3, name="a"))
+        _spawn(scheduler, COUNT.format(n=3, name="b"))
+        return [token.split("'")[1] for token in _run(scheduler)]
+
+    assert order(1) == ["a", "b", "a", "b", "a", "b"]
+    assert order(1000) == ["a", "a", "a", "b", "b", "b"]
+
+
+def test_an_error_leaves_the_others_running():
+    scheduler = Scheduler(slice=1)
+    first = _spawn(scheduler, COUNT.format(n=8, name="a"))
+    raises = _spawn(scheduler, RAISES)
+    last = _spawn(scheduler, COUNT.format(n=8, name="b"))
+    output = _run(scheduler)
+    assert type(raises.error) is ZeroDivisionError
+    assert first.result.value == last.result.value == 8
+    assert len(output) == 16
+    assert scheduler.threads == [first, raises, last]
+
+
+def test_a_slice_takes_a_step():
+    with pytest.raises(ValueError):
+        Scheduler(slice=0)
+
+
+@pytest.mark.parametrize("bad", [
+    "定義 f（x）：\n        x 加\n",  # ParserError
+    "令 a 為 「ab\n",  # SyntaxError
+    "輸出（沒有）\n",  # ResolverError
+], ids=["parser", "lexer", "resolver"])
+def test_a_script_that_does_not_parse_leaves_the_others(tmp_path, bad):
+    paths = [tmp_path / "first.ch", tmp_path / "bad.ch", tmp_path / "last.ch"]
+    paths[0].write_text(COUNT.format(n=2, name="a"), encoding="utf-8")
+    paths[1].write_text(bad, encoding="utf-8")
+    paths[2].write_text(COUNT.format(n=2, name="b"), encoding="utf-8")
+    result = subprocess.run(
+        [sys.executable, "-m", "runtime.scheduler", *map(str, paths)],
+        cwd=Path(__file__).parent.parent, capture_output=True, text=True, encoding="utf-8", timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.splitlines()
+    assert lines[0].startswith(f"{paths[1]}: ")
+    assert any(line.startswith(f"{paths[0]}: NumberValue(value=2)") for line in lines)
+    assert any(line.startswith(f"{paths[2]}: NumberValue(value=2)") for line in lines)
@@ -0,0 +1,62 @@
+"""
+the stack engine recurses on its own stack, not python's
+"""
+import sys
+
+import pytest
+
+from frontend.parser import Parser
+from frontend.resolver import Resolver
+from runtime import stackwalker
+from runtime.environment import create_global_env
+from runtime.interpreter import evaluate
+
+# n 加 和（n 減 1） still has an addition to do once the call returns
+SUM = """\
+定義 和（n）：
+    若 n 小於 1：
+        0
+    不然：
+        n 加 和（n 減 1）
+和（{n}）
+"""
+
+# the call is the last thing the body does
+COUNT = """\
+定義 數（n、總）：
+    若 n 小於 1：
+        總
+    不然：
+        數（n 減 1、總 加 n）
+數（{n}、0）
+"""
+
+
+def _run(execute, source: str):
+    env = create_global_env()
+    program = Parser().produce_ast(source)
+    Resolver().resolve(program, env.visible_names())
+    return execute(program, env).value
+
+
+@pytest.fixture
+def default_limit():
+    # a test run may have raised it, the engine has to do with the default
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    try:
+        yield
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+@pytest.mark.parametrize("script,n", [(SUM, 30000), (COUNT, 200000)], ids=["non-tail", "tail"])
+def test_deep_recursion(default_limit, script, n):
+    assert _run(stackwalker.execute, script.format(n=n)) == n * (n + 1) // 2
+
+
+@pytest.mark.parametrize("script", [SUM, COUNT], ids=["non-tail", "tail"])
+@pytest.mark.parametrize("n", [0, 1, 2, 50])
+def test_same_as_the_tree_walker(script, n):
+    source = script.format(n=n)
+    assert _run(stackwalker.execute, source) == _run(evaluate, source) == n * (n + 1) // 2